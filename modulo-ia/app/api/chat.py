@@ -7,9 +7,7 @@
 # - Persists conversation messages in DB
 # ---------------------------------------------------------------------
 
-import os
 import re
-import requests
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.orm import Session
 
@@ -19,6 +17,9 @@ from app.schemas.message import MessageResponse
 from app.schemas.conversation import ConversationSummary, ConversationCreate, ConversationResponse
 from app.config import SessionLocal
 
+from app.services import llm_client
+from app.services.llm_client import LLMError, model_for
+from app.services.intent import classify_intent
 from app.services.ia_service import (
     ask_mistral_with_context,
     summarize_pdf,
@@ -26,7 +27,6 @@ from app.services.ia_service import (
     get_suggested_titles,
     format_topics_inline,
 )
-HELP_PAT = re.compile(r"(con\s*qué|en\s*qué)\s+(me\s+)?puedes\s+ayudar|qué\s+puedes\s+hacer|capacidades|ayuda", re.I)
 PDF_OVERVIEW_PAT = re.compile(r"(qué|que)\s+informaci[oó]n\s+.*(hay|encontrar[eé])\s+en\s+el\s+documento\s+de\s+(.+?\.pdf)", re.I)
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -38,34 +38,21 @@ def get_db():
     finally:
         db.close()
 
-# --- Intent routing patterns -----------------------------------------
-GREETING_PAT = re.compile(
-    r"^\s*(hola|holi|hey|qué tal|que tal|buenas|buenos días|buenas tardes|buenas noches)\b",
-    re.I
-)
-
 # --- Plain LLM call for small talk (no RAG) --------------------------
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
-OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME", "mistral")
+FREEFORM_FALLBACK = "¡Hola! Soy el asistente de Remaxi, inmobiliaria de venta y alquiler. ¿En qué propiedad puedo ayudarte?"
 
-def llm_freeform(prompt: str) -> str:
+def llm_freeform(prompt: str, request_class: str = "smalltalk") -> str:
     """
     Plain LLM call without RAG for small talk / UX niceties.
-    Keep it short and helpful.
+    Keep it short and helpful. Shares the static instruction prefix with RAG prompts;
+    the model comes from the shared routing config (llm_client.MODEL_ROUTES).
     """
-    sys = "Soy el asistente de Remaxi, inmobiliaria en español especializada en venta y alquiler de propiedades, cordial y breve."
-    final = f"{sys}\n\nInstrucción del usuario: {prompt}\nRespuesta:"
+    body = f"Tono: cordial y breve.\n\nInstrucción del usuario: {prompt}\nRespuesta:"
     try:
-        resp = requests.post(
-            OLLAMA_API_URL,
-            json={"model": OLLAMA_MODEL_NAME, "prompt": final, "stream": False},
-            timeout=60,
-        )
-        if resp.status_code != 200:
-            return "¡Hola! Soy el asistente de Remaxi, inmobiliaria de venta y alquiler. ¿En qué propiedad puedo ayudarte?"
-        return resp.json().get("response", "").strip() or "¡Hola! Soy el asistente de Remaxi, inmobiliaria de venta y alquiler. ¿En qué propiedad puedo ayudarte?"
-    except requests.RequestException:
-        return "¡Hola! Soy el asistente de Remaxi, inmobiliaria de venta y alquiler. ¿En qué propiedad puedo ayudarte?"
+        data = llm_client.generate(model_for(request_class), body, timeout=60)
+        return data.get("response", "").strip() or FREEFORM_FALLBACK
+    except LLMError:
+        return FREEFORM_FALLBACK
 
 # --- Routes -----------------------------------------------------------
 
@@ -104,8 +91,9 @@ def send_question(data: ChatRequest, db: Session = Depends(get_db)):
 
     user_text = (data.question or "").strip()
 
-    # 3) Intent routing
-    if GREETING_PAT.search(user_text):
+    # 3) Intent routing (shared classifier, see app/services/intent.py)
+    intent = classify_intent(user_text)["intent"]
+    if intent == "greeting":
         # Small talk + sugerencias suaves (opcionales)
         titles = get_suggested_titles(user_text, max_suggestions=4)
         topics_line = format_topics_inline(titles, max_items=4)
@@ -116,7 +104,7 @@ def send_question(data: ChatRequest, db: Session = Depends(get_db)):
         )
         answer = llm_freeform(prompt)
 
-    elif HELP_PAT.search(user_text):
+    elif intent == "help":
         # Freeform con capacidades y sugerencias, sin internals ni métricas
         titles = get_suggested_titles(user_text, max_suggestions=5)
         topics_line = format_topics_inline(titles, max_items=5)
@@ -126,7 +114,7 @@ def send_question(data: ChatRequest, db: Session = Depends(get_db)):
             + (f"Luego sugiere continuar por temas como: {topics_line}. " if topics_line else "")
             + "Cierra con: '¿Sobre qué propiedad en venta o alquiler te gustaría saber más?'"
         )
-        answer = llm_freeform(prompt)
+        answer = llm_freeform(prompt, request_class="help")
 
     else:
         # Knowledge path → RAG
@@ -161,7 +149,7 @@ def send_question(data: ChatRequest, db: Session = Depends(get_db)):
                     + (f"Propón continuar con propiedades como: {topics_line}. " if topics_line else "")
                     + "Termina con una pregunta corta sobre qué propiedad en venta o alquiler le interesa."
                 )
-                answer = llm_freeform(prompt)
+                answer = llm_freeform(prompt, request_class="help")
 
     # 4) Persist message
     new_msg = Message(
@@ -1,7 +1,10 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import Base, engine
 from app.api import chat_router, debug_router
+from app.services.llm_client import log_model_residency
 
 app = FastAPI(
     title="Asistente Virtual Mawell",
@@ -27,4 +30,10 @@ def read_root():
 
 
 app.include_router(chat_router)
-app.include_router(debug_router)
\ No newline at end of file
+app.include_router(debug_router)
+
+
+@app.on_event("startup")
+async def check_llm_routing():
+    # Consulta a Ollama en un hilo, sin esperar: no bloquea el arranque
+    app.state.llm_routing_check = asyncio.create_task(asyncio.to_thread(log_model_residency))
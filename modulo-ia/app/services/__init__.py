@@ -1,2 +1,13 @@
-from .ia_service import ask_mistral_with_context
-from .embedding_service import build_vector_index
+# Lazy re-exports: importing app.services (or any submodule) must not pull the
+# indexing stack (fitz, python-docx, psycopg2) or the model stack into every process.
+_LAZY_EXPORTS = {
+    "ask_mistral_with_context": "app.services.ia_service",
+    "build_vector_index": "app.services.embedding_service",
+}
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(module), name)
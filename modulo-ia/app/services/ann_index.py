@@ -0,0 +1,95 @@
+# app/services/ann_index.py
+# ---------------------------------------------------------------------
+# Approximate search indexes built from the exact IndexFlatIP:
+# - The flat index stays the source of truth (create_index writes it,
+#   live property patches edit it); the approximate one is derived
+# - Specs: {"type": "flat"} | {"type": "ivf", "nlist", "nprobe"} |
+#   {"type": "hnsw", "M", "ef_construction", "ef_search"}
+# - The spec comes from data/vector_db/index_config.json, written by
+#   scripts/autotune_index.py (which also sweeps candidate_specs())
+# ---------------------------------------------------------------------
+
+import os
+import json
+import math
+import numpy as np
+from typing import Dict, List
+
+INDEX_CONFIG_FILE = os.getenv("INDEX_CONFIG_FILE", "data/vector_db/index_config.json")
+
+IVF_MIN_POINTS_PER_LIST = 39  # below this faiss k-means training is unreliable
+
+def load_index_config(path: str = INDEX_CONFIG_FILE) -> Dict:
+    """Tuned config ({} when the file does not exist or cannot be read)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ No se pudo leer {path}: {e}")
+        return {}
+
+def describe(spec: Dict) -> str:
+    kind = spec.get("type", "flat")
+    if kind == "ivf":
+        return f"IVF{spec['nlist']},nprobe={spec['nprobe']}"
+    if kind == "hnsw":
+        return f"HNSW{spec['M']},efC={spec.get('ef_construction', 128)},efS={spec['ef_search']}"
+    return "Flat"
+
+def fits(spec: Dict, n_vectors: int) -> bool:
+    """Whether the spec makes sense for a corpus of n_vectors."""
+    if spec.get("type") == "ivf":
+        return n_vectors >= spec["nlist"] * IVF_MIN_POINTS_PER_LIST
+    return True
+
+def build_index(vectors: np.ndarray, spec: Dict):
+    """Build a search index (inner product, positions = row order of `vectors`)."""
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    dim = vectors.shape[1]
+    kind = spec.get("type", "flat")
+    if kind == "ivf":
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, int(spec["nlist"]), faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        index.nprobe = int(spec["nprobe"])
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(spec["M"]), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(spec.get("ef_construction", 128))
+        index.add(vectors)
+        index.hnsw.efSearch = int(spec["ef_search"])
+    else:
+        index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+    return index
+
+def set_search_params(index, spec: Dict):
+    """Apply the query-time knob of a spec to an index built with the same structure."""
+    if spec.get("type") == "ivf":
+        index.nprobe = int(spec["nprobe"])
+    elif spec.get("type") == "hnsw":
+        index.hnsw.efSearch = int(spec["ef_search"])
+
+def candidate_specs(n_vectors: int) -> List[List[Dict]]:
+    """
+    Sweep grid grouped by build: each inner list shares one built structure and
+    only varies the search parameter (nprobe / efSearch).
+    """
+    groups: List[List[Dict]] = [[{"type": "flat"}]]
+
+    base = max(1, int(math.sqrt(n_vectors)))
+    nlists = sorted({2 ** round(math.log2(base * f)) for f in (0.5, 1, 2, 4)})
+    for nlist in nlists:
+        if nlist < 2 or not fits({"type": "ivf", "nlist": nlist}, n_vectors):
+            continue
+        groups.append([{"type": "ivf", "nlist": nlist, "nprobe": p}
+                       for p in (1, 2, 4, 8, 16, 32, 64, 128) if p <= nlist])
+
+    for m in (16, 32):
+        groups.append([{"type": "hnsw", "M": m, "ef_construction": 128, "ef_search": ef}
+                       for ef in (16, 32, 64, 128, 256)])
+    return groups
@@ -0,0 +1,162 @@
+# app/services/cache_warmer.py
+# ---------------------------------------------------------------------
+# Response cache warming from the query log:
+# - After startup, and after live property patches empty the response
+#   cache, the CACHE_WARM_TOP_N most frequent questions (query_log) are
+#   answered through the normal pipeline (ask_mistral_with_context), so
+#   the busiest questions are cached before clients ask them again
+# - Warmed answers live CACHE_WARM_TTL_S (not the 10 min of live ones) and
+#   are refreshed every CACHE_WARM_INTERVAL_S, so they are still there at
+#   the next peak hour
+# - Low priority: one background thread at a lowered OS priority that
+#   waits while live queries are in flight, stops at CACHE_WARM_BUDGET_S
+#   and as soon as the LLM circuit opens
+# - Runs as metrics.background_work("cache_warmer"): its calls stay out of
+#   the live stage histograms, LLM token counters and circuit breaker
+# ---------------------------------------------------------------------
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.services.circuit_breaker import CLOSED
+from app.services.metrics import CACHE_WARM_TOTAL, background_work
+from app.services.query_log import top_queries
+
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED", "true").lower() == "true"
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+CACHE_WARM_BUDGET_S = float(os.getenv("CACHE_WARM_BUDGET_S", "120"))
+CACHE_WARM_DEBOUNCE_S = float(os.getenv("CACHE_WARM_DEBOUNCE_S", "30"))  # after a cache clear: let patch bursts settle
+CACHE_WARM_NICE = int(os.getenv("CACHE_WARM_NICE", "10"))
+CACHE_WARM_TTL_S = float(os.getenv("CACHE_WARM_TTL_S", "7200"))  # lifetime of warmed answers in the response cache
+# Periodic re-warm (0 = off). At half the TTL every warmed answer is refreshed before it expires
+CACHE_WARM_INTERVAL_S = float(os.getenv("CACHE_WARM_INTERVAL_S", str(CACHE_WARM_TTL_S / 2)))
+
+_IDLE_POLL_S = 0.05
+
+# --- Live traffic gate ---------------------------------------------------
+
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+@contextmanager
+def live_request():
+    """Wrap every live query: the warmer only works while none is in flight."""
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+
+def _wait_idle(deadline: float) -> bool:
+    """Block while live queries run. False when the budget ran out or the warmer is stopping."""
+    while _inflight > 0:
+        if time.time() >= deadline or _stopping:
+            return False
+        time.sleep(_IDLE_POLL_S)
+    return time.time() < deadline and not _stopping
+
+# --- Warming -------------------------------------------------------------
+
+_cond = threading.Condition()
+_thread: Optional[threading.Thread] = None
+_due: Optional[float] = None
+_reason = ""
+_stopping = False
+_last_run: Optional[Dict] = None
+
+def warm_once(reason: str, top_n: int = CACHE_WARM_TOP_N, budget_s: float = CACHE_WARM_BUDGET_S) -> Dict:
+    """Replay the top questions through the RAG pipeline until done or out of budget."""
+    global _last_run
+    from app.services import ia_service
+
+    t0 = time.time()
+    deadline = t0 + budget_s
+    entries = top_queries(top_n)
+    counts = {"warmed": 0, "cached": 0, "failed": 0}
+    stopped = None
+    for entry in entries:
+        if not _wait_idle(deadline):
+            stopped = "stopping" if _stopping else "budget"
+            break
+        if ia_service.get_llm_breaker().state() != CLOSED:
+            stopped = "llm_unavailable"
+            break
+        try:
+            with background_work("cache_warmer"):
+                result = ia_service.ask_mistral_with_context(entry["query"], "", entry["to_phone"])
+        except Exception as e:
+            print(f"⚠️ Precalentamiento: error en '{entry['query'][:40]}': {e}")
+            result = {"degraded": True}
+        kind = "cached" if result.get("from_cache") else "failed" if result.get("degraded") else "warmed"
+        counts[kind] += 1
+        CACHE_WARM_TOTAL.inc(result=kind)
+
+    elapsed = time.time() - t0
+    _last_run = {"reason": reason, "candidates": len(entries), **counts, "stopped": stopped,
+                 "seconds": round(elapsed, 1), "finished_at": time.time()}
+    if entries:
+        print(f"🔥 Cache precalentado ({reason}): {counts['warmed']} nuevas, {counts['cached']} ya en cache, "
+              f"{counts['failed']} fallidas de {len(entries)} en {elapsed:.1f}s"
+              + (f" (detenido: {stopped})" if stopped else ""))
+    return _last_run
+
+def _lower_priority():
+    # Linux schedules threads individually: this lowers only the warmer thread
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), CACHE_WARM_NICE)
+    except (AttributeError, OSError):
+        pass
+
+def _run():
+    global _due, _reason
+    _lower_priority()
+    while True:
+        with _cond:
+            while not _stopping and (_due is None or _due > time.time()):
+                _cond.wait(None if _due is None else _due - time.time())
+            if _stopping:
+                return
+            reason, _due = _reason, None
+        try:
+            warm_once(reason)
+        except Exception as e:
+            print(f"⚠️ Precalentamiento de cache fallido ({reason}): {e}")
+        with _cond:
+            if _due is None and CACHE_WARM_INTERVAL_S > 0:
+                _due, _reason = time.time() + CACHE_WARM_INTERVAL_S, "periodic"
+
+def start_cache_warmer():
+    """Accept schedule_warm calls again after stop_cache_warmer (server startup)."""
+    global _stopping
+    with _cond:
+        _stopping = False
+
+def schedule_warm(reason: str, delay: float = 0.0):
+    """Warm after `delay` seconds; a new call before then moves the run (debounce). No-op once stopped."""
+    global _thread, _due, _reason
+    if not CACHE_WARM_ENABLED:
+        return
+    with _cond:
+        if _stopping:
+            return
+        _due, _reason = time.time() + delay, reason
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="cache-warmer", daemon=True)
+            _thread.start()
+        _cond.notify()
+
+def stop_cache_warmer():
+    global _stopping
+    with _cond:
+        _stopping = True
+        _cond.notify()
+
+def warmer_stats() -> Dict:
+    return {"enabled": CACHE_WARM_ENABLED, "pending": _due is not None, "interval_s": CACHE_WARM_INTERVAL_S,
+            "last_run": _last_run}
@@ -0,0 +1,155 @@
+# app/services/circuit_breaker.py
+# ---------------------------------------------------------------------
+# Latency-aware circuit breaker for LLM calls:
+# - CLOSED: calls go through; the last LLM_BREAKER_WINDOW outcomes are kept
+#   (error or latency above LLM_BREAKER_SLOW_MS)
+# - OPEN: too many errors or slow calls in the window → callers skip the
+#   LLM (and the retrieval that only feeds it) and answer from
+#   precomputed fallbacks for LLM_BREAKER_OPEN_SEC
+# - HALF_OPEN: after the cool-down a few probe calls go through; a fast
+#   success closes the circuit, an error or slow call reopens it
+# ---------------------------------------------------------------------
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from app.services.metrics import register_gauge
+
+# Optional: load environment if not done elsewhere
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+_DEFAULT_SLOW_MS = 0.8 * 1000 * float(os.getenv("OLLAMA_TIMEOUT_SEC", "10"))
+
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))  # errores + lentas
+LLM_BREAKER_SLOW_MS = float(os.getenv("LLM_BREAKER_SLOW_MS", str(_DEFAULT_SLOW_MS)))
+LLM_BREAKER_OPEN_SEC = float(os.getenv("LLM_BREAKER_OPEN_SEC", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitBreaker:
+    """Counts errors and slow calls over a sliding window of recent calls."""
+
+    def __init__(self, window: int = LLM_BREAKER_WINDOW, min_calls: int = LLM_BREAKER_MIN_CALLS,
+                 failure_rate: float = LLM_BREAKER_FAILURE_RATE, slow_ms: float = LLM_BREAKER_SLOW_MS,
+                 open_sec: float = LLM_BREAKER_OPEN_SEC, half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES,
+                 enabled: bool = LLM_BREAKER_ENABLED):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_ms = slow_ms
+        self.open_sec = open_sec
+        self.half_open_probes = max(1, half_open_probes)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window)  # True = bad outcome (error or slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_sec
+
+    def rejecting(self) -> bool:
+        """True while callers should not even try (no slot reserved; see allow_request)."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._state == OPEN:
+                return not self._cooled_down()
+            if self._state == HALF_OPEN:
+                return self._probes >= self.half_open_probes
+            return False
+
+    def allow_request(self) -> bool:
+        """Reserve a call. Must be followed by record_success / record_failure when True."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == OPEN and self._cooled_down():
+                self._state = HALF_OPEN
+                self._probes = 0
+                print("🟡 Circuito LLM semiabierto: probando Ollama")
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def _open(self, reason: str):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self._stats["opened"] += 1
+        print(f"🔴 Circuito LLM abierto ({reason}); respuestas de respaldo por {self.open_sec:g}s")
+
+    def _record(self, bad: bool, reason: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if bad:
+                    self._open(f"sonda fallida: {reason}")
+                else:
+                    self._state = CLOSED
+                    self._window.clear()
+                    print("🟢 Circuito LLM cerrado: Ollama responde de nuevo")
+                return
+            if self._state == OPEN:
+                return  # late result of a call started before opening
+            self._window.append(bad)
+            if len(self._window) >= self.min_calls:
+                rate = sum(self._window) / len(self._window)
+                if rate >= self.failure_rate:
+                    self._open(f"{rate:.0%} de llamadas con error o lentas, {reason}")
+
+    def record_success(self, latency_ms: float):
+        slow = latency_ms >= self.slow_ms
+        self._record(slow, f"última {latency_ms:.0f} ms")
+
+    def record_failure(self, error: Optional[Exception] = None):
+        self._record(True, f"error: {error}" if error else "error")
+
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "state": self._state,
+                "window_calls": len(self._window),
+                "window_bad": sum(self._window),
+                "slow_ms": self.slow_ms,
+            }
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+def get_llm_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+register_gauge("ia_llm_breaker_open", "1 while the LLM circuit breaker rejects calls (open or probing)",
+               lambda: 0 if get_llm_breaker().state() == CLOSED else 1)
@@ -0,0 +1,126 @@
+# app/services/context_compressor.py
+# ---------------------------------------------------------------------
+# Query-focused sentence extraction (between retrieval and prompt build):
+# - Each retrieved chunk is split into sentences/lines
+# - Sentence embeddings are cached per chunk (LRU), so repeated chunks
+#   (DB listings, popular brochure pages) are encoded once
+# - Sentences are scored against the query embedding retrieval already
+#   computed; only the top ones survive, in their original order
+# - "PALABRAS CLAVE" blocks are dropped and sentences repeated across
+#   chunks (PDF chunk overlaps) are kept once
+# Fewer prompt tokens → less prompt-eval time on the CPU-bound Ollama.
+# ---------------------------------------------------------------------
+
+import os
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from app.services.text_preprocess import split_sentences
+
+COMPRESS_CONTEXT_ENABLED = os.getenv("COMPRESS_CONTEXT_ENABLED", "true").lower() == "true"
+COMPRESS_TOP_SENTENCES = int(os.getenv("COMPRESS_TOP_SENTENCES", "4"))
+COMPRESS_MIN_SENTENCE_SIM = float(os.getenv("COMPRESS_MIN_SENTENCE_SIM", "0.15"))
+COMPRESS_CACHE_SIZE = int(os.getenv("COMPRESS_CACHE_SIZE", "2048"))  # chunks
+
+# Sections that only exist to help retrieval; never worth prompt tokens
+_BOILERPLATE_HEADERS = ("PALABRAS CLAVE",)
+
+_cache: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _content_sentences(text: str) -> List[str]:
+    """Sentences of a chunk, minus section headers and boilerplate sections (dropped to the end)."""
+    out = []
+    for sent in split_sentences(text):
+        header = sent.rstrip(":").strip()
+        if header.upper() in _BOILERPLATE_HEADERS:
+            break
+        if sent.endswith(":") and header.isupper():
+            continue  # bare section header ("CONTACTO:"), carries no facts
+        out.append(sent)
+    return out
+
+def _cache_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def _sentence_embeddings(texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> List[Tuple[List[str], np.ndarray]]:
+    """
+    (sentences, L2-normalized embeddings) per chunk, from the LRU cache when possible.
+    All cache misses are encoded in a single batch.
+    """
+    keys = [_cache_key(t) for t in texts]
+    found: Dict[str, Tuple[List[str], np.ndarray]] = {}
+    with _cache_lock:
+        for k in keys:
+            hit = _cache.get(k)
+            if hit is not None:
+                _cache.move_to_end(k)
+                found[k] = hit
+        _stats["hits"] += len(found)
+
+    missing = {k: _content_sentences(t) for k, t in zip(keys, texts) if k not in found}
+    flat = [sent for sentences in missing.values() for sent in sentences]
+    if flat:
+        emb = np.asarray(encode(flat), dtype="float32")
+        emb = emb / (np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12)
+    offset = 0
+    for k, sentences in missing.items():
+        found[k] = (sentences, emb[offset:offset + len(sentences)] if sentences else np.zeros((0, 0), dtype="float32"))
+        offset += len(sentences)
+
+    if missing:
+        with _cache_lock:
+            _stats["misses"] += len(missing)
+            for k in missing:
+                _cache[k] = found[k]
+            while len(_cache) > COMPRESS_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return [found[k] for k in keys]
+
+def compress_chunks(query_vec: np.ndarray, chunks: List[Tuple[str, float, Dict]],
+                    encode: Callable[[List[str]], np.ndarray],
+                    top_sentences: int = COMPRESS_TOP_SENTENCES) -> Tuple[List[Tuple[str, float, Dict]], Dict]:
+    """
+    Keep, per chunk, the first line (identifies the listing/section) plus the
+    top_sentences most similar to the query. query_vec: normalized (1, d) or (d,).
+    Returns (compressed chunks, stats).
+    """
+    q = np.asarray(query_vec, dtype="float32").reshape(-1)
+    seen = set()
+    out = []
+    chars_in = chars_out = 0
+
+    embedded = _sentence_embeddings([text for text, _, _ in chunks], encode)
+    for (text, sim, meta), (sentences, emb) in zip(chunks, embedded):
+        chars_in += len(text)
+        if not sentences:
+            continue
+
+        scores = emb @ q
+        ranked = [i for i in np.argsort(-scores) if i != 0 and scores[i] >= COMPRESS_MIN_SENTENCE_SIM]
+        keep = sorted({0, *ranked[:top_sentences]})
+
+        kept = []
+        for i in keep:
+            norm = " ".join(sentences[i].lower().split())
+            if norm in seen:
+                continue  # repeated in a previous chunk (PDF overlaps)
+            seen.add(norm)
+            kept.append(sentences[i])
+        if not kept:
+            continue
+
+        compressed = "\n".join(kept)
+        chars_out += len(compressed)
+        out.append((compressed, sim, meta))
+
+    stats = {"chars_in": chars_in, "chars_out": chars_out, "chunks_in": len(chunks), "chunks_out": len(out)}
+    return out, stats
+
+def get_compressor_stats() -> Dict:
+    with _cache_lock:
+        return {**_stats, "cached_chunks": len(_cache)}
@@ -0,0 +1,136 @@
+# app/services/context_packer.py
+# ---------------------------------------------------------------------
+# Token-budgeted context packing for Ollama prompts:
+# - Budget = num_ctx - num_predict - fixed prompt parts - safety margin
+# - Chunks fill the budget by descending similarity
+# - The chunk that doesn't fit is trimmed at a sentence boundary
+# - Per-request stats: tokens used / dropped, chunks used / trimmed / dropped
+# - Tokens are counted with a real tokenizer (use_tokenizer: the embedding
+#   model's, already loaded), cached per chunk text. It is not the Ollama
+#   model's vocabulary, so counts are scaled by PROMPT_TOKEN_SCALE and the
+#   safety margin stays; until a tokenizer is set, chars / PROMPT_CHARS_PER_TOKEN
+# Ollama silently drops prompt tokens beyond num_ctx, so anything we don't
+# pack here would cost prompt-eval time without ever reaching the model.
+# ---------------------------------------------------------------------
+
+import os
+import re
+import copy
+import math
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Chars per LLM token for Spanish text (fallback without tokenizer); deliberately low so estimates err on the long side
+PROMPT_CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", "3.0"))
+# LLM tokens per embedding-tokenizer token: the generation models split Spanish more finely
+PROMPT_TOKEN_SCALE = float(os.getenv("PROMPT_TOKEN_SCALE", "1.3"))
+CONTEXT_TOKEN_CACHE_SIZE = int(os.getenv("CONTEXT_TOKEN_CACHE_SIZE", "4096"))
+CONTEXT_SAFETY_TOKENS = int(os.getenv("CONTEXT_SAFETY_TOKENS", "16"))
+CONTEXT_CHUNK_MAX_CHARS = int(os.getenv("CONTEXT_CHUNK_MAX_CHARS", "800"))
+MIN_TRIMMED_CHARS = 60  # a trimmed fragment shorter than this isn't worth its tokens
+
+_SENTENCE_END_RE = re.compile(r"[.!?;:\n]")
+
+_token_counter: Optional[Callable[[str], int]] = None
+
+def use_tokenizer(tokenizer):
+    """
+    Count tokens with a HuggingFace-style tokenizer (encode(text, add_special_tokens)).
+    A private copy is used under a lock: fast tokenizers fail when shared across
+    threads while the embedding model reconfigures truncation on the original.
+    """
+    global _token_counter
+    try:
+        own = copy.deepcopy(tokenizer)
+    except Exception as e:
+        print(f"⚠️ Tokenizador no disponible para el presupuesto de contexto ({e}); se estima por caracteres")
+        return
+    lock = threading.Lock()
+
+    def count(text: str) -> int:
+        with lock:
+            return len(own.encode(text, add_special_tokens=False))
+
+    _token_counter = count
+    _chunk_tokens.cache_clear()
+
+def estimate_tokens(text: str) -> int:
+    """Tokens of text for the generation model (see use_tokenizer; chars-based until one is set)."""
+    if not text:
+        return 0
+    counter = _token_counter
+    if counter is None:
+        return math.ceil(len(text) / PROMPT_CHARS_PER_TOKEN)
+    return math.ceil(counter(text) * PROMPT_TOKEN_SCALE)
+
+@lru_cache(maxsize=CONTEXT_TOKEN_CACHE_SIZE)
+def _chunk_tokens(text: str) -> int:
+    """estimate_tokens for retrieved chunks, which repeat across requests."""
+    return estimate_tokens(text)
+
+def trim_to_sentence(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars, ending at the last sentence boundary inside the limit."""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    cut = None
+    for m in _SENTENCE_END_RE.finditer(head):
+        cut = m.end()
+    if cut is None:
+        # no boundary: fall back to the last whole word
+        cut = head.rfind(" ")
+        if cut <= 0:
+            return ""
+    return head[:cut].strip()
+
+def context_budget(num_ctx: int, num_predict: int, fixed_prompt: str) -> int:
+    """Tokens left for context once the answer and the fixed prompt parts are reserved."""
+    return max(0, num_ctx - num_predict - estimate_tokens(fixed_prompt) - CONTEXT_SAFETY_TOKENS)
+
+def pack_context(chunks: List[Tuple[str, float, Dict]], budget_tokens: int,
+                 max_chunk_chars: int = CONTEXT_CHUNK_MAX_CHARS) -> Tuple[List[Tuple[str, float, Dict]], Dict]:
+    """
+    Select and trim (text, similarity, meta) chunks to fit budget_tokens.
+    Returns (packed chunks in similarity order, stats).
+    """
+    packed = []
+    remaining = budget_tokens
+    stats = {
+        "budget_tokens": budget_tokens,
+        "used_tokens": 0,
+        "dropped_tokens": 0,
+        "chunks_used": 0,
+        "chunks_trimmed": 0,
+        "chunks_dropped": 0,
+    }
+
+    for text, sim, meta in sorted(chunks, key=lambda c: c[1], reverse=True):
+        full = text.strip()
+        full_tokens = _chunk_tokens(full)
+        piece = trim_to_sentence(full, max_chunk_chars)
+        cost = _chunk_tokens(piece) + 1  # "• " bullet + newline
+
+        # Trim to the room left using this chunk's own chars per token (numbers and
+        # prices tokenize very differently from prose); a few passes converge
+        if cost > remaining:
+            for _ in range(3):
+                chars_per_token = len(piece) / max(1, cost - 1)
+                piece = trim_to_sentence(piece, int((remaining - 1) * chars_per_token))
+                cost = _chunk_tokens(piece) + 1
+                if cost <= remaining or len(piece) < MIN_TRIMMED_CHARS:
+                    break
+            if len(piece) < MIN_TRIMMED_CHARS or cost > remaining:
+                stats["chunks_dropped"] += 1
+                stats["dropped_tokens"] += full_tokens
+                continue
+
+        if len(piece) < len(full):
+            stats["chunks_trimmed"] += 1
+        stats["dropped_tokens"] += full_tokens - _chunk_tokens(piece)
+        stats["used_tokens"] += cost
+        stats["chunks_used"] += 1
+        remaining -= cost
+        packed.append((piece, sim, meta))
+
+    return packed, stats
@@ -7,15 +7,95 @@ Optimizado para rendimiento en consultas RAG
 import os
 import threading
 import time
-from typing import List, Dict, Optional
+import itertools
+from typing import List, Dict, Optional, Iterator
 import psycopg2
 from psycopg2 import pool
 from datetime import datetime, timedelta
+from app.utils.structured_log import detail
 
 # Configuración del pool
 DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "1"))
 DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "5"))
 CACHE_TTL_SECONDS = int(os.getenv("PROPERTIES_CACHE_TTL", "300"))  # 5 minutos
+CACHE_SWR_ENABLED = os.getenv("PROPERTIES_CACHE_SWR", "true").lower() == "true"  # servir datos vencidos mientras se refresca
+CACHE_MAX_STALE_SECONDS = int(os.getenv("PROPERTIES_CACHE_MAX_STALE", "3600"))  # más allá de esto se refresca bloqueando
+CACHE_REFRESH_AHEAD_SECONDS = int(os.getenv("PROPERTIES_CACHE_REFRESH_AHEAD", "0"))  # refresco proactivo antes de vencer (0 = off)
+PROPERTIES_ITERSIZE = int(os.getenv("PROPERTIES_ITERSIZE", "500"))  # filas por round-trip del cursor de servidor
+
+_cursor_seq = itertools.count(1)
+
+# Query to get all property information (shared by cache, indexer and listener)
+PROPERTIES_QUERY = """
+    SELECT 
+        p.id,
+        p.nombre_propiedad,
+        tp.nombre as tipo_propiedad,
+        p.descripcion,
+        p.ubicacion,
+        COALESCE(p.precio_venta, p.precio_alquiler) as precio,
+        to_op.nombre as tipo_operacion,
+        ep.nombre as estado_propiedad,
+        p.superficie,
+        p.dimensiones,
+        u.nombre || ' ' || u.apellido as agente,
+        u.telefono as telefono_agente
+    FROM Propiedad p
+    INNER JOIN TipoPropiedad tp ON p.tipo_propiedad_id = tp.id
+    INNER JOIN EstadoPropiedad ep ON p.estado_propiedad_id = ep.id
+    INNER JOIN TipoOperacion to_op ON p.tipo_operacion_id = to_op.id
+    INNER JOIN Usuario u ON p.usuario_id = u.id
+    WHERE p.estado = 1{where}
+    ORDER BY p.id
+"""
+
+def build_property_doc(row) -> Dict:
+    """Build the {"text", "meta"} doc used for vectorization from a PROPERTIES_QUERY row"""
+    prop_id, nombre, tipo, descripcion, ubicacion, precio, operacion, estado, superficie, dimensiones, agente, telefono = row
+    
+    # Create comprehensive text for vectorization
+    precio_str = f"${float(precio):,.0f}" if precio else "Precio por consultar"
+    
+    full_text = f"""
+PROPIEDAD REMAXI #{prop_id}: {nombre or f'Propiedad {prop_id}'}
+
+INFORMACIÓN BÁSICA:
+- Tipo: {tipo} para {operacion}
+- Estado: {estado}
+- Ubicación: {ubicacion}
+- Precio: {precio_str}
+- Superficie: {superficie or 'No especificada'}
+- Dimensiones: {dimensiones or 'No especificadas'}
+
+DESCRIPCIÓN:
+{descripcion or 'Sin descripción disponible'}
+
+CONTACTO:
+- Agente responsable: {agente}
+- Teléfono: {telefono}
+
+PALABRAS CLAVE:
+{tipo.lower()}, {operacion.lower()}, {ubicacion.lower()}, propiedad, inmobiliaria, remaxi, {nombre.lower() if nombre else ''}
+    """.strip()
+    
+    return {
+        'text': full_text,
+        'meta': {
+            'source_type': 'database',
+            'property_id': prop_id,
+            'nombre': nombre,
+            'tipo': tipo,
+            'ubicacion': ubicacion,
+            'precio': float(precio) if precio else 0,
+            'operacion': operacion,
+            'estado': estado,
+            'agente': agente,
+            'telefono': telefono,
+            'pdf': f'BD_Propiedad_{prop_id}',  # For compatibility with existing system
+            'title': f'{tipo} en {ubicacion}',
+            'page_start': 1
+        }
+    }
 
 class DatabaseConnectionPool:
     def __init__(self):
@@ -23,6 +103,17 @@ class DatabaseConnectionPool:
         self._cache = {}
         self._cache_timestamp = None
         self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # single DB refresh at a time, readers keep going
+        self._metrics = {
+            'refresh_count': 0,
+            'refresh_errors': 0,
+            'background_refreshes': 0,
+            'last_refresh_duration_s': None,
+            'max_refresh_duration_s': 0.0,
+            'stale_served': 0,
+            'last_staleness_age_s': None,
+            'max_staleness_age_s': 0.0,
+        }
         self._init_pool()
     
     def _init_pool(self):
@@ -54,6 +145,12 @@ class DatabaseConnectionPool:
             print(f"❌ Error inicializando pool de conexiones: {e}")
             self._pool = None
     
+    def _cache_age(self) -> Optional[float]:
+        """Seconds since the last successful refresh (None if never loaded)"""
+        if self._cache_timestamp is None:
+            return None
+        return (datetime.now() - self._cache_timestamp).total_seconds()
+    
     def _is_cache_valid(self) -> bool:
         """Check if cache is still valid"""
         if self._cache_timestamp is None:
@@ -62,120 +159,133 @@ class DatabaseConnectionPool:
         return datetime.now() - self._cache_timestamp < timedelta(seconds=CACHE_TTL_SECONDS)
     
     def get_properties(self) -> List[Dict]:
-        """Get properties with caching"""
+        """
+        Get properties with caching.
+        Fresh hits return immediately (optionally kicking a refresh-ahead); with
+        stale-while-revalidate, expired data is still served for up to
+        PROPERTIES_CACHE_MAX_STALE seconds while a single background refresh runs.
+        """
         with self._lock:
-            # Check cache first
-            if self._is_cache_valid() and 'properties' in self._cache:
-                print(f"🚀 Usando cache de propiedades ({len(self._cache['properties'])} propiedades)")
-                return self._cache['properties']
-            
-            # Cache miss - fetch from database
+            age = self._cache_age()
+            if age is not None and 'properties' in self._cache:
+                properties = self._cache['properties']
+                
+                # Check cache first
+                if age < CACHE_TTL_SECONDS:
+                    if CACHE_REFRESH_AHEAD_SECONDS and age >= CACHE_TTL_SECONDS - CACHE_REFRESH_AHEAD_SECONDS:
+                        self._refresh_in_background()
+                    detail("Cache de propiedades", properties=len(properties))
+                    return properties
+                
+                # Expired but still usable - serve stale, revalidate once in background
+                staleness = age - CACHE_TTL_SECONDS
+                if CACHE_SWR_ENABLED and staleness < CACHE_MAX_STALE_SECONDS:
+                    self._metrics['stale_served'] += 1
+                    self._metrics['last_staleness_age_s'] = round(staleness, 3)
+                    self._metrics['max_staleness_age_s'] = max(self._metrics['max_staleness_age_s'], round(staleness, 3))
+                    self._refresh_in_background()
+                    return properties
+        
+        # Cache miss - fetch from database without blocking cache readers
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited
+            with self._lock:
+                if self._is_cache_valid() and 'properties' in self._cache:
+                    return self._cache['properties']
             return self._fetch_properties_from_db()
     
+    def _refresh_in_background(self):
+        """Start a refresh thread unless one is already running (caller holds self._lock)"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        
+        def _run():
+            try:
+                self._fetch_properties_from_db()
+            finally:
+                self._refresh_lock.release()
+        
+        self._metrics['background_refreshes'] += 1
+        threading.Thread(target=_run, name="properties-cache-refresh", daemon=True).start()
+    
+    def iter_properties(self, itersize: int = PROPERTIES_ITERSIZE) -> Iterator[Dict]:
+        """
+        Stream property docs through a named (server-side) cursor, `itersize` rows per
+        round-trip, so neither the rows nor the formatted texts are materialized at once.
+        Holds one pooled connection until the generator is exhausted or closed.
+        """
+        if self._pool is None:
+            raise RuntimeError("Pool de conexiones no disponible")
+        
+        conn = self._pool.getconn()
+        try:
+            cursor = conn.cursor(name=f"remaxi_propiedades_{next(_cursor_seq)}")
+            cursor.itersize = itersize
+            cursor.execute(PROPERTIES_QUERY.format(where=""))
+            for row in cursor:
+                yield build_property_doc(row)
+            cursor.close()
+        finally:
+            conn.rollback()  # ends the read transaction that owns the named cursor
+            self._pool.putconn(conn)
+    
     def _fetch_properties_from_db(self) -> List[Dict]:
-        """Fetch properties from database and update cache"""
+        """Fetch properties from database (streamed) and swap them into the cache"""
         if self._pool is None:
             print("❌ Pool de conexiones no disponible")
             return []
         
-        conn = None
+        start_time = time.time()
         try:
-            conn = self._pool.getconn()
-            cursor = conn.cursor()
-            
-            # Query to get all property information
-            query = """
-                SELECT 
-                    p.id,
-                    p.nombre_propiedad,
-                    tp.nombre as tipo_propiedad,
-                    p.descripcion,
-                    p.ubicacion,
-                    COALESCE(p.precio_venta, p.precio_alquiler) as precio,
-                    to_op.nombre as tipo_operacion,
-                    ep.nombre as estado_propiedad,
-                    p.superficie,
-                    p.dimensiones,
-                    u.nombre || ' ' || u.apellido as agente,
-                    u.telefono as telefono_agente
-                FROM Propiedad p
-                INNER JOIN TipoPropiedad tp ON p.tipo_propiedad_id = tp.id
-                INNER JOIN EstadoPropiedad ep ON p.estado_propiedad_id = ep.id
-                INNER JOIN TipoOperacion to_op ON p.tipo_operacion_id = to_op.id
-                INNER JOIN Usuario u ON p.usuario_id = u.id
-                WHERE p.estado = 1
-                ORDER BY p.id
-            """
-            
-            start_time = time.time()
-            cursor.execute(query)
-            results = cursor.fetchall()
+            properties = list(self.iter_properties())
             query_time = time.time() - start_time
             
-            cursor.close()
-            
-            properties = []
-            for row in results:
-                prop_id, nombre, tipo, descripcion, ubicacion, precio, operacion, estado, superficie, dimensiones, agente, telefono = row
-                
-                # Create comprehensive text for vectorization
-                precio_str = f"${float(precio):,.0f}" if precio else "Precio por consultar"
-                
-                full_text = f"""
-PROPIEDAD REMAXI #{prop_id}: {nombre or f'Propiedad {prop_id}'}
-
-INFORMACIÓN BÁSICA:
-- Tipo: {tipo} para {operacion}
-- Estado: {estado}
-- Ubicación: {ubicacion}
-- Precio: {precio_str}
-- Superficie: {superficie or 'No especificada'}
-- Dimensiones: {dimensiones or 'No especificadas'}
-
-DESCRIPCIÓN:
-{descripcion or 'Sin descripción disponible'}
-
-CONTACTO:
-- Agente responsable: {agente}
-- Teléfono: {telefono}
-
-PALABRAS CLAVE:
-{tipo.lower()}, {operacion.lower()}, {ubicacion.lower()}, propiedad, inmobiliaria, remaxi, {nombre.lower() if nombre else ''}
-                """.strip()
-                
-                properties.append({
-                    'text': full_text,
-                    'meta': {
-                        'source_type': 'database',
-                        'property_id': prop_id,
-                        'nombre': nombre,
-                        'tipo': tipo,
-                        'ubicacion': ubicacion,
-                        'precio': float(precio) if precio else 0,
-                        'operacion': operacion,
-                        'estado': estado,
-                        'agente': agente,
-                        'telefono': telefono,
-                        'pdf': f'BD_Propiedad_{prop_id}',
-                        'title': f'{tipo} en {ubicacion}',
-                        'page_start': 1
-                    }
-                })
-            
-            # Update cache
-            self._cache['properties'] = properties
-            self._cache_timestamp = datetime.now()
+            # Update cache (only the swap happens under the readers' lock)
+            with self._lock:
+                self._cache['properties'] = properties
+                self._cache_timestamp = datetime.now()
+                self._metrics['refresh_count'] += 1
+                self._metrics['last_refresh_duration_s'] = round(query_time, 3)
+                self._metrics['max_refresh_duration_s'] = max(self._metrics['max_refresh_duration_s'], round(query_time, 3))
             
             print(f"✅ Propiedades cargadas desde BD: {len(properties)} en {query_time:.2f}s - Cache actualizado")
             return properties
             
         except Exception as e:
+            with self._lock:
+                self._metrics['refresh_errors'] += 1
             print(f"❌ Error consultando propiedades: {e}")
             return []
+    
+    def fetch_property(self, prop_id: int) -> Optional[Dict]:
+        """
+        Fetch a single property doc. Returns None when the property is missing or
+        inactive; database errors propagate so callers don't mistake them for deletions.
+        """
+        if self._pool is None:
+            raise RuntimeError("Pool de conexiones no disponible")
         
+        conn = self._pool.getconn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(PROPERTIES_QUERY.format(where=" AND p.id = %s"), (prop_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            return build_property_doc(row) if row else None
         finally:
-            if conn:
-                self._pool.putconn(conn)
+            conn.rollback()  # read-only: don't leave the pooled connection idle in transaction
+            self._pool.putconn(conn)
+    
+    def getconn(self):
+        """Borrow a raw connection from the pool (caller must return it with putconn)"""
+        if self._pool is None:
+            raise RuntimeError("Pool de conexiones no disponible")
+        return self._pool.getconn()
+    
+    def putconn(self, conn, close: bool = False):
+        """Return a connection borrowed with getconn"""
+        if self._pool is not None and conn is not None:
+            self._pool.putconn(conn, close=close)
     
     def clear_cache(self):
         """Clear properties cache (useful for testing or manual refresh)"""
@@ -184,6 +294,26 @@ PALABRAS CLAVE:
             self._cache_timestamp = None
             print("🧹 Cache de propiedades limpiado")
     
+    def invalidate_cache(self):
+        """Mark the cache as expired but keep the data, so readers get stale-while-revalidate"""
+        with self._lock:
+            if self._cache_timestamp is not None:
+                self._cache_timestamp = min(self._cache_timestamp, datetime.now() - timedelta(seconds=CACHE_TTL_SECONDS))
+    
+    def get_cache_metrics(self) -> Dict:
+        """Refresh durations and staleness counters for the properties cache"""
+        with self._lock:
+            age = self._cache_age()
+            return {
+                **self._metrics,
+                'cached_properties': len(self._cache.get('properties', [])),
+                'cache_age_s': round(age, 3) if age is not None else None,
+                'ttl_s': CACHE_TTL_SECONDS,
+                'swr_enabled': CACHE_SWR_ENABLED,
+                'refresh_ahead_s': CACHE_REFRESH_AHEAD_SECONDS,
+                'refreshing': self._refresh_lock.locked(),
+            }
+    
     def __del__(self):
         """Cleanup connection pool"""
         if self._pool:
@@ -204,4 +334,14 @@ def get_db_pool() -> DatabaseConnectionPool:
 
 def get_cached_properties() -> List[Dict]:
     """Convenience function to get cached properties"""
-    return get_db_pool().get_properties()
\ No newline at end of file
+    return get_db_pool().get_properties()
+
+def get_cache_metrics() -> Optional[Dict]:
+    """Properties cache metrics, or None if the pool was never created in this process"""
+    if _db_pool_instance is None:
+        return None
+    return _db_pool_instance.get_cache_metrics()
+
+def iter_properties(itersize: int = PROPERTIES_ITERSIZE) -> Iterator[Dict]:
+    """Convenience generator streaming property docs from the database"""
+    return get_db_pool().iter_properties(itersize)
\ No newline at end of file
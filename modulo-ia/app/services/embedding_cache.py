@@ -0,0 +1,146 @@
+# app/services/embedding_cache.py
+# ---------------------------------------------------------------------
+# Persistent embedding cache for index rebuilds:
+# - Key: sha256(model name + chunk text) → raw float32 vector
+# - One append-only file per model: 16-byte header + fixed-size records
+#   [32-byte key][dim * float32], read back through np.memmap
+# - A torn tail record (crash mid-append) is ignored on load
+# Rebuilds after small edits only run the model on new/changed chunks.
+# ---------------------------------------------------------------------
+
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/vector_db/emb_cache")
+
+_MAGIC = b"RMXEMB01"
+_HEADER_SIZE = 16  # magic (8) + dim uint32 (4) + reserved (4)
+_KEY_SIZE = 32
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(cache_dir, f"{safe}.emb")
+        self._dim: Optional[int] = None
+        self._keys: Dict[bytes, int] = {}
+        self._vectors: Optional[np.ndarray] = None  # memmap view (n, dim)
+        self._loaded_records = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # --- storage ------------------------------------------------------
+
+    def _record_dtype(self, dim: int) -> np.dtype:
+        # raw void keys: an "S" field would strip trailing NUL bytes of the digest
+        return np.dtype([("key", f"V{_KEY_SIZE}"), ("vec", "<f4", (dim,))])
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            header = f.read(_HEADER_SIZE)
+        if len(header) < _HEADER_SIZE or header[:8] != _MAGIC:
+            print(f"Cache de embeddings inválido, se descarta: {self.path}")
+            os.replace(self.path, self.path + ".old")
+            return
+        dim = int(np.frombuffer(header[8:12], dtype="<u4")[0])
+        dtype = self._record_dtype(dim)
+        n = (size - _HEADER_SIZE) // dtype.itemsize
+        self._dim = dim
+        if n == 0:
+            return
+        records = self._map(n)
+        # Later duplicates (if any) win, same as a re-append after a model fix
+        self._keys = {bytes(k): i for i, k in enumerate(records["key"])}
+
+    def _map(self, n: int) -> np.ndarray:
+        records = np.memmap(self.path, dtype=self._record_dtype(self._dim), mode="r", offset=_HEADER_SIZE, shape=(n,))
+        self._vectors = records["vec"]
+        self._loaded_records = n
+        return records
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        dim = vectors.shape[1]
+        dtype = self._record_dtype(dim)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fresh = not os.path.exists(self.path) or os.path.getsize(self.path) < _HEADER_SIZE
+        self._vectors = None  # release the mapping before touching the file (Windows)
+        with open(self.path, "ab") as f:
+            if fresh:
+                f.write(_MAGIC + np.array([dim], dtype="<u4").tobytes() + b"\0" * 4)
+            else:
+                # Drop a torn tail so new records stay aligned
+                usable = _HEADER_SIZE + self._loaded_records * dtype.itemsize
+                if os.path.getsize(self.path) != usable:
+                    f.truncate(usable)
+            rec = np.empty(len(keys), dtype=dtype)
+            rec["key"] = keys
+            rec["vec"] = vectors.astype("<f4", copy=False)
+            f.write(rec.tobytes())
+        start = 0 if fresh else self._loaded_records
+        for i, k in enumerate(keys):
+            self._keys[k] = start + i
+        self._dim = dim
+        self._map(start + len(keys))
+
+    # --- public API ---------------------------------------------------
+
+    def key_for(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def encode(self, model, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """
+        Same contract as model.encode(texts, convert_to_numpy=True) (raw, not normalized),
+        but only texts missing from the cache are sent to the model.
+        """
+        if not texts:
+            return model.encode([], convert_to_numpy=True)
+        with self._lock:
+            keys = [self.key_for(t) for t in texts]
+            missing: Dict[bytes, str] = {}
+            for k, t in zip(keys, texts):
+                if k not in self._keys and k not in missing:
+                    missing[k] = t
+
+            if missing:
+                new_emb = model.encode(list(missing.values()), convert_to_numpy=True, **encode_kwargs)
+                new_emb = np.asarray(new_emb, dtype="float32")
+                if self._dim is not None and new_emb.shape[1] != self._dim:
+                    # Model changed under the same name: start a fresh file
+                    print(f"Dimensión de embeddings cambió ({self._dim} → {new_emb.shape[1]}), reiniciando cache")
+                    self._keys, self._vectors, self._dim, self._loaded_records = {}, None, None, 0
+                    os.replace(self.path, self.path + ".old")
+                self._append(list(missing.keys()), new_emb)
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            rows = [self._keys[k] for k in keys]
+            return np.array(self._vectors[rows], dtype="float32")
+
+    def stats(self) -> dict:
+        return {"path": self.path, "entries": len(self._keys), "dim": self._dim, "hits": self.hits, "misses": self.misses}
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    """Singleton cache per model name"""
+    with _caches_lock:
+        if model_name not in _CACHES:
+            _CACHES[model_name] = EmbeddingCache(model_name)
+        return _CACHES[model_name]
+
+def encode_with_cache(model, model_name: str, texts: List[str]) -> np.ndarray:
+    """Encode texts, consulting the on-disk cache first when EMBEDDING_CACHE_ENABLED"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return model.encode(texts, convert_to_numpy=True)
+    return get_embedding_cache(model_name).encode(model, texts)
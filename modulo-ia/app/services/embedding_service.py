@@ -1,14 +1,14 @@
 # app/services/embedding_service.py
 
 import os
+import json
 import faiss
-import fitz
 import pickle
+import hashlib
 import numpy as np
-import psycopg2
+from contextlib import contextmanager
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Optional
-from docx import Document
+from typing import Callable, List, Dict, Optional, Iterable, Iterator, Tuple
 from datetime import datetime
 
 from app.services.text_preprocess import (
@@ -16,12 +16,34 @@ from app.services.text_preprocess import (
     remove_headers_footers,
     normalize_spaces,
     chunk_title_aware,
+    chunk_token_aware,
+    truncation_stats,
     basic_deduplicate,
+    NearDuplicateIndex,
 )
+from app.services.db_pool import iter_properties, PROPERTIES_ITERSIZE
+from app.services.embedding_cache import encode_with_cache, get_embedding_cache, EMBEDDING_CACHE_ENABLED
+from app.services.vector_store import SOURCES, source_of
 
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "distiluse-base-multilingual-cased-v1")
 INDEX_FILE = os.getenv("VECTOR_DB_INDEX", "data/vector_db/index.faiss")
 DOC_FILE = os.getenv("VECTOR_DB_DOCS", "data/vector_db/docs.pkl")
+DB_INDEX_BATCH_SIZE = int(os.getenv("DB_INDEX_BATCH_SIZE", "256"))  # propiedades por lote de encode
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+CHUNK_MODE = os.getenv("CHUNK_MODE", "chars")  # "chars" (CHUNK_MAX_CHARS) | "tokens" (model max_seq_length)
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "24"))
+# Truncation report: tokenizes every chunk, so by default only in token mode (where it is the before/after check)
+TRUNCATION_REPORT = os.getenv("TRUNCATION_REPORT", "true" if CHUNK_MODE == "tokens" else "false").lower() == "true"
+
+PARSED_CACHE_ENABLED = os.getenv("PARSED_CACHE_ENABLED", "true").lower() == "true"
+PARSED_CACHE_DIR = os.getenv("PARSED_CACHE_DIR", "data/vector_db/parsed_cache")
+_PARSER_VERSION = 1  # bump when extraction/cleaning changes so cached pages are rebuilt
+
+# Where _add_chunk_batches_to_index reads and writes; rebuild_source_index points it at temp files
+_BUILD_TARGET = {"index": INDEX_FILE, "docs": DOC_FILE}
+
+# Truncation report for the current build: {"chars"|"tokens"|"database": stats}
+_TRUNCATION_REPORT: Dict[str, Dict[str, int]] = {}
 
 # Singleton pattern para cache del modelo
 _MODEL_CACHE = None
@@ -35,13 +57,60 @@ def get_embedding_model():
         print("Modelo de embeddings cargado en cache")
     return _MODEL_CACHE
 
+def _get_token_counter() -> Tuple[Callable[[str], int], int]:
+    """(count_tokens, max_tokens) measured with the embedding model's own tokenizer"""
+    model = get_embedding_model()
+    tokenizer = model.tokenizer
+    # special tokens ([CLS]/[SEP]) take 2 slots of max_seq_length
+    max_tokens = int(model.max_seq_length) - 2
+    
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    
+    return count_tokens, max_tokens
+
+def _record_truncation(kind: str, texts: List[str]):
+    count_tokens, max_tokens = _get_token_counter()
+    stats = truncation_stats(texts, count_tokens, max_tokens)
+    total = _TRUNCATION_REPORT.setdefault(kind, {k: 0 for k in stats})
+    for k, v in stats.items():
+        total[k] += v
+
+def _print_truncation_report():
+    if not _TRUNCATION_REPORT:
+        return
+    print("Truncado por límite de secuencia del modelo (tokens nunca embebidos):")
+    labels = {"chars": "chunks por caracteres", "tokens": "chunks por tokens", "database": "propiedades BD"}
+    for kind, st in _TRUNCATION_REPORT.items():
+        pct = 100.0 * st["tokens_truncated"] / max(1, st["tokens"])
+        print(f"- {labels.get(kind, kind)}: {st['chunks_truncated']}/{st['chunks']} chunks truncados, "
+              f"{st['tokens_truncated']}/{st['tokens']} tokens perdidos ({pct:.1f}%)")
+
+def _chunk_text(text: str, file_name: str, page_start: int, max_chars: int, overlap: int) -> List[dict]:
+    """Chunk one page/document according to CHUNK_MODE, recording truncation before vs after (TRUNCATION_REPORT)"""
+    if CHUNK_MODE != "tokens":
+        chunks = chunk_title_aware(text, file_name, page_start=page_start, max_chars=max_chars, overlap=overlap)
+        if TRUNCATION_REPORT:
+            _record_truncation("chars", [c["text"] for c in chunks])
+        return chunks
+    
+    count_tokens, max_tokens = _get_token_counter()
+    if TRUNCATION_REPORT:
+        # Character chunks are the "before" baseline
+        char_chunks = chunk_title_aware(text, file_name, page_start=page_start, max_chars=max_chars, overlap=overlap)
+        _record_truncation("chars", [c["text"] for c in char_chunks])
+    chunks = chunk_token_aware(text, file_name, page_start, count_tokens, max_tokens, CHUNK_OVERLAP_TOKENS)
+    if TRUNCATION_REPORT:
+        _record_truncation("tokens", [c["text"] for c in chunks])
+    return chunks
+
 def _normalize(v: np.ndarray) -> np.ndarray:
     norms = np.linalg.norm(v, axis=1, keepdims=True) + 1e-12
     return v / norms
 
 def _load_or_create_ip_index(dim: int) -> faiss.IndexFlatIP:
-    if os.path.exists(INDEX_FILE):
-        idx = faiss.read_index(INDEX_FILE)
+    if os.path.exists(_BUILD_TARGET["index"]):
+        idx = faiss.read_index(_BUILD_TARGET["index"])
         if not isinstance(idx, faiss.IndexFlatIP):
             raise ValueError("Existing FAISS index is not IndexFlatIP.")
         if idx.d != dim:
@@ -51,6 +120,7 @@ def _load_or_create_ip_index(dim: int) -> faiss.IndexFlatIP:
 
 def _read_pdf_pages(pdf_path: str) -> List[str]:
     pages = []
+    import fitz  # indexing-only dependency, loaded on first PDF
     with fitz.open(pdf_path) as doc:
         for page in doc:
             pages.append(page.get_text())
@@ -59,6 +129,7 @@ def _read_pdf_pages(pdf_path: str) -> List[str]:
 def _read_word_document(docx_path: str) -> str:
     """Extract text content from Word document"""
     try:
+        from docx import Document  # indexing-only dependency, loaded on first Word file
         doc = Document(docx_path)
         full_text = []
         for paragraph in doc.paragraphs:
@@ -69,104 +140,21 @@ def _read_word_document(docx_path: str) -> str:
         print(f"Error reading Word document {docx_path}: {e}")
         return ""
 
+def _iter_database_property_batches(batch_size: int = DB_INDEX_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """Stream properties from PostgreSQL (server-side cursor) in batches for vectorization"""
+    batch: List[Dict] = []
+    for prop in iter_properties(itersize=max(batch_size, PROPERTIES_ITERSIZE)):
+        batch.append(prop)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 def _get_database_properties() -> List[Dict]:
     """Extract properties from PostgreSQL database for vectorization"""
     try:
-        # Load environment variables
-        try:
-            from dotenv import load_dotenv
-            load_dotenv()
-        except ImportError:
-            pass
-        
-        db_config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'port': os.getenv('DB_PORT', '5432'),
-            'database': os.getenv('DB_NAME', 'dbremax'),
-            'user': os.getenv('DB_USER', 'postgres'),
-            'password': os.getenv('DB_PASSWORD', 'postgre')
-        }
-        
-        conn = psycopg2.connect(**db_config)
-        cursor = conn.cursor()
-        
-        # Query to get all property information
-        query = """
-            SELECT 
-                p.id,
-                p.nombre_propiedad,
-                tp.nombre as tipo_propiedad,
-                p.descripcion,
-                p.ubicacion,
-                COALESCE(p.precio_venta, p.precio_alquiler) as precio,
-                to_op.nombre as tipo_operacion,
-                ep.nombre as estado_propiedad,
-                p.superficie,
-                p.dimensiones,
-                u.nombre || ' ' || u.apellido as agente,
-                u.telefono as telefono_agente
-            FROM Propiedad p
-            INNER JOIN TipoPropiedad tp ON p.tipo_propiedad_id = tp.id
-            INNER JOIN EstadoPropiedad ep ON p.estado_propiedad_id = ep.id
-            INNER JOIN TipoOperacion to_op ON p.tipo_operacion_id = to_op.id
-            INNER JOIN Usuario u ON p.usuario_id = u.id
-            WHERE p.estado = 1
-            ORDER BY p.id
-        """
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        properties = []
-        for row in results:
-            prop_id, nombre, tipo, descripcion, ubicacion, precio, operacion, estado, superficie, dimensiones, agente, telefono = row
-            
-            # Create comprehensive text for vectorization
-            precio_str = f"${float(precio):,.0f}" if precio else "Precio por consultar"
-            
-            full_text = f"""
-PROPIEDAD REMAXI #{prop_id}: {nombre or f'Propiedad {prop_id}'}
-
-INFORMACIÓN BÁSICA:
-- Tipo: {tipo} para {operacion}
-- Estado: {estado}
-- Ubicación: {ubicacion}
-- Precio: {precio_str}
-- Superficie: {superficie or 'No especificada'}
-- Dimensiones: {dimensiones or 'No especificadas'}
-
-DESCRIPCIÓN:
-{descripcion or 'Sin descripción disponible'}
-
-CONTACTO:
-- Agente responsable: {agente}
-- Teléfono: {telefono}
-
-PALABRAS CLAVE:
-{tipo.lower()}, {operacion.lower()}, {ubicacion.lower()}, propiedad, inmobiliaria, remaxi, {nombre.lower() if nombre else ''}
-            """.strip()
-            
-            properties.append({
-                'text': full_text,
-                'meta': {
-                    'source_type': 'database',
-                    'property_id': prop_id,
-                    'nombre': nombre,
-                    'tipo': tipo,
-                    'ubicacion': ubicacion,
-                    'precio': float(precio) if precio else 0,
-                    'operacion': operacion,
-                    'estado': estado,
-                    'agente': agente,
-                    'telefono': telefono,
-                    'pdf': f'BD_Propiedad_{prop_id}',  # For compatibility with existing system
-                    'title': f'{tipo} en {ubicacion}',
-                    'page_start': 1
-                }
-            })
-        
+        properties = [p for batch in _iter_database_property_batches() for p in batch]
         print(f"Extraidas {len(properties)} propiedades de BD")
         return properties
         
@@ -174,14 +162,9 @@ PALABRAS CLAVE:
         print(f"Error extrayendo propiedades de BD: {e}")
         return []
 
-def build_vector_index_from_file(file_path: str, max_chars: int = 1000, overlap: int = 180):
-    """Process a single document file (PDF or Word) and add to vector index"""
-    file_name = os.path.basename(file_path)
-    file_ext = os.path.splitext(file_path)[1].lower()
-    
-    chunk_objs: List[dict] = []
-    
-    if file_ext == '.pdf':
+def _parse_document_pages(file_path: str) -> List[Tuple[int, str]]:
+    """Extract + clean a PDF/DOCX into (page_idx, text) pairs worth chunking"""
+    if file_path.lower().endswith('.pdf'):
         raw_pages = _read_pdf_pages(file_path)
         
         # 1) Remove headers/footers
@@ -192,103 +175,224 @@ def build_vector_index_from_file(file_path: str, max_chars: int = 1000, overlap:
         for i, p in enumerate(cleaned_pages):
             if not looks_like_toc_or_cover(p, i):
                 useful_pages.append((i, p))
-        
-        # 3) Chunk per page, title-aware
-        for page_idx, page_text in useful_pages:
-            chunks = chunk_title_aware(page_text, file_name, page_start=page_idx, max_chars=max_chars, overlap=overlap)
-            chunk_objs.extend(chunks)
-            
-    elif file_ext == '.docx':
-        # Process Word document
-        full_text = _read_word_document(file_path)
-        if full_text:
-            # For Word docs, treat as single "page" and chunk
-            chunks = chunk_title_aware(full_text, file_name, page_start=1, max_chars=max_chars, overlap=overlap)
-            chunk_objs.extend(chunks)
-    else:
+        return useful_pages
+    
+    # Word documents are treated as a single "page"
+    full_text = _read_word_document(file_path)
+    return [(1, full_text)] if full_text else []
+
+def _file_sha256(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _load_document_pages(file_path: str) -> List[Tuple[int, str]]:
+    """Cleaned pages from the parsed-document cache (keyed by content hash), parsing on miss"""
+    if not PARSED_CACHE_ENABLED:
+        return _parse_document_pages(file_path)
+    
+    digest = _file_sha256(file_path)
+    cache_path = os.path.join(PARSED_CACHE_DIR, f"{digest}.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == _PARSER_VERSION:
+                return [(int(i), t) for i, t in cached["pages"]]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Cache de páginas inválido para {os.path.basename(file_path)}: {e}")
+    
+    pages = _parse_document_pages(file_path)
+    if not pages:
+        return pages  # unreadable/empty: don't pin the failure in the cache
+    os.makedirs(PARSED_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": _PARSER_VERSION, "file": os.path.basename(file_path), "pages": pages}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return pages
+
+def build_vector_index_from_file(file_path: str, max_chars: int = 1000, overlap: int = 180,
+                                 near_dup: Optional[NearDuplicateIndex] = None):
+    """
+    Process a single document file (PDF or Word) and add to vector index.
+    near_dup: shared corpus-wide filter (see build_unified_vector_index).
+    """
+    file_name = os.path.basename(file_path)
+    file_ext = os.path.splitext(file_path)[1].lower()
+    
+    if file_ext not in ('.pdf', '.docx'):
         print(f"Unsupported file type: {file_ext}. Skipping {file_name}")
         return
     
-    # 4) Deduplicate
+    # 1-2) Cleaned, useful pages (cached by file content: chunking experiments skip parsing)
+    useful_pages = _load_document_pages(file_path)
+    
+    # 3) Chunk per page, title-aware
+    chunk_objs: List[dict] = []
+    for page_idx, page_text in useful_pages:
+        chunks = _chunk_text(page_text, file_name, page_idx, max_chars, overlap)
+        chunk_objs.extend(chunks)
+    
+    # 4) Deduplicate (exact within file, then near-duplicates across the corpus)
     chunk_objs = basic_deduplicate(chunk_objs)
+    if near_dup is not None:
+        chunk_objs = near_dup.filter(chunk_objs)
     if not chunk_objs:
         print(f"No useful chunks found in {file_name}. Skipping.")
         return
     
     _add_chunks_to_index(chunk_objs, f"document {file_name}")
 
-def build_vector_index_from_database():
-    """Extract properties from database and add to vector index"""
-    properties = _get_database_properties()
-    if not properties:
-        print("No properties found in database. Skipping.")
+def build_vector_index_from_database(batch_size: int = DB_INDEX_BATCH_SIZE,
+                                     near_dup: Optional[NearDuplicateIndex] = None,
+                                     raise_errors: bool = False):
+    """
+    Extract properties from database and add to vector index, one batch in memory at a time.
+    raise_errors: re-raise database errors instead of skipping the source.
+    """
+    batches = _iter_database_property_batches(batch_size)
+    batches = (_record_database_truncation(batch) for batch in batches)
+    if near_dup is not None:
+        # Listings are distinct by id: register them so later brochure copies get dropped
+        batches = (near_dup.filter(batch, register_only=True) for batch in batches)
+    try:
+        total = _add_chunk_batches_to_index(batches, "database properties")
+    except Exception as e:
+        print(f"Error extrayendo propiedades de BD: {e}")
+        if raise_errors:
+            raise
         return
-    
-    _add_chunks_to_index(properties, "database properties")
+    if not total:
+        print("No properties found in database. Skipping.")
 
-def _add_chunks_to_index(chunk_objs: List[dict], source_description: str):
-    """Helper function to add chunks to FAISS index"""
-    # 5) Encode + normalize
-    texts = [c["text"] for c in chunk_objs]
-    model = get_embedding_model()
-    emb = model.encode(texts, convert_to_numpy=True)
-    emb = _normalize(emb)
-    dim = emb.shape[1]
-    
-    # 6) Index append
-    index = _load_or_create_ip_index(dim)
-    index.add(emb)
-    
-    # 7) Persist index & docs
-    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
-    faiss.write_index(index, INDEX_FILE)
-    
-    if os.path.exists(DOC_FILE):
-        with open(DOC_FILE, "rb") as f:
+def _record_database_truncation(batch: List[Dict]) -> List[Dict]:
+    if TRUNCATION_REPORT:
+        _record_truncation("database", [p["text"] for p in batch])
+    return batch
+
+def _load_existing_docs() -> List[dict]:
+    if os.path.exists(_BUILD_TARGET["docs"]):
+        with open(_BUILD_TARGET["docs"], "rb") as f:
             existing = pickle.load(f)
         if not isinstance(existing, list):
             existing = []
     else:
         existing = []
+    return existing
+
+def _add_chunks_to_index(chunk_objs: List[dict], source_description: str):
+    """Helper function to add chunks to FAISS index"""
+    _add_chunk_batches_to_index([chunk_objs], source_description)
+
+def _add_chunk_batches_to_index(batches: Iterable[List[dict]], source_description: str) -> int:
+    """
+    Encode and append chunk batches to the FAISS index. Index and docs are loaded
+    and persisted once, whatever the number of batches. Returns chunks added.
+    """
+    model = get_embedding_model()
+    index = None
+    existing = None
+    added = 0
+    
+    for chunk_objs in batches:
+        if not chunk_objs:
+            continue
+        # 5) Encode (unchanged chunks come from the on-disk cache) + normalize
+        texts = [c["text"] for c in chunk_objs]
+        emb = encode_with_cache(model, EMBEDDING_MODEL_NAME, texts)
+        emb = _normalize(emb)
+        
+        # 6) Index append
+        if index is None:
+            index = _load_or_create_ip_index(emb.shape[1])
+            existing = _load_existing_docs()
+        index.add(emb)
+        existing.extend(chunk_objs)
+        added += len(chunk_objs)
     
-    existing.extend(chunk_objs)
+    if index is None:
+        return 0
+    
+    # 7) Persist index & docs
+    os.makedirs(os.path.dirname(_BUILD_TARGET["index"]) or ".", exist_ok=True)
+    faiss.write_index(index, _BUILD_TARGET["index"])
     
-    with open(DOC_FILE, "wb") as f:
+    with open(_BUILD_TARGET["docs"], "wb") as f:
         pickle.dump(existing, f)
     
-    print(f"Indexed {len(chunk_objs)} chunks from {source_description}. Total chunks: {len(existing)}")
+    print(f"Indexed {added} chunks from {source_description}. Total chunks: {len(existing)}")
+    return added
+
+@contextmanager
+def _build_into(index_file: str, doc_file: str):
+    """Send the index builders' output to other files for the duration of the block."""
+    previous = dict(_BUILD_TARGET)
+    _BUILD_TARGET.update(index=index_file, docs=doc_file)
+    try:
+        yield
+    finally:
+        _BUILD_TARGET.update(previous)
+
+def _copy_without_source(source: str, index_file: str, doc_file: str) -> List[dict]:
+    """
+    Write the current index minus one source ("database" | "document") to
+    index_file / doc_file; the other source's vectors are kept as they are.
+    Returns the kept docs. The current index is not modified.
+    """
+    if not (os.path.exists(INDEX_FILE) and os.path.exists(DOC_FILE)):
+        return []
+    with open(DOC_FILE, "rb") as f:
+        existing = pickle.load(f)
+    index = faiss.read_index(INDEX_FILE)
+    if index.ntotal != len(existing):
+        raise ValueError(f"Index/docs mismatch: {index.ntotal} vectors, {len(existing)} docs.")
+    drop = [pos for pos, d in enumerate(existing) if source_of(d) == source]
+    if drop:
+        index.remove_ids(np.array(drop, dtype="int64"))
+        dropped = set(drop)
+        existing = [d for pos, d in enumerate(existing) if pos not in dropped]
+    faiss.write_index(index, index_file)
+    with open(doc_file, "wb") as f:
+        pickle.dump(existing, f)
+    print(f"Dropped {len(drop)} {source} chunks from the copy. Kept: {len(existing)}")
+    return existing
+
+def _print_embedding_cache_stats():
+    if not EMBEDDING_CACHE_ENABLED:
+        return
+    st = get_embedding_cache(EMBEDDING_MODEL_NAME).stats()
+    total = st["hits"] + st["misses"]
+    if total:
+        print(f"Embedding cache: {st['hits']}/{total} chunks reutilizados, {st['misses']} codificados ({st['entries']} en {st['path']})")
 
 def build_unified_vector_index(docs_directory: str = "data/docs", pdfs_directory: str = "data/pdfs", max_chars: int = 1000, overlap: int = 180):
     """Build unified vector index from all sources: PDFs, Word docs, and database"""
     print("BUILDING UNIFIED RAG INDEX")
     print("=" * 50)
     
+    print(f"Chunking: {CHUNK_MODE}")
+    
     total_processed = 0
+    near_dup = NearDuplicateIndex() if NEAR_DUP_ENABLED else None
+    _TRUNCATION_REPORT.clear()
     
-    # 1) Process Word documents from docs directory
-    if os.path.exists(docs_directory):
-        print(f"Processing Word documents from {docs_directory}")
-        for filename in os.listdir(docs_directory):
-            if filename.lower().endswith('.docx'):
-                file_path = os.path.join(docs_directory, filename)
-                print(f"Processing: {filename}")
-                build_vector_index_from_file(file_path, max_chars, overlap)
-                total_processed += 1
+    # 1) Process database properties first: when a brochure repeats a listing,
+    #    the structured DB record is the copy that stays in the index
+    print("Processing database properties")
+    build_vector_index_from_database(near_dup=near_dup)
     
-    # 2) Process PDFs from pdfs directory
-    if os.path.exists(pdfs_directory):
-        print(f"Processing PDFs from {pdfs_directory}")
-        for filename in os.listdir(pdfs_directory):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(pdfs_directory, filename)
-                print(f"Processing: {filename}")
-                build_vector_index_from_file(file_path, max_chars, overlap)
-                total_processed += 1
+    # 2-3) Word documents from docs directory, then PDFs from pdfs directory
+    total_processed += _build_documents(docs_directory, pdfs_directory, max_chars, overlap, near_dup)
     
-    # 3) Process database properties
-    print("Processing database properties")
-    build_vector_index_from_database()
+    if near_dup is not None:
+        st = near_dup.stats()
+        print(f"Near-duplicates: {st['dropped']} de {st['seen']} chunks descartados (umbral {near_dup.threshold})")
     
+    _print_embedding_cache_stats()
+    _print_truncation_report()
     print("\nUNIFIED RAG INDEX COMPLETED!")
     print(f"Processed {total_processed} document files + database properties")
     print("Sistema RAG unificado listo para consultas")
@@ -298,6 +402,66 @@ def build_unified_vector_index(docs_directory: str = "data/docs", pdfs_directory
     print("- Propiedades disponibles en la base de datos")
     print("- Consultas combinadas de ambas fuentes")
 
+def _build_documents(docs_directory: str, pdfs_directory: str, max_chars: int, overlap: int,
+                     near_dup: Optional[NearDuplicateIndex]) -> int:
+    """Index every .docx in docs_directory and .pdf in pdfs_directory. Returns files processed."""
+    processed = 0
+    for directory, ext, label in ((docs_directory, '.docx', "Word documents"), (pdfs_directory, '.pdf', "PDFs")):
+        if not os.path.exists(directory):
+            continue
+        print(f"Processing {label} from {directory}")
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(ext):
+                file_path = os.path.join(directory, filename)
+                print(f"Processing: {filename}")
+                build_vector_index_from_file(file_path, max_chars, overlap, near_dup=near_dup)
+                processed += 1
+    return processed
+
+def rebuild_source_index(source: str, docs_directory: str = "data/docs", pdfs_directory: str = "data/pdfs",
+                         max_chars: int = 1000, overlap: int = 180):
+    """
+    Rebuild one source of the unified index (database properties or documents)
+    on its own schedule; the other source's chunks are kept without re-encoding.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source {source!r}; expected one of {SOURCES}")
+    print(f"REBUILDING {source.upper()} SOURCE")
+    print("=" * 50)
+    
+    # Built next to the live files and swapped in only when complete: a failed
+    # build (e.g. database unreachable) leaves the current index untouched
+    tmp_index, tmp_docs = INDEX_FILE + ".rebuild", DOC_FILE + ".rebuild"
+    os.makedirs(os.path.dirname(INDEX_FILE) or ".", exist_ok=True)
+    try:
+        kept = _copy_without_source(source, tmp_index, tmp_docs)
+        near_dup = NearDuplicateIndex() if NEAR_DUP_ENABLED else None
+        _TRUNCATION_REPORT.clear()
+        
+        with _build_into(tmp_index, tmp_docs):
+            if source == "database":
+                build_vector_index_from_database(near_dup=near_dup, raise_errors=True)
+            else:
+                if near_dup is not None:
+                    # As in a full build, the DB listing is the copy that stays when a brochure repeats it
+                    near_dup.filter([d for d in kept if source_of(d) == "database"], register_only=True)
+                processed = _build_documents(docs_directory, pdfs_directory, max_chars, overlap, near_dup)
+                print(f"Processed {processed} document files")
+        
+        if not os.path.exists(tmp_index):
+            print("Nothing to index. Current index left as is.")
+            return
+        os.replace(tmp_docs, DOC_FILE)
+        os.replace(tmp_index, INDEX_FILE)
+    finally:
+        for path in (tmp_index, tmp_docs):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    _print_embedding_cache_stats()
+    _print_truncation_report()
+    print(f"\n{source.upper()} SOURCE REBUILT (reiniciar el servicio para cargarlo)")
+
 # Legacy function for backward compatibility
 def build_vector_index(pdf_path: str, max_chars: int, overlap: int):
     """Legacy function - now delegates to new unified function"""
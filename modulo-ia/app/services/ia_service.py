@@ -11,13 +11,36 @@ import re
 import os
 import json
 import time
-import faiss
-import pickle
+import logging
+import threading
 import numpy as np
-import requests
 from collections import defaultdict, Counter
-from typing import List, Optional, Tuple, Dict, Iterable
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List, Optional, Tuple, Dict, Iterable, Sequence
+
+# faiss and sentence_transformers (torch) load on first use / in startup(), not at import
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+from app.services import llm_client
+from app.services.llm_client import (
+    OLLAMA_NUM_CTX,
+    OLLAMA_NUM_PREDICT,
+    LLMError,
+    build_prompt,
+    model_for,
+)
+from app.services.context_packer import pack_context, context_budget, estimate_tokens, use_tokenizer
+from app.services.context_compressor import compress_chunks, COMPRESS_CONTEXT_ENABLED
+from app.services.circuit_breaker import get_llm_breaker
+from app.services.intent import classify_intent
+from app.services.metrics import span, register_gauge, background_job
+from app.services.vector_store import SOURCES, VectorStore, TenantRegistry, load_tenants, source_specs
+from app.services.cache_warmer import schedule_warm, warmer_stats, CACHE_WARM_DEBOUNCE_S, CACHE_WARM_TTL_S
+from app.services.query_log import normalize_query
+from app.services import ann_index
+from app.utils.structured_log import detail, sampled
 
 # Optional: load environment if not done elsewhere
 try:
@@ -26,39 +49,60 @@ try:
 except Exception:
     pass
 
+logger = logging.getLogger(__name__)
+
 # --- Config from .env (with sensible defaults) -----------------------
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "distiluse-base-multilingual-cased-v1")
 INDEX_FILE = os.getenv("VECTOR_DB_INDEX", "data/vector_db/index.faiss")
 DOC_FILE = os.getenv("VECTOR_DB_DOCS", "data/vector_db/docs.pkl")
 
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
-OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME", "phi")
 REQUEST_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT_SEC", "10"))  # Phi es más rápido que Mistral
 
-TOP_K = int(os.getenv("TOP_K", "4"))
-MIN_SIM_THRESHOLD = float(os.getenv("MIN_SIM_THRESHOLD", "0.32"))
+# Índice aproximado y parámetros recomendados por scripts/autotune_index.py (el .env tiene prioridad)
+_INDEX_CONFIG = ann_index.load_index_config()
+INDEX_SPECS = source_specs(_INDEX_CONFIG)  # una configuración por fuente (sub-índice)
+
+TOP_K = int(os.getenv("TOP_K", str(_INDEX_CONFIG.get("top_k", 4))))
+MIN_SIM_THRESHOLD = float(os.getenv("MIN_SIM_THRESHOLD", str(_INDEX_CONFIG.get("min_sim_threshold", 0.32))))
+
+# Respuestas por plantilla (sin LLM) para precio / ubicación / contacto de propiedades de la BD
+TEMPLATE_ANSWERS_ENABLED = os.getenv("TEMPLATE_ANSWERS_ENABLED", "true").lower() == "true"
+TEMPLATE_MIN_SIM = float(os.getenv("TEMPLATE_MIN_SIM", "0.45"))
+TEMPLATE_SIM_MARGIN = float(os.getenv("TEMPLATE_SIM_MARGIN", "0.05"))  # otras propiedades casi tan similares como la 1ª
+TEMPLATE_MAX_PROPERTIES = int(os.getenv("TEMPLATE_MAX_PROPERTIES", "3"))
+
+# Búsqueda por fuente según la intención: precio / ubicación / contacto solo en propiedades de la BD,
+# ayuda solo en documentos; el resto en ambas (scores de coseno combinados)
+SOURCE_ROUTING_ENABLED = os.getenv("SOURCE_ROUTING_ENABLED", "true").lower() == "true"
+_SOURCE_ROUTES = {
+    "price": ("database",),
+    "location": ("database",),
+    "contact": ("database",),
+    "help": ("document",),
+}
 
-# --- Instrucciones cortas para el modelo ---
-SYSTEM_INSTRUCTION = """Eres Remaxi, asistente inmobiliario de Remax Express. Responde con información específica de propiedades usando datos del contexto. Si no tienes información suficiente, pide más detalles sobre zona, tipo de propiedad y si es para compra/alquiler."""
 
 # --- Singleton pattern para cache del modelo -----------------
-_MODEL_CACHE: Optional[SentenceTransformer] = None
+_MODEL_CACHE: Optional["SentenceTransformer"] = None
 
 # --- Cache de respuestas de IA (en memoria) ------------------
 import hashlib
 _RESPONSE_CACHE = {}
 RESPONSE_CACHE_TIMEOUT = 10 * 60 * 1000  # 10 minutos - Balance RAG vs Performance
+register_gauge("ia_response_cache_entries", "Entries in the in-memory response cache", lambda: len(_RESPONSE_CACHE))
 
 # --- Integración con Base de Datos DESHABILITADA ---------------------------
 # La BD debe estar vectorizada en los archivos FAISS, no consultada en tiempo real
 DB_INTEGRATION_ENABLED = False
 
-def get_embedding_model() -> SentenceTransformer:
+def get_embedding_model() -> "SentenceTransformer":
     """Get cached embedding model (singleton pattern)"""
     global _MODEL_CACHE
     if _MODEL_CACHE is None:
+        from sentence_transformers import SentenceTransformer
         print(f"Cargando modelo de embeddings IA: {EMBEDDING_MODEL_NAME}")
         _MODEL_CACHE = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        use_tokenizer(_MODEL_CACHE.tokenizer)  # token counts for the context budget
         print("Modelo de embeddings IA cargado en cache")
     return _MODEL_CACHE
 
@@ -67,21 +111,91 @@ def _normalize(v: np.ndarray) -> np.ndarray:
     norms = np.linalg.norm(v, axis=1, keepdims=True) + 1e-12
     return v / norms
 
-def _load_index_and_docs():
-    """Load FAISS index and docs metadata from disk."""
-    if not (os.path.exists(INDEX_FILE) and os.path.exists(DOC_FILE)):
-        return None, None, None
-    index = faiss.read_index(INDEX_FILE)
-    with open(DOC_FILE, "rb") as f:
-        docs = pickle.load(f)  # Expected: List[dict] with {"text": str, "meta": {...}}
-    dim = index.d
-    return index, docs, dim
+# Global partition (every agency). Loaded by startup() (FastAPI lifespan) or lazily on first use
+_STORE = VectorStore("global", INDEX_FILE, DOC_FILE, INDEX_SPECS)
+
+# Per-agency partitions selected by QueryRequest.to_phone (data/vector_db/tenants.json);
+# numbers without a partition search the global one
+_TENANTS = TenantRegistry(load_tenants(), INDEX_SPECS)
 
-_INDEX, _DOCS, _DIM = _load_index_and_docs()
+def load_index(executor: Optional[ThreadPoolExecutor] = None) -> bool:
+    """Load the global FAISS index and docs from disk (once). Returns True when loaded."""
+    return _STORE.load(executor)
+
+def _ensure_loaded() -> bool:
+    return _STORE.loaded()
 
 def _ensure_ready() -> bool:
-    """Check that model, index, and docs are available."""
-    return _INDEX is not None and _DOCS is not None and _DIM is not None
+    """Check that index and docs are available (loading them on first use)."""
+    return _STORE.ensure_ready()
+
+@contextmanager
+def _search_partition(to_phone: Optional[str] = None):
+    """
+    The partition a query searches: the agency's own (pinned while the search runs),
+    or the global one for numbers without an agency. An agency whose partition is not
+    built yields None: its clients never see other agencies' listings.
+    """
+    tenant = _TENANTS.tenant_for(to_phone) if _TENANTS else None
+    if tenant is None:
+        yield _STORE
+        return
+    with _TENANTS.pinned(tenant) as store:
+        yield store
+
+# ---------------------------------------------------------------------
+# Live patching (database properties)
+# ---------------------------------------------------------------------
+
+def upsert_property_docs(docs: List[Dict]) -> int:
+    """
+    Re-embed the given database property docs and hot-patch the in-memory indexes
+    (global + the owning agency's partition): old vectors for the same property_id
+    are dropped, new ones appended. Returns the number of docs indexed.
+    """
+    docs = [d for d in docs if d and (d.get("meta") or {}).get("property_id") is not None]
+    if not docs:
+        return 0
+    _ensure_ready()  # patch the on-disk index, never a fresh one that load_index would then skip
+
+    # Encode outside the locks: searches keep running meanwhile
+    emb = _normalize(get_embedding_model().encode([d["text"] for d in docs], convert_to_numpy=True)).astype("float32")
+    _STORE.upsert_properties(emb, docs)
+    if _TENANTS:
+        rows_by_property = defaultdict(list)
+        for row, d in enumerate(docs):
+            rows_by_property[d["meta"]["property_id"]].append(row)
+        for rows in rows_by_property.values():
+            _TENANTS.upsert_property(emb[rows], [docs[r] for r in rows])
+
+    # Cached answers may quote the old listing
+    _RESPONSE_CACHE.clear()
+    _reset_fallback_reply()
+    schedule_warm("property_update", delay=CACHE_WARM_DEBOUNCE_S)
+    return len(docs)
+
+def indexed_property_texts() -> Optional[Dict[int, str]]:
+    """property_id → text currently indexed (global index); None without an index. Used to resync with the DB."""
+    if not _ensure_ready():
+        return None
+    docs = _STORE.docs or []
+    return {d["meta"]["property_id"]: d["text"] for d in docs
+            if isinstance(d, dict) and (d.get("meta") or {}).get("property_id") is not None}
+
+def remove_property_docs(prop_ids: Iterable[int]) -> int:
+    """Drop database property chunks from the in-memory indexes. Returns removed count."""
+    if not _ensure_ready():
+        return 0
+    prop_ids = list(prop_ids)
+    removed = _STORE.remove_properties(prop_ids)
+    if _TENANTS:
+        _TENANTS.remove_properties(prop_ids)
+
+    if removed:
+        _RESPONSE_CACHE.clear()
+        _reset_fallback_reply()
+        schedule_warm("property_update", delay=CACHE_WARM_DEBOUNCE_S)
+    return removed
 
 # ---------------------------------------------------------------------
 # Public helpers
@@ -94,7 +208,8 @@ def get_index_overview(max_topics: int = 8) -> Dict:
     - unique pdf list
     - top (pdf, title) pairs by frequency
     """
-    if not (_DOCS and isinstance(_DOCS, list)):
+    docs = _STORE.docs
+    if not (docs and isinstance(docs, list)):
         return {"total_chunks": 0, "pdfs": [], "top_topics": []}
 
     from collections import Counter
@@ -102,7 +217,7 @@ def get_index_overview(max_topics: int = 8) -> Dict:
     pdfs: List[str] = []
     topics = Counter()
 
-    for d in _DOCS:
+    for d in docs:
         if not isinstance(d, dict):
             continue
         meta = d.get("meta", {}) or {}
@@ -124,9 +239,12 @@ def get_index_overview(max_topics: int = 8) -> Dict:
     top_topics = [{"pdf": pdf, "title": title} for (pdf, title), _ in topics.most_common(max_topics)]
 
     return {
-        "total_chunks": len(_DOCS),
+        "total_chunks": len(docs),
         "pdfs": uniq_pdfs,
-        "top_topics": top_topics
+        "top_topics": top_topics,
+        "search_index": _STORE.search_index_name(),
+        "sources": _STORE.stats()["sources"],
+        "tenants": _TENANTS.stats() if _TENANTS else None,
     }
 
 def build_guidance_reply(user_query: str, max_examples: int = 6) -> str:
@@ -159,32 +277,47 @@ def build_guidance_reply(user_query: str, max_examples: int = 6) -> str:
         "• \"Busco una casa de [X] dormitorios\""
     )
 
-def get_relevant_chunks(query: str, top_k: int = TOP_K) -> Optional[List[Tuple[str, float, Dict]]]:
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    """Raw embeddings for a batch of texts (sentence compression, intent centroids)."""
+    return get_embedding_model().encode(texts, convert_to_numpy=True)
+
+def _embed_query(query: str) -> np.ndarray:
+    """Normalized (1, d) query embedding, shared by retrieval, intent detection and context compression."""
+    model = get_embedding_model()
+    q = model.encode([query], convert_to_numpy=True)
+    return _normalize(q)
+
+def route_sources(intent: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Sub-indexes an intent searches (None → every source)."""
+    if not SOURCE_ROUTING_ENABLED:
+        return None
+    return _SOURCE_ROUTES.get(intent)
+
+def get_relevant_chunks(query: str, top_k: int = TOP_K, query_vec: Optional[np.ndarray] = None,
+                        to_phone: Optional[str] = None,
+                        sources: Optional[Sequence[str]] = None) -> Optional[List[Tuple[str, float, Dict]]]:
     """
     Query FAISS vectorial database and return a list of (chunk_text, similarity, meta).
     Only returns items with similarity >= MIN_SIM_THRESHOLD.
+    query_vec: precomputed _embed_query(query), to avoid encoding twice.
+    to_phone: business number the client wrote to; selects the agency partition.
+    sources: sub-indexes to search (route_sources); when they have nothing above
+    the threshold, the other sources are searched before giving up.
     """
     if not _ensure_ready():
         return None
     
-    model = get_embedding_model()
-    q = model.encode([query], convert_to_numpy=True)
-    q = _normalize(q)
-    sims, idxs = _INDEX.search(q, top_k)
-
-    sims = sims[0]
-    idxs = idxs[0]
-
-    chunks = []
-    for j, i in enumerate(idxs):
-        if i < 0:
-            continue
-        d = _DOCS[i]
-        text = d["text"] if isinstance(d, dict) else str(d)
-        meta = d.get("meta", {}) if isinstance(d, dict) else {}
-        sim = float(sims[j])
-        if sim >= MIN_SIM_THRESHOLD:
-            chunks.append((text, sim, meta))
+    q = query_vec if query_vec is not None else _embed_query(query)
+
+    with _search_partition(to_phone) as store, span("faiss_search"):
+        if store is None:
+            return None
+        hits = store.search(q, top_k, sources)
+        chunks = [hit for hit in hits if hit[1] >= MIN_SIM_THRESHOLD]
+        if not chunks and sources:
+            rest = [s for s in SOURCES if s not in sources]
+            hits = store.search(q, top_k, rest) if rest else []
+            chunks = [hit for hit in hits if hit[1] >= MIN_SIM_THRESHOLD]
     
     return chunks if chunks else None
 
@@ -202,173 +335,371 @@ def _build_prompt(query: str, context_chunks: List[Tuple[str, float, Dict]], his
     
     context_str = "\n".join(context_parts) if context_parts else "No hay información específica disponible."
     
-    # Construir prompt simple y directo
-    prompt = f"""Instrucciones: {SYSTEM_INSTRUCTION}
-
-Información disponible sobre propiedades:
+    # Construir prompt simple y directo (prefijo de instrucciones compartido, ver llm_client)
+    prompt = build_prompt(f"""Información disponible sobre propiedades:
 {context_str}
 
 Consulta del cliente: {query}
 
-Responde como Remaxi (asistente de Remax Express) usando la información disponible:"""
+Responde como Remaxi (asistente de Remax Express) usando la información disponible:""")
 
     return prompt
 
-def _generate_friendly_response(query: str) -> str:
+def _build_packed_prompt(query: str, context_chunks: List[Tuple[str, float, Dict]], history: str = "") -> Tuple[str, Dict]:
+    """
+    Prompt whose context fits num_ctx - num_predict (Ollama would silently truncate the rest).
+    Returns (prompt, stats) with tokens used/dropped for this request.
+    """
+    fixed = _build_prompt(query, [], history)
+    budget = context_budget(OLLAMA_NUM_CTX, OLLAMA_NUM_PREDICT, fixed)
+    packed, stats = pack_context(context_chunks, budget)
+    prompt = _build_prompt(query, packed, history)
+    stats["prompt_tokens_est"] = estimate_tokens(prompt)
+    return prompt, stats
+
+# --- Respuestas por plantilla desde meta de la BD ------------------------
+def _format_price(precio) -> str:
+    return f"${float(precio):,.0f}" if precio else "precio por consultar"
+
+def _render_property_line(intent: str, meta: Dict) -> str:
+    nombre = meta.get("nombre") or f"Propiedad {meta.get('property_id')}"
+    tipo = (meta.get("tipo") or "propiedad").lower()
+    operacion = (meta.get("operacion") or "").lower()
+    ubicacion = meta.get("ubicacion") or "ubicación por confirmar"
+    head = f"{nombre} ({tipo}{' en ' + operacion if operacion else ''})"
+    if intent == "price":
+        return f"• {head} en {ubicacion}: {_format_price(meta.get('precio'))}"
+    if intent == "location":
+        return f"• {head}: {ubicacion}"
+    return f"• {head}: agente {meta.get('agente') or 'Remaxi'}, teléfono {meta.get('telefono') or 'por confirmar'}"
+
+_TEMPLATE_INTRO = {  # (una propiedad, varias)
+    "price": ("Este es el precio que tengo:", "Estos son los precios que tengo:"),
+    "location": ("Esta es la ubicación:", "Estas son las ubicaciones:"),
+    "contact": ("Puedes contactar directamente al agente responsable:", "Puedes contactar directamente a los agentes responsables:"),
+}
+_TEMPLATE_CLOSING = {
+    "price": "¿Te gustaría más detalles o coordinar una visita?",
+    "location": "¿Quieres que coordinemos una visita para conocerla?",
+    "contact": "¿Te ayudo con algo más de la propiedad?",
+}
+
+def _templated_answer(intent: str, chunks: List[Tuple[str, float, Dict]]) -> Optional[str]:
+    """
+    Answer price / location / contact questions straight from database meta
+    when the best chunks are DB properties with high similarity. None → use the LLM.
+    """
+    if not TEMPLATE_ANSWERS_ENABLED or not chunks or intent not in _TEMPLATE_INTRO:
+        return None
+
+    top_sim = chunks[0][1]
+    if chunks[0][2].get("source_type") != "database" or top_sim < TEMPLATE_MIN_SIM:
+        return None  # documents are more relevant, or the match is weak
+
+    props, seen = [], set()
+    for _text, sim, meta in chunks:
+        if meta.get("source_type") != "database" or sim < max(TEMPLATE_MIN_SIM, top_sim - TEMPLATE_SIM_MARGIN):
+            continue
+        if meta.get("property_id") in seen:
+            continue
+        seen.add(meta.get("property_id"))
+        props.append(meta)
+        if len(props) >= TEMPLATE_MAX_PROPERTIES:
+            break
+
+    lines = "\n".join(_render_property_line(intent, meta) for meta in props)
+    intro = _TEMPLATE_INTRO[intent][len(props) > 1]
+    return f"{intro}\n{lines}\n\n{_TEMPLATE_CLOSING[intent]}"
+
+def _generate_friendly_response(query: str, intent: Optional[Dict] = None) -> str:
     """
     Generar respuesta profesional con emojis de Remaxi para consultas sin contexto RAG específico.
     Siempre pide más detalles cuando no tiene información suficiente.
     """
-    query_lower = query.lower().strip()
-    
-    # Detectar saludos
-    greetings = ['hola', 'buenos dias', 'buenas tardes', 'buenas noches', 'saludos', 'hi', 'hello']
-    if any(greeting in query_lower for greeting in greetings):
+    intent = intent or classify_intent(query)
+
+    # Saludos
+    if intent["intent"] == "greeting":
         return "¡Hola! Soy Remaxi, tu asistente de Remax Express especializado en venta y alquiler de propiedades. ¿Qué tipo de propiedad estás buscando? ¿Para compra o alquiler?"
     
-    # Detectar agradecimientos
-    thanks = ['gracias', 'thank you', 'thanks']
-    if any(thank in query_lower for thank in thanks):
+    # Agradecimientos
+    if intent["intent"] == "thanks":
         return "¡De nada! Estoy aquí para ayudarte a encontrar la propiedad perfecta. ¿Hay alguna zona específica o características que te interesen?"
     
     # Respuesta pidiendo más detalles (NO ofrecer conectar con agente inmediatamente)
     return "Para ayudarte mejor con esa consulta, necesito algunos detalles adicionales. ¿Podrías contarme qué tipo de propiedad buscas, en qué zona, y si es para compra o alquiler? ¡Así podré darte información más específica!"
 
-def _get_query_hash(query: str, history: str = "") -> str:
-    """Generate hash for caching based on query and history - SOLO para consultas similares"""
+# --- Respuestas de respaldo precalculadas (modo degradado) ------------
+_BUSY_REPLY: Optional[str] = None
+
+def _reset_fallback_reply():
+    global _BUSY_REPLY
+    _BUSY_REPLY = None
+
+def fast_fallback_reply(query: str, intent: Optional[Dict] = None) -> str:
+    """
+    Reply for degraded mode (circuit open, LLM errors): plain string work only,
+    no encode, no FAISS search, no LLM. Topic suggestions are computed once per index.
+    """
+    global _BUSY_REPLY
+    intent = intent or classify_intent(query)
+    if intent["intent"] in ("greeting", "thanks"):
+        return _generate_friendly_response(query, intent)
+
+    if _BUSY_REPLY is None:
+        titles = [t.get("title", "") for t in get_index_overview(max_topics=5).get("top_topics", [])]
+        topics_line = format_topics_inline(titles, max_items=5)
+        _BUSY_REPLY = (
+            "Soy Remaxi, asistente de Remax Express para venta y alquiler de propiedades. "
+            + (f"Puedo contarte sobre: {topics_line}. " if topics_line else "")
+            + "¿Qué tipo de propiedad buscas, en qué zona y si es para compra o alquiler? "
+            "Un agente también puede ayudarte directamente."
+        )
+    return _BUSY_REPLY
+
+def _get_query_hash(query: str, history: str = "", tenant: Optional[str] = None) -> str:
+    """Generate hash for caching based on query, history and agency partition - SOLO para consultas similares"""
     # Normalizar consulta para mejor matching
-    normalized = query.strip().lower()
+    normalized = normalize_query(query)
     # Remover artículos y palabras comunes para mejor agrupación
     normalized = normalized.replace('que ', '').replace('cual ', '').replace('como ', '').replace('donde ', '')
-    combined = f"{normalized}||{history.strip()}"
+    combined = f"{normalized}||{history.strip()}||{tenant or ''}"
     return hashlib.md5(combined.encode('utf-8')).hexdigest()
 
 def _get_cached_response(query_hash: str) -> Optional[dict]:
     """Get cached response if not expired"""
-    if query_hash not in _RESPONSE_CACHE:
+    # Single get/pop calls: the listener and the warmer clear / fill the cache from other threads
+    cached = _RESPONSE_CACHE.get(query_hash)
+    if cached is None:
         return None
     
-    cached = _RESPONSE_CACHE[query_hash]
-    if (cached["timestamp"] + RESPONSE_CACHE_TIMEOUT) < (time.time() * 1000):
+    age_ms = time.time() * 1000 - cached["timestamp"]
+    ttl_ms = cached.get("ttl_ms", RESPONSE_CACHE_TIMEOUT)
+    if age_ms > ttl_ms:
         # Expired, remove from cache
-        del _RESPONSE_CACHE[query_hash]
+        _RESPONSE_CACHE.pop(query_hash, None)
         return None
+    if background_job() == "cache_warmer" and age_ms > ttl_ms / 2:
+        return None  # the warmer regenerates answers in the second half of their life
     
     return cached["response"]
 
 def _cache_response(query_hash: str, response: dict):
-    """Cache response with timestamp"""
+    """Cache response with timestamp (warmed answers get the warmer's longer TTL)"""
+    warmed = background_job() == "cache_warmer"
     _RESPONSE_CACHE[query_hash] = {
         "response": response,
-        "timestamp": time.time() * 1000
+        "timestamp": time.time() * 1000,
+        "ttl_ms": CACHE_WARM_TTL_S * 1000 if warmed else RESPONSE_CACHE_TIMEOUT,
     }
 
 def _warm_up_ollama():
     """Calentar Ollama con una consulta simple para cargar el modelo en memoria"""
-    try:
-        print("Warming up Ollama...")
-        payload = {
-            "model": OLLAMA_MODEL_NAME,
-            "prompt": "Hola",
-            "stream": False,
-            "options": {"num_predict": 5}
-        }
-        resp = requests.post(OLLAMA_API_URL, json=payload, timeout=30)
-        if resp.status_code == 200:
-            print(f"Ollama warm-up completado con modelo {OLLAMA_MODEL_NAME}")
-        else:
-            print(f"Ollama warm-up fallo: {resp.status_code}")
-    except Exception as e:
-        print(f"Ollama warm-up error: {e}")
+    ok = llm_client.warm_up(model_for("rag"))
+    llm_client.start_keep_warm()
+    with _READINESS_LOCK:
+        _READINESS["llm_warm"] = ok
 
-# Warm-up automático al cargar el módulo
-_warm_up_ollama()
+# ---------------------------------------------------------------------
+# Startup lifecycle (called from the FastAPI lifespan)
+# ---------------------------------------------------------------------
 
-def ask_mistral_with_context(query: str, history: str = "") -> dict:
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "casa en venta con 3 dormitorios")
+
+_READINESS_LOCK = threading.Lock()
+_READINESS = {
+    "state": "not_started",  # not_started | loading | ready | failed
+    "model_loaded": False,
+    "index_loaded": False,
+    "hot_path_warm": False,
+    "llm_warm": None,         # None = warm-up still running
+    "startup_ms": None,
+    "load_ms": {},            # per step: model (incl. torch import), index, warmup
+    "error": None,
+}
+
+def _set_readiness(**fields):
+    with _READINESS_LOCK:
+        _READINESS.update(fields)
+
+def startup(warm_llm: bool = True) -> Dict:
+    """
+    Load the embedding model, FAISS index and docs in parallel, then warm the
+    hot path (query encode, search, intent centroids). Ollama is warmed in a
+    background thread: readiness does not wait for it. Returns readiness().
+    """
+    t0 = time.time()
+    _set_readiness(state="loading", error=None)
+    try:
+        load_ms = {}
+
+        def timed(step, fn, *args, **kwargs):
+            t = time.time()
+            result = fn(*args, **kwargs)
+            load_ms[step] = round((time.time() - t) * 1000)
+            return result
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="ia-startup") as pool:
+            model_future = pool.submit(timed, "model", get_embedding_model)
+            index_ok = timed("index", load_index, executor=pool)
+            model_future.result()
+        _set_readiness(model_loaded=True, index_loaded=index_ok, load_ms=load_ms)
+
+        if warm_llm:
+            _set_readiness(llm_warm=None)
+            threading.Thread(target=_warm_up_ollama, name="ollama-warmup", daemon=True).start()
+
+        # First encode / search / intent are slow (lazy init in torch and FAISS): pay it here
+        def warm_hot_path():
+            query_vec = _embed_query(WARMUP_QUERY)
+            get_relevant_chunks(WARMUP_QUERY, query_vec=query_vec)
+            classify_intent(WARMUP_QUERY, query_vec=query_vec, encode=_encode_texts)
+        timed("warmup", warm_hot_path)
+
+        elapsed = round((time.time() - t0) * 1000)
+        _set_readiness(state="ready", hot_path_warm=True, startup_ms=elapsed, load_ms=load_ms)
+        print(f"✅ IA lista en {elapsed} ms (índice: {'sí' if index_ok else 'no'}, pasos: {load_ms})")
+
+        # Preguntas más frecuentes del query log al cache, en segundo plano y sin competir con el tráfico
+        if index_ok:
+            schedule_warm("startup")
+    except Exception as e:
+        _set_readiness(state="failed", error=str(e))
+        print(f"❌ Error en el arranque de IA: {e}")
+    return readiness()
+
+def readiness() -> Dict:
+    """Hot-path readiness for /api/ready. ready=True once model, index and warm-up are done."""
+    with _READINESS_LOCK:
+        info = dict(_READINESS)
+    info["ready"] = info["state"] == "ready" and info["index_loaded"]
+    info["cache_warm"] = warmer_stats()
+    return info
+
+def ask_mistral_with_context(query: str, history: str = "", to_phone: Optional[str] = None) -> dict:
     """
     Retrieve-then-generate WITH CACHE:
+    - to_phone (business number the client wrote to) selects the agency partition
     - Check cache first for identical queries
     - If no relevant context above threshold, generate friendly greeting response.
     - Else, send prompt with system instruction + context to Ollama.
     """
-    print(f"IA Query: '{query[:60]}...'")
+    detail("IA query", query=query[:60])
     
     # 1. Check cache first
-    query_hash = _get_query_hash(query, history)
-    cached = _get_cached_response(query_hash)
+    with span("cache_lookup"):
+        tenant = _TENANTS.tenant_for(to_phone) if _TENANTS else None
+        query_hash = _get_query_hash(query, history, tenant)
+        cached = _get_cached_response(query_hash)
     if cached:
-        print(f"Respuesta IA desde CACHE para: {query[:50]}...")
+        detail("Respuesta desde cache")
         return {**cached, "from_cache": True}
-    # 2. Process query normally
-    chunks = get_relevant_chunks(query)
-    print(f"Chunks encontrados: {len(chunks) if chunks else 0}")
+
+    # Ollama saturado o caído: no gastar encode ni búsqueda en una respuesta que no llegará
+    if get_llm_breaker().rejecting():
+        detail("Circuito LLM abierto - respuesta de respaldo")
+        intent = classify_intent(query)
+        return {"question": query, "answer": fast_fallback_reply(query, intent), "used_context": False,
+                "degraded": True, "intent": intent}
+
+    # 2. Process query normally (the query embedding also drives intent detection)
+    with span("embedding"):
+        query_vec = _embed_query(query) if _ensure_ready() else None
+    with span("intent"):
+        intent = classify_intent(query, query_vec=query_vec, encode=_encode_texts)
+    sources = route_sources(intent["intent"])
+    chunks = get_relevant_chunks(query, query_vec=query_vec, to_phone=to_phone, sources=sources)
+    detail("Chunks encontrados", chunks=len(chunks) if chunks else 0, intent=intent["intent"],
+           intent_method=intent["method"], tenant=tenant, sources=sources or "all")
     
     if not chunks:
         # Sin contexto RAG relevante - usar respuesta profesional
-        print("Sin contexto relevante encontrado")
-        friendly_response = _generate_friendly_response(query)
+        detail("Sin contexto relevante")
+        friendly_response = _generate_friendly_response(query, intent)
         response = {
             "question": query, 
             "answer": friendly_response, 
-            "used_context": False
+            "used_context": False,
+            "intent": intent,
         }
         # Cache simple responses too
         _cache_response(query_hash, response)
         return response
     
-    # Log de chunks encontrados
-    for i, (text, sim, meta) in enumerate(chunks[:2]):
-        source = meta.get('source_type', meta.get('pdf', 'unknown'))
-        print(f"Chunk {i+1}: {source} (sim: {sim:.3f}) - {text[:80]}...")
+    # Precio / ubicación / contacto de propiedades de la BD: plantilla, sin Ollama
+    with span("template"):
+        templated = _templated_answer(intent["intent"], chunks)
+    if templated:
+        detail("Respuesta por plantilla (datos de la BD, sin LLM)")
+        response = {
+            "question": query,
+            "answer": _enhance_response_with_appointment_key(query, templated),
+            "used_context": True,
+            "templated": True,
+            "intent": intent,
+        }
+        _cache_response(query_hash, response)
+        return response
+
+    # Log de chunks encontrados (solo solicitudes muestreadas)
+    if sampled():
+        for i, (text, sim, meta) in enumerate(chunks[:2]):
+            detail("Chunk", rank=i + 1, source=meta.get('source_type', meta.get('pdf', 'unknown')),
+                   sim=round(sim, 3), preview=text[:80])
+
+    # Keep only the sentences that matter for this query (cached sentence embeddings)
+    if COMPRESS_CONTEXT_ENABLED:
+        with span("compress"):
+            compressed, compress_stats = compress_chunks(query_vec, chunks, _encode_texts)
+        if compressed:
+            detail("Contexto comprimido", chars_in=compress_stats["chars_in"], chars_out=compress_stats["chars_out"])
+            chunks = compressed
 
-    prompt = _build_prompt(query, chunks, history)
+    with span("prompt_build"):
+        prompt, context_stats = _build_packed_prompt(query, chunks, history)
+    detail("Contexto empaquetado", **context_stats)
 
     try:
         # Configuración optimizada para Mistral - respuestas rápidas y coherentes
-        payload = {
-            "model": OLLAMA_MODEL_NAME, 
-            "prompt": prompt, 
-            "stream": False,
-            "options": {
-                "temperature": 0.2,     # Balanceado para naturalidad sin incoherencias
-                "top_k": 20,           # Suficientes opciones para variedad
-                "top_p": 0.8,          # Mejor para respuestas naturales
-                "repeat_penalty": 1.2,  
-                "num_predict": 200,    # Respuestas más cortas = más rápidas
-                "num_ctx": 512,       # Contexto reducido para velocidad
-                "stop": ["\n\nPregunta:", "Usuario:", "Instrucciones:", "Consulta del cliente:"]
-            }
+        options = {
+            "temperature": 0.2,     # Balanceado para naturalidad sin incoherencias
+            "top_k": 20,           # Suficientes opciones para variedad
+            "top_p": 0.8,          # Mejor para respuestas naturales
+            "repeat_penalty": 1.2,  
+            "num_predict": OLLAMA_NUM_PREDICT,
+            "stop": ["\n\nPregunta:", "Usuario:", "Instrucciones:", "Consulta del cliente:"]
         }
         
-        resp = requests.post(
-            OLLAMA_API_URL,
-            json=payload,
-            timeout=REQUEST_TIMEOUT,
-        )
-        if resp.status_code != 200:
+        try:
+            data = llm_client.generate(model_for("rag"), prompt, options=options, timeout=REQUEST_TIMEOUT, raw_prompt=True)
+        except LLMError as e:
+            if e.status_code is None:
+                raise
             return {
                 "question": query,
                 "answer": "No se pudo obtener una respuesta del modelo.",
                 "used_context": False,
+                "intent": intent,
             }
-        data = resp.json()
         raw_answer = data.get("response", "").strip()
         
-        # Limpiar y validar la respuesta antes de procesarla
-        clean_answer = _clean_and_validate_response(raw_answer, query)
-        
-        # Mejorar respuesta agregando frase clave si cliente muestra interés en agendar
-        enhanced_answer = _enhance_response_with_appointment_key(query, clean_answer)
+        with span("post_process"):
+            # Limpiar y validar la respuesta antes de procesarla
+            clean_answer = _clean_and_validate_response(raw_answer, query)
+            
+            # Mejorar respuesta agregando frase clave si cliente muestra interés en agendar
+            enhanced_answer = _enhance_response_with_appointment_key(query, clean_answer)
         
         # Cache successful response
-        response = {"question": query, "answer": enhanced_answer, "used_context": True}
+        response = {"question": query, "answer": enhanced_answer, "used_context": True,
+                    "context_stats": context_stats, "intent": intent}
         _cache_response(query_hash, response)
         
-    except requests.RequestException as e:
-        print(f"Error de conexión con Ollama: {e}")
+    except LLMError as e:
+        logger.warning(f"Error de conexión con Ollama: {e}")
         # Generar respuesta alternativa profesional en lugar de mostrar error técnico
-        fallback_answer = _generate_friendly_response(query)
-        return {"question": query, "answer": fallback_answer, "used_context": False}
+        fallback_answer = fast_fallback_reply(query, intent)
+        return {"question": query, "answer": fallback_answer, "used_context": False, "degraded": True, "intent": intent}
 
     return response
 
@@ -390,12 +721,12 @@ def _clean_and_validate_response(raw_answer: str, original_query: str) -> str:
     
     # Si contiene frases problemáticas, generar respuesta alternativa
     if any(phrase in answer for phrase in problematic_phrases):
-        print(f"Respuesta problemática detectada, generando alternativa")
+        detail("Respuesta problemática detectada, generando alternativa")
         return _generate_friendly_response(original_query)
     
     # Detectar respuestas sin sentido o muy cortas
     if len(answer) < 10 or answer.count(" ") < 3:
-        print(f"Respuesta demasiado corta, generando alternativa")
+        detail("Respuesta demasiado corta, generando alternativa")
         return _generate_friendly_response(original_query)
     
     # Limpiar caracteres extraños y líneas múltiples
@@ -459,13 +790,14 @@ def summarize_corpus(max_items: int = 8) -> dict:
       "top_titles": [{"pdf": "...", "title": "...", "count": N}]
     }
     """
-    if not (_DOCS and isinstance(_DOCS, list)):
+    docs = _STORE.docs
+    if not (docs and isinstance(docs, list)):
         return {"total_chunks": 0, "pdfs": [], "top_titles": []}
 
     # count chunks per pdf
     by_pdf = Counter()
     title_pairs = Counter()
-    for d in _DOCS:
+    for d in docs:
         meta = (d.get("meta") or {}) if isinstance(d, dict) else {}
         pdf  = meta.get("pdf")
         tit  = meta.get("title")
@@ -478,7 +810,7 @@ def summarize_corpus(max_items: int = 8) -> dict:
     top_titles = [{"pdf": p, "title": t, "count": c} for (p, t), c in title_pairs.most_common(max_items)]
 
     return {
-        "total_chunks": len(_DOCS),
+        "total_chunks": len(docs),
         "pdfs": pdfs,
         "top_titles": top_titles
     }
@@ -492,12 +824,13 @@ def summarize_pdf(pdf_name: str, max_titles: int = 12) -> dict:
       "pages_hint": [10, 11, 12] (optional, only if known)
     }
     """
-    if not (_DOCS and isinstance(_DOCS, list)):
+    docs = _STORE.docs
+    if not (docs and isinstance(docs, list)):
         return {"pdf": pdf_name, "titles": []}
 
     title_counter = Counter()
     pages = set()
-    for d in _DOCS:
+    for d in docs:
         if not isinstance(d, dict):
             continue
         meta = d.get("meta") or {}
@@ -524,16 +857,7 @@ def get_top_candidates(query: str, top_k: int = 6):
     model = get_embedding_model()
     q = model.encode([query], convert_to_numpy=True)
     q = _normalize(q)
-    sims, idxs = _INDEX.search(q, top_k)
-    sims = sims[0]; idxs = idxs[0]
-    out = []
-    for j, i in enumerate(idxs):
-        if i < 0:
-            continue
-        d = _DOCS[i]
-        text = d["text"] if isinstance(d, dict) else str(d)
-        meta = d.get("meta", {}) if isinstance(d, dict) else {}
-        out.append((text, float(sims[j]), meta))
+    out = _STORE.search(q, top_k)
     # highest similarity first
     out.sort(key=lambda x: x[1], reverse=True)
     return out
@@ -0,0 +1,134 @@
+# app/services/intent.py
+# ---------------------------------------------------------------------
+# Shared intent detection for every entry point (fastapi_server, main,
+# chat API, ia_service):
+# - Nearest-centroid over labeled Spanish examples, scored with the query
+#   embedding retrieval already computed (no extra encode per request)
+# - Fallback: one compiled multi-pattern regex, a single pass over the
+#   accent-folded text, when no embedding is available or the match is weak
+# - One result: intent, legacy query_type, interest level, appointment signal
+# ---------------------------------------------------------------------
+
+import os
+import re
+import threading
+import unicodedata
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+INTENT_MIN_SIM = float(os.getenv("INTENT_MIN_SIM", "0.45"))
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.02"))  # vs. second best centroid
+
+# Labeled examples per intent (nearest-centroid training set)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "greeting": ["hola", "buenos días", "buenas tardes", "buenas noches", "hola, qué tal", "hey, buenas"],
+    "thanks": ["gracias", "muchas gracias", "te agradezco", "gracias por la información", "perfecto, gracias"],
+    "help": ["en qué me puedes ayudar", "qué puedes hacer", "cómo funciona esto", "necesito ayuda",
+             "qué servicios ofrecen"],
+    "price": ["cuánto cuesta la casa", "precio del departamento", "cuál es el valor de la propiedad",
+              "qué precio tiene el terreno", "cuánto sale el alquiler", "costo de la casa en Urubo"],
+    "location": ["dónde queda la propiedad", "en qué zona está la casa", "cuál es la dirección",
+                 "ubicación del departamento", "dónde está ubicado el terreno"],
+    "contact": ["teléfono del agente", "cómo contacto al asesor", "número de contacto",
+                "con quién puedo hablar", "pásame el whatsapp del agente"],
+    "appointment": ["quiero agendar una visita", "puedo ver la casa mañana", "coordinar una cita",
+                    "cuándo puedo visitar la propiedad", "me gustaría conocer el departamento"],
+    "sale": ["quiero comprar una casa", "casas en venta", "busco departamento para comprar",
+             "quiero vender mi propiedad"],
+    "rental": ["busco departamento en alquiler", "casas para alquilar", "quiero rentar un local",
+               "alquiler de oficina"],
+    "property": ["tienen casas con piscina", "qué características tiene la casa", "cuántos dormitorios tiene",
+                 "busco un terreno grande", "más información de la propiedad"],
+}
+
+# Fallback patterns on accent-folded lowercase text, in intent priority order.
+# "interest" is a signal only, never an intent.
+_PATTERNS = [
+    ("appointment", r"agend\w*|\bcita\b|visit\w*|coordin\w*|ver la propiedad|cuando puedo|disponible para|conocer(la|lo)?\b"),
+    ("contact", r"telefono|celular|contact\w*|\bllamar\b|whatsapp|\bagente\b|asesor|\bnumero\b"),
+    ("price", r"precio\w*|cuanto (cuesta|vale|sale)|\bcosto\b|\bvalor\b|\bcuanto\b"),
+    ("location", r"\bdonde\b|ubicaci\w*|ubicad[oa]|direccion|\bzona\b"),
+    ("property", r"\bcasa\w*|departamento\w*|terreno\w*|propiedad\w*|\blocal\b|oficina"),
+    ("sale", r"\bventa\b|vend\w*|compra\w*"),
+    ("rental", r"alquil\w*|rent(ar|a)\b|arriendo"),
+    ("help", r"(con|en) que (me )?puedes ayudar|que puedes hacer|capacidades|\bayuda\b"),
+    ("thanks", r"\bgracias\b|te agradezco"),
+    ("greeting", r"\b(hola|holi|hey|que tal|buenas|buenos dias|buenas tardes|buenas noches|saludos)\b"),
+    ("interest", r"me interesa|me gusta|quiero ver|mas (informacion|info|detalles)|caracteristicas|disponible"),
+]
+_MULTI_PATTERN = re.compile("|".join(f"(?P<{name}>{pat})" for name, pat in _PATTERNS))
+_PRIORITY = [name for name, _ in _PATTERNS if name != "interest"]
+
+# Legacy metadata.query_type values (consumed by modulo-respuestas)
+_QUERY_TYPES = {
+    "price": "price_inquiry",
+    "location": "location_inquiry",
+    "property": "property_inquiry",
+    "sale": "sale_inquiry",
+    "rental": "rental_inquiry",
+}
+_HIGH_INTEREST = {"appointment", "contact", "price", "location", "sale", "rental", "interest"}
+
+_centroids: Optional[np.ndarray] = None
+_centroid_labels: List[str] = list(INTENT_EXAMPLES)
+_centroid_lock = threading.Lock()
+
+def _fold(text: str) -> str:
+    """Lowercase without accents (ñ → n is fine for matching)."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+
+def _get_centroids(encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    """One normalized centroid per intent; examples are encoded once per process."""
+    global _centroids
+    if _centroids is None:
+        with _centroid_lock:
+            if _centroids is None:
+                rows = []
+                for label in _centroid_labels:
+                    emb = np.asarray(encode(INTENT_EXAMPLES[label]), dtype="float32")
+                    emb /= np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12
+                    c = emb.mean(axis=0)
+                    rows.append(c / (np.linalg.norm(c) + 1e-12))
+                _centroids = np.vstack(rows)
+    return _centroids
+
+def _nearest_centroid(query_vec: np.ndarray, encode: Callable[[List[str]], np.ndarray]) -> Optional[str]:
+    q = np.asarray(query_vec, dtype="float32").reshape(-1)
+    q = q / (np.linalg.norm(q) + 1e-12)
+    scores = _get_centroids(encode) @ q
+    order = np.argsort(-scores)
+    best, second = scores[order[0]], scores[order[1]]
+    if best < INTENT_MIN_SIM or best - second < INTENT_MIN_MARGIN:
+        return None
+    return _centroid_labels[order[0]]
+
+def classify_intent(text: str, query_vec: Optional[np.ndarray] = None,
+                    encode: Optional[Callable[[List[str]], np.ndarray]] = None) -> Dict:
+    """
+    Classify a user message. With query_vec + encode, nearest-centroid decides the
+    intent; the pattern pass always runs (once) for the interest/appointment signals
+    and as fallback. Returns {intent, query_type, interest, appointment, method}.
+    """
+    signals = {m.lastgroup for m in _MULTI_PATTERN.finditer(_fold(text or ""))}
+
+    intent, method = None, "pattern"
+    if query_vec is not None and encode is not None:
+        try:
+            intent = _nearest_centroid(query_vec, encode)
+            method = "embedding"
+        except Exception as e:
+            print(f"⚠️ Clasificación por embedding no disponible: {e}")
+    if intent is None:
+        method = "pattern"
+        intent = next((name for name in _PRIORITY if name in signals), "general")
+
+    appointment = intent == "appointment" or "appointment" in signals
+    high = intent in _HIGH_INTEREST or bool(signals & _HIGH_INTEREST)
+    return {
+        "intent": intent,
+        "query_type": _QUERY_TYPES.get(intent, "general_inquiry"),
+        "interest": "high" if high else "normal",
+        "appointment": appointment,
+        "method": method,
+    }
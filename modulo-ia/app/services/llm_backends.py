@@ -0,0 +1,285 @@
+# app/services/llm_backends.py
+# ---------------------------------------------------------------------
+# LLM backend pool behind llm_client.generate():
+# - One OllamaBackend per URL in OLLAMA_API_URLS (falls back to OLLAMA_API_URL)
+# - Least-outstanding-requests balancing with a per-backend concurrency
+#   limit; callers wait for a free slot instead of piling onto one node
+# - Failover to the next backend on connection errors / 5xx; failed
+#   backends are marked down and re-admitted by a health-check thread
+# - MockBackend (LLM_BACKEND=mock): deterministic fake Ollama with
+#   configurable latency and token rate, for load tests without a model
+# ---------------------------------------------------------------------
+
+import os
+import time
+import hashlib
+import threading
+import requests
+from typing import Dict, List, Optional
+
+# Optional: load environment if not done elsewhere
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+OLLAMA_API_URLS = [u.strip() for u in os.getenv("OLLAMA_API_URLS", "").split(",") if u.strip()] or [OLLAMA_API_URL]
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama").lower()  # "ollama" | "mock"
+LLM_BACKEND_MAX_CONCURRENCY = int(os.getenv("LLM_BACKEND_MAX_CONCURRENCY", "2"))  # Ollama procesa pocas a la vez en CPU
+LLM_HEALTH_INTERVAL_SEC = float(os.getenv("LLM_HEALTH_INTERVAL_SEC", "15"))
+
+# Mock backend (deterministic)
+MOCK_LLM_BACKENDS = int(os.getenv("MOCK_LLM_BACKENDS", "1"))
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "200"))      # fixed overhead per call
+MOCK_LLM_PROMPT_TOKENS_PER_SEC = float(os.getenv("MOCK_LLM_PROMPT_TOKENS_PER_SEC", "400"))
+MOCK_LLM_TOKENS_PER_SEC = float(os.getenv("MOCK_LLM_TOKENS_PER_SEC", "15"))
+MOCK_LLM_LOAD_MS = float(os.getenv("MOCK_LLM_LOAD_MS", "0"))            # first call per model
+
+class LLMError(requests.RequestException):
+    """LLM call failed. status_code is set when the backend answered with a non-200."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _retryable(err: LLMError) -> bool:
+    return err.status_code is None or err.status_code >= 500
+
+class OllamaBackend:
+    """A single Ollama /api/generate endpoint."""
+
+    def __init__(self, url: str, max_concurrency: int = LLM_BACKEND_MAX_CONCURRENCY):
+        self.name = url
+        self.url = url
+        self.max_concurrency = max(1, max_concurrency)
+        self.outstanding = 0
+        self.peak_outstanding = 0  # most calls in flight at once (balancing check in load tests)
+        self.healthy = True
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def generate(self, payload: Dict, timeout: float) -> Dict:
+        try:
+            resp = requests.post(self.url, json=payload, timeout=timeout)
+        except requests.RequestException as e:
+            raise LLMError(str(e)) from e
+        if resp.status_code != 200:
+            raise LLMError(f"Ollama respondió {resp.status_code}", status_code=resp.status_code)
+        return resp.json()
+
+    def health_check(self) -> bool:
+        try:
+            return requests.get(self.url.replace("/api/generate", "/api/tags"), timeout=2).status_code == 200
+        except requests.RequestException:
+            return False
+
+class MockBackend(OllamaBackend):
+    """
+    Fake Ollama: same prompt → same answer and same timings. Latency =
+    fixed overhead + prompt tokens / prompt rate + answer tokens / token rate.
+    Returns Ollama's timing fields (nanoseconds) so stats and load detection work unchanged.
+    """
+
+    def __init__(self, name: str = "mock", max_concurrency: int = LLM_BACKEND_MAX_CONCURRENCY,
+                 latency_ms: float = MOCK_LLM_LATENCY_MS, tokens_per_sec: float = MOCK_LLM_TOKENS_PER_SEC,
+                 prompt_tokens_per_sec: float = MOCK_LLM_PROMPT_TOKENS_PER_SEC, load_ms: float = MOCK_LLM_LOAD_MS):
+        super().__init__(name, max_concurrency)
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.load_ms = load_ms
+        self._loaded = set()
+        self._loaded_lock = threading.Lock()
+
+    def generate(self, payload: Dict, timeout: float) -> Dict:
+        prompt = payload.get("prompt", "")
+        num_predict = int(payload.get("options", {}).get("num_predict", 200))
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        eval_count = max(1, min(num_predict, 20 + digest[0] % 60))
+        with self._loaded_lock:
+            load_ms = 0.0 if payload["model"] in self._loaded else self.load_ms
+            self._loaded.add(payload["model"])
+
+        prompt_ms = 1000 * prompt_tokens / self.prompt_tokens_per_sec
+        eval_ms = 1000 * eval_count / self.tokens_per_sec
+        total_ms = self.latency_ms + load_ms + prompt_ms + eval_ms
+        if total_ms / 1000 > timeout:
+            time.sleep(timeout)
+            raise LLMError(f"mock: timeout tras {timeout}s")
+        time.sleep(total_ms / 1000)
+
+        words = ("propiedad", "zona", "precio", "contacto", "visita", "alquiler", "venta", "detalles")
+        answer = " ".join(words[b % len(words)] for b in digest)
+        return {
+            "model": payload["model"],
+            "response": f"[mock] {answer}.",
+            "done": True,
+            "total_duration": int(total_ms * 1e6),
+            "load_duration": int(load_ms * 1e6),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_ms * 1e6),
+            "eval_count": eval_count,
+            "eval_duration": int(eval_ms * 1e6),
+        }
+
+    def health_check(self) -> bool:
+        return True
+
+class BackendPool:
+    """Least-outstanding-requests pool with concurrency limits, failover and health checks."""
+
+    def __init__(self, backends: List[OllamaBackend]):
+        if not backends:
+            raise ValueError("BackendPool necesita al menos un backend")
+        self.backends = backends
+        self._cond = threading.Condition()
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _pick(self, exclude: set) -> Optional[OllamaBackend]:
+        candidates = [b for b in self.backends if b not in exclude and b.outstanding < b.max_concurrency]
+        healthy = [b for b in candidates if b.healthy]
+        if healthy:
+            candidates = healthy
+        elif any(b.healthy for b in self.backends if b not in exclude):
+            return None  # a healthy one is only busy: wait for it
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: b.outstanding / b.max_concurrency)
+
+    def _acquire(self, exclude: set, deadline: float) -> OllamaBackend:
+        with self._cond:
+            while True:
+                backend = self._pick(exclude)
+                if backend is not None:
+                    backend.outstanding += 1
+                    backend.peak_outstanding = max(backend.peak_outstanding, backend.outstanding)
+                    backend.requests += 1
+                    return backend
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMError("Ningún backend LLM disponible (todos ocupados)")
+                self._cond.wait(remaining)
+
+    def _acquire_slot(self, backend: OllamaBackend, deadline: float):
+        """Take a concurrency slot on one specific backend (broadcast)."""
+        with self._cond:
+            while backend.outstanding >= backend.max_concurrency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMError(f"Backend LLM {backend.name} ocupado")
+                self._cond.wait(remaining)
+            backend.outstanding += 1
+            backend.peak_outstanding = max(backend.peak_outstanding, backend.outstanding)
+            backend.requests += 1
+
+    def _release(self, backend: OllamaBackend, error: Optional[LLMError] = None):
+        with self._cond:
+            backend.outstanding -= 1
+            if error is not None:
+                backend.errors += 1
+                backend.last_error = str(error)
+                if _retryable(error):
+                    backend.healthy = False
+            self._cond.notify_all()
+
+    def generate(self, payload: Dict, timeout: float = 60) -> Dict:
+        """Send payload to the least loaded backend; fail over on connection errors / 5xx."""
+        deadline = time.monotonic() + timeout
+        tried = set()
+        last_error: Optional[LLMError] = None
+        while len(tried) < len(self.backends):
+            backend = self._acquire(tried, deadline)
+            tried.add(backend)
+            try:
+                data = backend.generate(payload, max(0.1, deadline - time.monotonic()))
+            except LLMError as e:
+                self._release(backend, e)
+                last_error = e
+                if not _retryable(e) or deadline <= time.monotonic():
+                    raise
+                print(f"⚠️ Backend LLM {backend.name} falló ({e}), probando otro")
+                continue
+            self._release(backend)
+            backend.healthy = True
+            return data
+        raise last_error
+
+    def broadcast(self, payload: Dict, timeout: float = 60) -> int:
+        """Send payload to every healthy backend (warm-up / keep-warm). Returns successes."""
+        ok = 0
+        for backend in [b for b in self.backends if b.healthy]:
+            deadline = time.monotonic() + timeout
+            try:
+                self._acquire_slot(backend, deadline)
+            except LLMError as e:
+                print(f"⚠️ Backend LLM {backend.name}: {e}")
+                continue
+            try:
+                backend.generate(payload, max(0.1, deadline - time.monotonic()))
+            except LLMError as e:
+                self._release(backend, e)
+                print(f"⚠️ Backend LLM {backend.name}: {e}")
+                continue
+            self._release(backend)
+            ok += 1
+        return ok
+
+    def _health_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            for backend in self.backends:
+                healthy = backend.health_check()
+                with self._cond:
+                    if healthy and not backend.healthy:
+                        print(f"✅ Backend LLM {backend.name} disponible de nuevo")
+                    backend.healthy = healthy
+                    self._cond.notify_all()
+
+    def start_health_checks(self, interval: float = LLM_HEALTH_INTERVAL_SEC):
+        if interval <= 0 or (self._health_thread and self._health_thread.is_alive()):
+            return
+        self._stop.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, args=(interval,), name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+
+    def stats(self) -> List[Dict]:
+        with self._cond:
+            return [{
+                "name": b.name,
+                "healthy": b.healthy,
+                "outstanding": b.outstanding,
+                "peak_outstanding": b.peak_outstanding,
+                "max_concurrency": b.max_concurrency,
+                "requests": b.requests,
+                "errors": b.errors,
+                "last_error": b.last_error,
+            } for b in self.backends]
+
+# --- Singleton ----------------------------------------------------------
+
+_pool: Optional[BackendPool] = None
+_pool_lock = threading.Lock()
+
+def get_backend_pool() -> BackendPool:
+    """Pool built from LLM_BACKEND / OLLAMA_API_URLS on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if LLM_BACKEND == "mock":
+                    backends = [MockBackend(f"mock-{i}") for i in range(max(1, MOCK_LLM_BACKENDS))]
+                    print(f"🧪 LLM en modo mock ({len(backends)} backend(s), {MOCK_LLM_TOKENS_PER_SEC:g} tok/s)")
+                else:
+                    backends = [OllamaBackend(url) for url in OLLAMA_API_URLS]
+                _pool = BackendPool(backends)
+                if len(backends) > 1:
+                    _pool.start_health_checks()
+    return _pool
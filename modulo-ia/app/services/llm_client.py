@@ -0,0 +1,239 @@
+# app/services/llm_client.py
+# ---------------------------------------------------------------------
+# Single entry point for every Ollama /api/generate call:
+# - Byte-identical static prefix (system instruction) at the start of
+#   every prompt, so Ollama can reuse its cached prompt prefix
+# - Same num_ctx on every call: a different num_ctx makes Ollama reload
+#   the model
+# - keep_alive on every request + optional keep-warm pings while idle
+# - Model-load detection from Ollama's load_duration timing field
+# - Requests go through the backend pool (llm_backends): several Ollama
+#   URLs, least-outstanding balancing, failover, or a mock backend
+# - Latency/error circuit breaker: while open, calls fail fast
+# ---------------------------------------------------------------------
+
+import os
+import time
+import threading
+import requests
+from typing import Dict, List, Optional
+
+from app.services.llm_backends import LLMError, get_backend_pool
+from app.services.circuit_breaker import CLOSED, get_llm_breaker
+from app.services.metrics import span, observe_llm_timings, background_job
+
+# Optional: load environment if not done elsewhere
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+
+# --- Model routing: one config for every LLM call site ----------------
+# Request classes: "rag" (answers with context), "smalltalk" (greetings),
+# "help" (capabilities / guidance). Unset routes fall back to the default,
+# so a single OLLAMA_MODEL_NAME keeps exactly one model resident.
+LLM_DEFAULT_MODEL = os.getenv("LLM_MODEL_DEFAULT") or os.getenv("OLLAMA_MODEL_NAME", "phi")
+MODEL_ROUTES: Dict[str, str] = {
+    "rag": os.getenv("LLM_MODEL_RAG", LLM_DEFAULT_MODEL),
+    "smalltalk": os.getenv("LLM_MODEL_SMALLTALK", LLM_DEFAULT_MODEL),
+    "help": os.getenv("LLM_MODEL_HELP", LLM_DEFAULT_MODEL),
+}
+LLM_MAX_RESIDENT_MODELS = int(os.getenv("LLM_MAX_RESIDENT_MODELS", "1"))  # como OLLAMA_MAX_LOADED_MODELS
+LLM_MAX_MEMORY_FRACTION = float(os.getenv("LLM_MAX_MEMORY_FRACTION", "0.7"))  # RAM usable por modelos
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "512"))        # Contexto reducido para velocidad
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", "200"))  # Respuestas más cortas = más rápidas
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")         # cuánto mantiene Ollama el modelo en RAM
+OLLAMA_KEEP_WARM_SEC = int(os.getenv("OLLAMA_KEEP_WARM_SEC", "240"))  # ping si no hubo llamadas (0 = off)
+LOAD_EVENT_THRESHOLD_MS = float(os.getenv("OLLAMA_LOAD_EVENT_MS", "500"))
+
+# --- Instrucciones cortas para el modelo ---
+SYSTEM_INSTRUCTION = """Eres Remaxi, asistente inmobiliario de Remax Express. Responde con información específica de propiedades usando datos del contexto. Si no tienes información suficiente, pide más detalles sobre zona, tipo de propiedad y si es para compra/alquiler."""
+
+# Static prefix shared by ALL prompts. Do not interpolate anything request-specific here.
+PROMPT_PREFIX = f"Instrucciones: {SYSTEM_INSTRUCTION}\n\n"
+
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "load_events": 0,
+    "last_load_ms": None,
+    "last_load_at": None,
+    "last_request_at": None,
+    "last_ping_at": None,  # warm-up / keep-warm (no cuentan como requests)
+}
+_models_in_use = set()
+
+def model_for(request_class: str) -> str:
+    """Model serving a request class ("rag", "smalltalk", "help")."""
+    return MODEL_ROUTES.get(request_class, LLM_DEFAULT_MODEL)
+
+def _host_memory_bytes() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None  # not available (e.g. Windows)
+
+def check_model_residency() -> Dict:
+    """
+    Warn when the routing config needs more resident models than the host can hold:
+    more distinct models than LLM_MAX_RESIDENT_MODELS, or (when Ollama reports model
+    sizes) more memory than LLM_MAX_MEMORY_FRACTION of host RAM. Call at startup.
+    """
+    models: List[str] = sorted(set(MODEL_ROUTES.values()))
+    report = {"routes": dict(MODEL_ROUTES), "distinct_models": models, "max_resident": LLM_MAX_RESIDENT_MODELS, "warnings": []}
+
+    if len(models) > LLM_MAX_RESIDENT_MODELS:
+        report["warnings"].append(
+            f"El ruteo usa {len(models)} modelos ({', '.join(models)}) pero solo caben {LLM_MAX_RESIDENT_MODELS} "
+            "en memoria: Ollama los intercambiará con recargas de varios segundos"
+        )
+
+    # Best effort: model sizes from Ollama vs host RAM
+    try:
+        tags = requests.get(OLLAMA_API_URL.replace("/api/generate", "/api/tags"), timeout=3).json()
+        sizes = {m.get("name", ""): m.get("size", 0) for m in tags.get("models", [])}
+        needed = sum(sizes.get(m, sizes.get(f"{m}:latest", 0)) for m in models)
+        ram = _host_memory_bytes()
+        report["models_bytes"] = needed
+        report["host_ram_bytes"] = ram
+        if ram and needed > LLM_MAX_MEMORY_FRACTION * ram:
+            report["warnings"].append(
+                f"Los modelos ruteados ocupan {needed / 2**30:.1f} GiB, más del "
+                f"{LLM_MAX_MEMORY_FRACTION:.0%} de la RAM ({ram / 2**30:.1f} GiB)"
+            )
+    except (requests.RequestException, ValueError):
+        pass
+
+    for w in report["warnings"]:
+        print(f"⚠️ {w}")
+    return report
+
+def log_model_residency():
+    """Startup hook shared by the servers: check_model_residency that never raises. Run it in a thread."""
+    try:
+        report = check_model_residency()
+        print(f"🧭 Ruteo LLM: {report['routes']}")
+    except Exception as e:
+        print(f"⚠️ No se pudo verificar el ruteo de modelos: {e}")
+
+def build_prompt(body: str) -> str:
+    """Prompt = fixed instruction prefix + request-specific body."""
+    return PROMPT_PREFIX + body
+
+def _record(model: str, data: Optional[Dict], error: bool = False):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["last_request_at"] = time.time()
+        _models_in_use.add(model)
+        if error:
+            _stats["errors"] += 1
+            return
+        load_ms = (data or {}).get("load_duration", 0) / 1e6
+        if load_ms >= LOAD_EVENT_THRESHOLD_MS:
+            _stats["load_events"] += 1
+            _stats["last_load_ms"] = round(load_ms, 1)
+            _stats["last_load_at"] = time.time()
+    if load_ms >= LOAD_EVENT_THRESHOLD_MS:
+        print(f"⚠️ Ollama cargó el modelo {model} en esta llamada ({load_ms:.0f} ms)")
+
+def generate(model: str, body: str, options: Optional[Dict] = None, timeout: float = 60,
+             raw_prompt: bool = False) -> Dict:
+    """
+    POST /api/generate (non-streaming) and return Ollama's JSON
+    (response, load_duration, prompt_eval_count, prompt_eval_duration, eval_duration...).
+    body goes after PROMPT_PREFIX unless raw_prompt=True. Raises LLMError
+    (immediately, without calling Ollama, while the circuit breaker is open).
+    Background jobs (metrics.background_work) only run while the circuit is
+    closed and never feed it: it tracks the health seen by live traffic.
+    """
+    breaker = get_llm_breaker()
+    live = background_job() is None
+    if not (breaker.allow_request() if live else breaker.state() == CLOSED):
+        raise LLMError("Circuito LLM abierto")
+    opts = dict(options or {})
+    opts["num_ctx"] = OLLAMA_NUM_CTX  # never vary per call (would force a model reload)
+    payload = {
+        "model": model,
+        "prompt": body if raw_prompt else build_prompt(body),
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": opts,
+    }
+    t0 = time.time()
+    try:
+        with span("llm"):
+            data = get_backend_pool().generate(payload, timeout=timeout)
+    except LLMError as e:
+        if live:
+            breaker.record_failure(e)
+        _record(model, None, error=True)
+        raise
+    if live:
+        breaker.record_success((time.time() - t0) * 1000)
+    _record(model, data)
+    observe_llm_timings(data)
+    return data
+
+def _ping_payload(model: str) -> Dict:
+    return {
+        "model": model,
+        "prompt": PROMPT_PREFIX + "Hola",
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"num_predict": 1, "num_ctx": OLLAMA_NUM_CTX},
+    }
+
+def warm_up(model: str, timeout: float = 30) -> bool:
+    """Load the model and prime the shared prompt prefix on every backend."""
+    print("Warming up Ollama...")
+    ok = get_backend_pool().broadcast(_ping_payload(model), timeout=timeout)
+    with _stats_lock:
+        _models_in_use.add(model)
+        if ok:
+            _stats["last_ping_at"] = time.time()
+    if ok:
+        print(f"Ollama warm-up completado con modelo {model} ({ok} backend(s))")
+    else:
+        print("Ollama warm-up error: ningún backend respondió")
+    return ok > 0
+
+# --- Keep-warm ---------------------------------------------------------
+
+_keep_warm_thread: Optional[threading.Thread] = None
+_keep_warm_stop = threading.Event()
+
+def _keep_warm_loop(interval: float):
+    while not _keep_warm_stop.wait(interval / 4):
+        with _stats_lock:
+            last = max(_stats["last_request_at"] or 0, _stats["last_ping_at"] or 0)
+            models = sorted(_models_in_use)
+        if time.time() - last < interval:
+            continue
+        for model in models:
+            if get_backend_pool().broadcast(_ping_payload(model), timeout=60):
+                with _stats_lock:
+                    _stats["last_ping_at"] = time.time()
+            else:
+                print(f"Keep-warm de {model} falló en todos los backends")
+
+def start_keep_warm(interval: float = OLLAMA_KEEP_WARM_SEC):
+    """Ping every model used so far whenever no call happened for `interval` seconds."""
+    global _keep_warm_thread
+    if interval <= 0 or (_keep_warm_thread and _keep_warm_thread.is_alive()):
+        return
+    _keep_warm_stop.clear()
+    _keep_warm_thread = threading.Thread(target=_keep_warm_loop, args=(interval,), name="ollama-keep-warm", daemon=True)
+    _keep_warm_thread.start()
+
+def stop_keep_warm():
+    _keep_warm_stop.set()
+
+def get_llm_stats() -> Dict:
+    with _stats_lock:
+        return {**_stats, "models_in_use": sorted(_models_in_use), "routes": dict(MODEL_ROUTES),
+                "keep_alive": OLLAMA_KEEP_ALIVE, "backends": get_backend_pool().stats(),
+                "breaker": get_llm_breaker().stats()}
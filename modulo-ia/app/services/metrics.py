@@ -0,0 +1,215 @@
+# app/services/metrics.py
+# ---------------------------------------------------------------------
+# Per-stage latency tracing for the query path + Prometheus exposition:
+# - span("faiss_search") times a block into a histogram labeled by stage
+#   and into the current request trace (contextvar, one per request)
+# - observe_stage() records durations measured elsewhere (Ollama timings)
+# - Counters for outcomes and LLM tokens, gauges read at scrape time
+# - background_work() marks calls made by background jobs (cache warmer):
+#   they stay out of the stage histograms and LLM token counters, which
+#   describe live traffic; their tokens are counted per job instead
+# - render_prometheus() → text format 0.0.4 for GET /metrics
+# No client library: the few metric types we need are kept here.
+# ---------------------------------------------------------------------
+
+import os
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TIMINGS_IN_METADATA = os.getenv("METRICS_TIMINGS_IN_METADATA", "false").lower() == "true"
+
+# Seconds; the query path spans from sub-millisecond cache hits to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _fmt_value(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name, self.help = name, help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {_fmt_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List] = {}  # key → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        pos = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if pos < len(self.buckets):
+                series[pos] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', _fmt_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(series[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {series[-1]}")
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time (cache sizes, breaker state...)."""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]):
+        self.name, self.help, self.fn = name, help_text, fn
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.fn())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_fmt_value(value)}"]
+
+# --- Registry ----------------------------------------------------------
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+def register_gauge(name: str, help_text: str, fn: Callable[[], float]):
+    with _registry_lock:
+        _registry[name] = Gauge(name, help_text, fn)
+
+STAGE_SECONDS = _register(Histogram(
+    "ia_stage_duration_seconds", "Latency of each stage of the query path"))
+REQUEST_SECONDS = _register(Histogram(
+    "ia_request_duration_seconds", "End-to-end latency of /api/query by outcome"))
+REQUESTS_TOTAL = _register(Counter(
+    "ia_requests_total", "Queries answered, by outcome"))
+LLM_TOKENS_TOTAL = _register(Counter(
+    "ia_llm_tokens_total", "Tokens processed by the LLM (prompt = prompt-eval, generated = eval)"))
+CACHE_WARM_TOTAL = _register(Counter(
+    "ia_cache_warm_total", "Questions replayed by the cache warmer, by result"))
+BACKGROUND_LLM_TOKENS_TOTAL = _register(Counter(
+    "ia_background_llm_tokens_total", "Tokens processed by the LLM for background jobs, by job and kind"))
+
+def render_prometheus() -> str:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Request traces ----------------------------------------------------
+
+_current_trace: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "ia_current_trace", default=None)
+
+@contextmanager
+def trace_request():
+    """Collect the stage durations of one request; yields the dict of stage → ms."""
+    trace: Dict[str, float] = {}
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+# --- Background work ---------------------------------------------------
+
+_background_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "ia_background_job", default=None)
+
+@contextmanager
+def background_work(job: str):
+    """Run a block as background job `job` (e.g. "cache_warmer") instead of live traffic."""
+    token = _background_job.set(job)
+    try:
+        yield
+    finally:
+        _background_job.reset(token)
+
+def background_job() -> Optional[str]:
+    return _background_job.get()
+
+def observe_stage(stage: str, seconds: float):
+    if not METRICS_ENABLED or _background_job.get() is not None:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[stage] = round(trace.get(stage, 0.0) + seconds * 1000, 2)
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - t0)
+
+def observe_llm_timings(data: Dict):
+    """Split an Ollama /api/generate response into load / prompt-eval / generation (ns fields)."""
+    for stage, field in (("llm_load", "load_duration"),
+                         ("llm_prompt_eval", "prompt_eval_duration"),
+                         ("llm_generation", "eval_duration")):
+        ns = data.get(field) or 0
+        if ns:
+            observe_stage(stage, ns / 1e9)
+    if not METRICS_ENABLED:
+        return
+    job = _background_job.get()
+    if job is not None:
+        BACKGROUND_LLM_TOKENS_TOTAL.inc(data.get("prompt_eval_count") or 0, job=job, kind="prompt")
+        BACKGROUND_LLM_TOKENS_TOTAL.inc(data.get("eval_count") or 0, job=job, kind="generated")
+        return
+    LLM_TOKENS_TOTAL.inc(data.get("prompt_eval_count") or 0, kind="prompt")
+    LLM_TOKENS_TOTAL.inc(data.get("eval_count") or 0, kind="generated")
+
+def record_request(outcome: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    REQUESTS_TOTAL.inc(outcome=outcome)
+    REQUEST_SECONDS.observe(seconds, outcome=outcome)
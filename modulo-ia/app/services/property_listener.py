@@ -0,0 +1,274 @@
+# app/services/property_listener.py
+# ---------------------------------------------------------------------
+# Live property updates via PostgreSQL LISTEN/NOTIFY:
+# - A trigger on Propiedad publishes {"op", "id"} on a channel; one on
+#   Usuario re-publishes the agent's properties when the name or phone
+#   quoted in their documents (and used for tenant routing) changes
+# - A background thread LISTENs on a dedicated pooled connection
+# - Changed ids are coalesced for a short window, then re-embedded and
+#   hot-patched into the in-memory FAISS index (no reindex, no restart)
+# - On every (re)connect the indexed properties are diffed against
+#   Propiedad: changes made while nobody listened (disconnect, restart;
+#   live patches are not written to the on-disk index) are applied too
+# Optional: enable with PROPERTY_LISTENER_ENABLED=true
+# ---------------------------------------------------------------------
+
+import os
+import json
+import time
+import select
+import threading
+from typing import Dict, List, Optional, Set
+
+from app.services.db_pool import get_db_pool
+
+PROPERTY_LISTENER_ENABLED = os.getenv("PROPERTY_LISTENER_ENABLED", "false").lower() == "true"
+PROPERTY_NOTIFY_CHANNEL = os.getenv("PROPERTY_NOTIFY_CHANNEL", "propiedad_changes")
+DEBOUNCE_SEC = float(os.getenv("PROPERTY_LISTENER_DEBOUNCE_MS", "500")) / 1000.0
+RECONNECT_MAX_SEC = float(os.getenv("PROPERTY_LISTENER_RECONNECT_MAX_SEC", "30"))
+
+# Trigger installed by install_notify_trigger(). The Node modulo-base-datos keeps
+# writing to Propiedad as usual; PostgreSQL fans the change out to listeners.
+NOTIFY_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION remaxi_notify_propiedad() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        '{channel}',
+        json_build_object('op', TG_OP, 'id', COALESCE(NEW.id, OLD.id))::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS remaxi_propiedad_notify ON Propiedad;
+CREATE TRIGGER remaxi_propiedad_notify
+    AFTER INSERT OR UPDATE OR DELETE ON Propiedad
+    FOR EACH ROW EXECUTE FUNCTION remaxi_notify_propiedad();
+
+CREATE OR REPLACE FUNCTION remaxi_notify_usuario() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        '{channel}',
+        json_build_object('op', 'UPDATE', 'id', p.id)::text
+    )
+    FROM Propiedad p
+    WHERE p.usuario_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS remaxi_usuario_notify ON Usuario;
+CREATE TRIGGER remaxi_usuario_notify
+    AFTER UPDATE OF nombre, apellido, telefono ON Usuario
+    FOR EACH ROW
+    WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre
+          OR OLD.apellido IS DISTINCT FROM NEW.apellido
+          OR OLD.telefono IS DISTINCT FROM NEW.telefono)
+    EXECUTE FUNCTION remaxi_notify_usuario();
+"""
+
+def install_notify_trigger(channel: str = PROPERTY_NOTIFY_CHANNEL) -> bool:
+    """Create (or replace) the NOTIFY triggers on Propiedad and Usuario. Idempotent."""
+    pool = get_db_pool()
+    conn = None
+    try:
+        conn = pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute(NOTIFY_TRIGGER_SQL.format(channel=channel))
+        conn.commit()
+        print(f"✅ Triggers NOTIFY instalados en Propiedad y Usuario (canal '{channel}')")
+        return True
+    except Exception as e:
+        print(f"❌ Error instalando trigger NOTIFY: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            pool.putconn(conn)
+
+class PropertyChangeListener:
+    """Background LISTEN loop that keeps the in-memory index in sync with Propiedad."""
+
+    def __init__(self, channel: str = PROPERTY_NOTIFY_CHANNEL, debounce_sec: float = DEBOUNCE_SEC):
+        self.channel = channel
+        self.debounce_sec = debounce_sec
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Set[int] = set()
+        self._retry_sec = 0.0  # backoff after a failed index update (0 = none pending)
+        self.stats = {"notifications": 0, "upserted": 0, "removed": 0, "errors": 0, "resyncs": 0,
+                      "last_event_at": None}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="property-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # --- loop ---------------------------------------------------------
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"❌ Listener de propiedades desconectado: {e}. Reintentando en {backoff:.0f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_SEC)
+
+    def _listen(self):
+        pool = get_db_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            conn.rollback()  # pooled connections may be idle in transaction
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            print(f"👂 Escuchando cambios de propiedades en canal '{self.channel}'")
+            # After LISTEN: changes committed during the diff still arrive as notifications
+            self._resync()
+
+            deadline = self._next_flush() if self._pending else None
+            while not self._stop.is_set():
+                # Wake up at the debounce deadline, otherwise poll every second for stop()
+                timeout = max(0.0, deadline - time.monotonic()) if deadline else 1.0
+                if select.select([conn], [], [], timeout) != ([], [], []):
+                    conn.poll()
+                    while conn.notifies:
+                        self._on_notify(conn.notifies.pop(0).payload)
+                    if self._pending and deadline is None:
+                        deadline = self._next_flush()
+
+                if deadline and time.monotonic() >= deadline:
+                    self._flush()
+                    deadline = self._next_flush() if self._pending else None
+        except Exception:
+            broken = True
+            raise
+        finally:
+            if not broken:
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f'UNLISTEN "{self.channel}"')
+                    conn.autocommit = False
+                except Exception:
+                    broken = True
+            pool.putconn(conn, close=broken)
+
+    def _next_flush(self) -> float:
+        return time.monotonic() + (self._retry_sec or self.debounce_sec)
+
+    def _on_notify(self, payload: str):
+        self.stats["notifications"] += 1
+        try:
+            prop_id = int(json.loads(payload)["id"])
+        except (ValueError, KeyError, TypeError):
+            # Plain-id payloads are accepted too (e.g. manual NOTIFY from psql)
+            try:
+                prop_id = int(payload)
+            except ValueError:
+                print(f"⚠️ Notificación ignorada, payload inválido: {payload!r}")
+                return
+        self._pending.add(prop_id)
+
+    def _resync(self):
+        """
+        Diff the indexed text of every property against Propiedad (one streamed read)
+        and patch what differs: new or changed rows are re-embedded, rows no longer
+        active are removed. Unchanged properties cost no embedding.
+        """
+        from app.services import ia_service
+
+        indexed = ia_service.indexed_property_texts()
+        if indexed is None:
+            return
+        docs, seen = [], set()
+        for doc in get_db_pool().iter_properties():
+            prop_id = doc["meta"]["property_id"]
+            seen.add(prop_id)
+            if indexed.get(prop_id) != doc["text"]:
+                docs.append(doc)
+        gone = sorted(set(indexed) - seen)
+        self.stats["resyncs"] += 1
+        if not (docs or gone):
+            print(f"✅ Índice al día con Propiedad ({len(seen)} propiedades)")
+            return
+        print(f"🔁 Resincronizando índice: {len(docs)} propiedades nuevas o cambiadas, {len(gone)} eliminadas")
+        self._apply(docs, gone)
+
+    def _flush(self):
+        """Re-read changed properties and patch the index (inactive/deleted → removed)."""
+        ids, self._pending = sorted(self._pending), set()
+        pool = get_db_pool()
+        docs, gone = [], []
+        try:
+            for prop_id in ids:
+                doc = pool.fetch_property(prop_id)
+                if doc:
+                    docs.append(doc)
+                else:
+                    gone.append(prop_id)
+        except Exception:
+            # Keep the ids for the next flush after reconnecting
+            self._pending.update(ids)
+            raise
+        self._apply(docs, gone)
+
+    def _apply(self, docs: List[Dict], gone: List[int]):
+        """Re-embed `docs` and drop `gone` from the indexes; on failure their ids are retried with backoff."""
+        from app.services import ia_service
+
+        pool = get_db_pool()
+        ids = sorted({d["meta"]["property_id"] for d in docs} | set(gone))
+        try:
+            upserted = ia_service.upsert_property_docs(docs)
+            removed = ia_service.remove_property_docs(gone) if gone else 0
+        except Exception as e:
+            # Patching is idempotent: the ids are re-read and re-applied on the next flush
+            self.stats["errors"] += 1
+            self._pending.update(ids)
+            self._retry_sec = min(max(self._retry_sec * 2, 1.0), RECONNECT_MAX_SEC)
+            print(f"❌ Error actualizando índice para propiedades {ids}: {e}. Reintento en {self._retry_sec:.0f}s")
+            return
+        self._retry_sec = 0.0
+
+        # The properties cache would otherwise serve the old rows until TTL
+        pool.invalidate_cache()
+        self.stats["upserted"] += upserted
+        self.stats["removed"] += removed
+        self.stats["last_event_at"] = time.time()
+        print(f"🔄 Índice actualizado en vivo: {upserted} propiedades re-indexadas, {removed} eliminadas")
+
+# Global singleton instance
+_listener: Optional[PropertyChangeListener] = None
+
+def get_property_listener() -> Optional[PropertyChangeListener]:
+    return _listener
+
+def start_property_listener(force: bool = False) -> Optional[PropertyChangeListener]:
+    """Start the listener if PROPERTY_LISTENER_ENABLED (or force). Safe to call twice."""
+    global _listener
+    if not (PROPERTY_LISTENER_ENABLED or force):
+        return None
+    if _listener is None:
+        _listener = PropertyChangeListener()
+    _listener.start()
+    return _listener
+
+def stop_property_listener():
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,111 @@
+# app/services/query_log.py
+# ---------------------------------------------------------------------
+# Query log (JSONL), the input of cache warming and index tuning:
+# - One line per /api/query: normalized question, intent, cache hit/miss,
+#   outcome, latency and the business number (to_phone); the client's
+#   number is never written
+# - Written by a writer thread through a bounded queue (structured_log):
+#   a full queue drops the line instead of blocking the request
+# - Rotated at QUERY_LOG_MAX_MB; top_queries() reads the file and its
+#   backups (cache_warmer), scripts/autotune_index.py reads "query"
+# ---------------------------------------------------------------------
+
+import os
+import json
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+from app.utils.structured_log import queued_handler
+
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "true").lower() == "true"
+QUERY_LOG_FILE = os.getenv("QUERY_LOG_FILE", "data/query_log.jsonl")
+QUERY_LOG_MAX_MB = float(os.getenv("QUERY_LOG_MAX_MB", "50"))
+QUERY_LOG_BACKUPS = int(os.getenv("QUERY_LOG_BACKUPS", "3"))
+QUERY_LOG_WINDOW_DAYS = float(os.getenv("QUERY_LOG_WINDOW_DAYS", "7"))  # top_queries() horizon
+
+# Synthetic traffic (scripts/load_test.py, scripts/benchmark.py) must not decide what gets warmed
+_SKIP_SOURCES = {"loadtest", "benchmark"}
+
+_logger = logging.getLogger("modulo_ia.query_log")
+_logger.propagate = False  # its own file, not the service log
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+class _LineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="seconds")}
+        entry.update(record.fields)
+        return json.dumps(entry, ensure_ascii=False)
+
+def normalize_query(query: str) -> str:
+    """Lowercase, single spaces: the form logged, counted and replayed."""
+    return " ".join((query or "").lower().split())
+
+def setup_query_log():
+    """Start the writer thread (idempotent); no-op when QUERY_LOG_ENABLED=false."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None or not QUERY_LOG_ENABLED:
+            return
+        os.makedirs(os.path.dirname(QUERY_LOG_FILE) or ".", exist_ok=True)
+        target = RotatingFileHandler(QUERY_LOG_FILE, maxBytes=int(QUERY_LOG_MAX_MB * 1e6),
+                                     backupCount=QUERY_LOG_BACKUPS, encoding="utf-8")
+        target.setFormatter(_LineFormatter())
+        handler, _listener = queued_handler(target)
+        _logger.handlers = [handler]
+        _logger.setLevel(logging.INFO)
+        _listener.start()
+
+def shutdown_query_log():
+    """Flush pending lines and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def log_query(question: str, intent: Optional[str], cache_hit: bool, outcome: str, latency_ms: float,
+              to_phone: Optional[str] = None, history: bool = False, source: Optional[str] = None):
+    if _listener is None or source in _SKIP_SOURCES:
+        return
+    _logger.info("query", extra={"fields": {
+        "query": normalize_query(question),
+        "intent": intent,
+        "cache": "hit" if cache_hit else "miss",
+        "outcome": outcome,
+        "latency_ms": round(latency_ms, 1),
+        "to_phone": to_phone,
+        "history": history,
+    }})
+
+def _log_files(path: str) -> List[str]:
+    """Oldest backup first, current file last."""
+    candidates = [f"{path}.{i}" for i in range(QUERY_LOG_BACKUPS, 0, -1)] + [path]
+    return [p for p in candidates if os.path.exists(p)]
+
+def top_queries(n: int, window_days: float = QUERY_LOG_WINDOW_DAYS, path: str = QUERY_LOG_FILE) -> List[Dict]:
+    """
+    Most frequent first-message questions of the last window_days, per business
+    number (the response cache is keyed by agency): [{query, to_phone, count}].
+    Follow-ups are skipped: their cache key includes the conversation history.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=window_days)
+    counts: Counter = Counter()
+    for log_file in _log_files(path):
+        with open(log_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get("history") or not entry.get("query"):
+                        continue
+                    if datetime.fromisoformat(entry["ts"]) < since:
+                        continue
+                except (ValueError, KeyError, TypeError):
+                    continue  # partial line from a crash, or an older format
+                counts[(entry["query"], entry.get("to_phone"))] += 1
+    return [{"query": q, "to_phone": phone, "count": c} for (q, phone), c in counts.most_common(n)]
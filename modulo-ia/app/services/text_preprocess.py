@@ -1,6 +1,9 @@
 # app/services/text_preprocess.py
+import os
 import re
-from typing import List, Tuple
+import hashlib
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
 
 TOC_MAX_DIGIT_RATIO = 0.35   # pages with too many digits/punctuation → likely TOC
 MIN_CHUNK_CHARS = 50        # avoid tiny, noisy fragments
@@ -103,6 +106,99 @@ def chunk_title_aware(text: str, pdf_name: str, page_start: int, max_chars: int
         i = end - overlap if end - overlap > i else end
     return chunks
 
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+(?=[¿¡\"(«A-ZÁÉÍÓÚÑ0-9•\-])|\n")
+
+def split_sentences(text: str) -> List[str]:
+    """Paragraphs first, then sentence ends / line breaks. Keeps bullet lines as units."""
+    units = []
+    for para in _PARAGRAPH_RE.split(text):
+        for sent in _SENTENCE_END_RE.split(para):
+            sent = sent.strip()
+            if sent:
+                units.append(sent)
+    return units
+
+def _split_long_unit(unit: str, count_tokens: Callable[[str], int], budget: int) -> List[str]:
+    """Hard-split a single sentence longer than the budget on word boundaries."""
+    pieces, cur, cur_tokens = [], [], 0
+    for word in unit.split():
+        n = count_tokens(word)
+        if cur and cur_tokens + n > budget:
+            pieces.append(" ".join(cur))
+            cur, cur_tokens = [], 0
+        cur.append(word)
+        cur_tokens += n
+    if cur:
+        pieces.append(" ".join(cur))
+    return pieces
+
+def chunk_token_aware(text: str, pdf_name: str, page_start: int, count_tokens: Callable[[str], int],
+                      max_tokens: int, overlap_tokens: int = 0):
+    """
+    Sentence/paragraph-aligned chunking within the embedding model's token budget.
+    The title prefix counts against max_tokens, so nothing in the chunk is truncated
+    at encode time. overlap_tokens: trailing sentences repeated in the next chunk.
+    Same output shape as chunk_title_aware.
+    """
+    title = extract_title(text)
+    title_tokens = count_tokens(title) + 1 if title else 0  # +1 for the separator
+    budget = max(8, max_tokens - title_tokens)
+
+    units: List[Tuple[str, int]] = []
+    for sent in split_sentences(text):
+        n = count_tokens(sent)
+        if n <= budget:
+            units.append((sent, n))
+        else:
+            units.extend((piece, count_tokens(piece)) for piece in _split_long_unit(sent, count_tokens, budget))
+
+    chunks = []
+    def _emit(parts: List[Tuple[str, int]]):
+        body = " ".join(p for p, _ in parts).strip()
+        chunk_text = (f"{title}\n\n{body}" if title else body).strip()
+        if len(chunk_text) >= MIN_CHUNK_CHARS:
+            chunks.append({
+                "text": chunk_text,
+                "meta": {
+                    "pdf": pdf_name,
+                    "page_start": page_start,
+                    "page_end": page_start,
+                    "title": title
+                }
+            })
+
+    cur: List[Tuple[str, int]] = []
+    cur_tokens = 0
+    for unit, n in units:
+        if cur and cur_tokens + n > budget:
+            _emit(cur)
+            # carry trailing sentences as overlap, never the whole chunk
+            carry, carry_tokens = [], 0
+            for prev, pn in reversed(cur[1:]):
+                if carry_tokens + pn > overlap_tokens or carry_tokens + pn + n > budget:
+                    break
+                carry.insert(0, (prev, pn))
+                carry_tokens += pn
+            cur, cur_tokens = carry, carry_tokens
+        cur.append((unit, n))
+        cur_tokens += n
+    if cur:
+        _emit(cur)
+    return chunks
+
+def truncation_stats(texts: List[str], count_tokens: Callable[[str], int], max_tokens: int) -> Dict[str, int]:
+    """How many tokens of these texts fall beyond the model's sequence limit (never embedded)."""
+    stats = {"chunks": 0, "chunks_truncated": 0, "tokens": 0, "tokens_truncated": 0}
+    for t in texts:
+        n = count_tokens(t)
+        stats["chunks"] += 1
+        stats["tokens"] += n
+        if n > max_tokens:
+            stats["chunks_truncated"] += 1
+            stats["tokens_truncated"] += n - max_tokens
+    return stats
+
 def basic_deduplicate(chunks: List[dict]) -> List[dict]:
     """
     Lightweight dedup: hash normalized text without digits to drop near-identical repeats.
@@ -114,8 +210,109 @@ def basic_deduplicate(chunks: List[dict]) -> List[dict]:
         text = ch["text"].lower()
         text = re.sub(r"\d+", "", text)
         key = re.sub(r"[\W_]+", " ", text).strip()
-        h = hash(key)
+        # stable across processes (built-in hash() is salted per run)
+        h = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
         if h not in seen:
             seen.add(h)
             dedup.append(ch)
     return dedup
+
+
+# ---------------------------------------------------------------------
+# Corpus-wide near-duplicate detection (MinHash + LSH banding)
+# ---------------------------------------------------------------------
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))  # estimated Jaccard over word shingles
+MINHASH_NUM_PERM = int(os.getenv("MINHASH_NUM_PERM", "64"))
+LSH_BANDS = int(os.getenv("LSH_BANDS", "16"))  # rows per band = NUM_PERM / BANDS
+SHINGLE_SIZE = 3
+_MINHASH_PRIME = (1 << 31) - 1
+_MINHASH_SEED = 20240901  # fixed → signatures identical across runs and machines
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def _shingle_hashes(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    """Deterministic 32-bit hashes of the word k-shingles of text (digits kept: prices differ)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < k:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=4).digest(), "little") for sh in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+class NearDuplicateIndex:
+    """
+    Streaming near-duplicate filter: one MinHash signature per chunk, LSH buckets per
+    band, candidates confirmed by estimated Jaccard. Roughly linear in corpus size.
+    Keep one instance for a whole build so duplicates are caught across files and sources.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, num_perm: int = MINHASH_NUM_PERM, bands: int = LSH_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        rng = np.random.default_rng(_MINHASH_SEED)
+        self._a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[int]]] = [dict() for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self._labels: List[str] = []
+        self.dropped: List[Tuple[str, str]] = []  # (dropped label, kept label)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = _shingle_hashes(text)
+        if hashes.size == 0:
+            return np.full(self._a.shape, _MINHASH_PRIME, dtype=np.uint64)
+        # (a*x + b) mod p for every permutation/shingle pair; stays within uint64
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find(self, sig: np.ndarray) -> Optional[int]:
+        """Return the id of a previously added near-duplicate, if any."""
+        checked = set()
+        for band, key in self._band_keys(sig):
+            for cand in self._buckets[band].get(key, ()):
+                if cand in checked:
+                    continue
+                checked.add(cand)
+                if float(np.mean(self._signatures[cand] == sig)) >= self.threshold:
+                    return cand
+        return None
+
+    def add(self, sig: np.ndarray, label: str = "") -> int:
+        doc_id = len(self._signatures)
+        self._signatures.append(sig)
+        self._labels.append(label)
+        for band, key in self._band_keys(sig):
+            self._buckets[band].setdefault(key, []).append(doc_id)
+        return doc_id
+
+    def filter(self, chunks: List[dict], register_only: bool = False) -> List[dict]:
+        """
+        Drop chunks that near-duplicate anything seen before in this build.
+        register_only=True records the chunks without dropping any (e.g. DB listings,
+        which are distinct by id even when their descriptions match).
+        """
+        kept = []
+        for ch in chunks:
+            meta = ch.get("meta") or {}
+            label = f"{meta.get('pdf', '?')} p.{meta.get('page_start', '?')}"
+            sig = self.signature(ch["text"])
+            if not register_only:
+                dup = self.find(sig)
+                if dup is not None:
+                    self.dropped.append((label, self._labels[dup]))
+                    continue
+            self.add(sig, label)
+            kept.append(ch)
+        return kept
+
+    def stats(self) -> dict:
+        return {"seen": len(self._signatures) + len(self.dropped), "kept": len(self._signatures), "dropped": len(self.dropped)}
@@ -0,0 +1,545 @@
+# app/services/vector_store.py
+# ---------------------------------------------------------------------
+# Searchable FAISS partitions:
+# - VectorStore: the unified index split into one sub-index per source
+#   (database properties / documents). Each keeps an exact IndexFlatIP +
+#   docs (hot-patched by the property listener) and an optional approximate
+#   index derived from it (its source's ann_index spec), rebuilt in the background after
+#   patches; queries search one or both sources and merge by similarity
+# - TenantRegistry: one VectorStore per agency/office, selected by the
+#   business number the client wrote to (QueryRequest.to_phone); cold
+#   partitions load on first use, least recently used ones are unloaded
+#   to stay under TENANT_MEMORY_BUDGET_MB
+# ---------------------------------------------------------------------
+
+import os
+import re
+import json
+import time
+import pickle
+import threading
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services import ann_index
+
+TENANTS_FILE = os.getenv("TENANTS_FILE", "data/vector_db/tenants.json")
+TENANTS_DIR = os.getenv("TENANTS_DIR", "data/vector_db/tenants")
+TENANT_MEMORY_BUDGET_MB = float(os.getenv("TENANT_MEMORY_BUDGET_MB", "1024"))
+
+Hit = Tuple[str, float, Dict]
+
+SOURCES = ("database", "document")
+
+def _doc_text(d) -> str:
+    return d["text"] if isinstance(d, dict) else str(d)
+
+def _doc_meta(d) -> Dict:
+    return (d.get("meta") or {}) if isinstance(d, dict) else {}
+
+def source_of(d) -> str:
+    """Sub-index a doc lives in: "database" (properties) or "document" (PDF / Word chunks)."""
+    return "database" if _doc_meta(d).get("source_type") == "database" else "document"
+
+def source_specs(config: Dict) -> Dict[str, Dict]:
+    """
+    {source: ann_index spec} from the tuned config (scripts/autotune_index.py).
+    Configs from before the per-source sweep have one "index" for the whole
+    corpus: it is applied to every source (exact search where it does not fit).
+    """
+    per_source = {source: cfg["index"] for source, cfg in (config.get("sources") or {}).items() if cfg.get("index")}
+    if per_source:
+        return per_source
+    return {source: config["index"] for source in SOURCES} if config.get("index") else {}
+
+def split_by_source(index, docs: List) -> Dict[str, Tuple[object, List]]:
+    """Split a unified IndexFlatIP + docs into {source: (IndexFlatIP, docs)}, row order kept."""
+    import faiss
+
+    rows = {source: [] for source in SOURCES}
+    for pos, d in enumerate(docs):
+        rows[source_of(d)].append(pos)
+    present = [s for s in SOURCES if rows[s]]
+    if len(present) == 1:
+        return {present[0]: (index, docs)}  # single-source corpus: nothing to copy
+
+    vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else None
+    parts = {}
+    for source in present:
+        sub = faiss.IndexFlatIP(index.d)
+        sub.add(np.ascontiguousarray(vectors[rows[source]]))
+        parts[source] = (sub, [docs[pos] for pos in rows[source]])
+    return parts
+
+class _SourceIndex:
+    """One source inside a partition: exact index + docs, plus its derived approximate index."""
+
+    def __init__(self, store: "VectorStore", source: str, index, docs: List):
+        self.store = store
+        self.source = source
+        self.index = index
+        self.docs = docs
+        # Any patch bumps the version and drops the approximate index; searches
+        # use the exact index until the background rebuild catches up
+        self._ann = None
+        self._version = 0
+        self._rebuilding = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.store.name}/{self.source}"
+
+    @property
+    def spec(self) -> Dict:
+        return self.store.specs.get(self.source) or {"type": "flat"}
+
+    # --- Approximate index (call with store.lock held) ----------------------
+
+    def changed(self):
+        """Call after every change to index/docs; only this source is rebuilt."""
+        spec = self.spec
+        self._ann = None
+        self._version += 1
+        if spec.get("type", "flat") == "flat" or self._rebuilding:
+            return  # a running rebuild notices the new version and starts over
+        self._rebuilding = True
+        threading.Thread(target=self._rebuild_ann, daemon=True, name=f"ann-rebuild-{self.name}").start()
+
+    def _rebuild_ann(self):
+        spec, lock = self.spec, self.store.lock
+        try:
+            while True:
+                with lock:
+                    if self.store.parts.get(self.source) is not self:
+                        return  # unloaded or replaced
+                    version, n = self._version, self.index.ntotal
+                    vectors = self.index.reconstruct_n(0, n) if n else None
+                if not n or not ann_index.fits(spec, n):
+                    print(f"⚠️ {ann_index.describe(spec)} no aplica a {n} vectores ({self.name}); búsqueda exacta")
+                    return
+                t0 = time.time()
+                ann = ann_index.build_index(vectors, spec)
+                with lock:
+                    if version == self._version:
+                        self._ann = ann
+                        self.store._memory_bytes = self.store._estimate_memory()
+                        print(f"🧭 Índice {ann_index.describe(spec)} listo ({self.name}: {n} vectores, "
+                              f"{time.time() - t0:.1f}s)")
+                        return
+        except Exception as e:
+            print(f"⚠️ No se pudo construir el índice aproximado ({self.name}): {e}")
+        finally:
+            with lock:
+                self._rebuilding = False
+
+    def search_index_name(self) -> str:
+        return ann_index.describe(self.spec) if self._ann is not None else "Flat"
+
+    def search(self, q: np.ndarray, top_k: int) -> List[Hit]:
+        out: List[Hit] = []
+        sims, idxs = (self._ann if self._ann is not None else self.index).search(q, top_k)
+        for sim, i in zip(sims[0], idxs[0]):
+            if i < 0:
+                continue
+            d = self.docs[i]
+            out.append((_doc_text(d), float(sim), _doc_meta(d)))
+        return out
+
+    # --- Live patching (database properties) -------------------------------
+
+    def property_positions(self, prop_ids: Iterable[int]) -> List[int]:
+        wanted = set(prop_ids)
+        return [pos for pos, d in enumerate(self.docs) if _doc_meta(d).get("property_id") in wanted]
+
+    def drop_positions(self, positions: List[int]):
+        """Remove vectors + docs at positions. IndexFlat compacts ids, same as list deletion."""
+        if not positions:
+            return
+        self.index.remove_ids(np.array(positions, dtype="int64"))
+        for pos in sorted(positions, reverse=True):
+            del self.docs[pos]
+
+    def memory_bytes(self) -> int:
+        vectors = self.index.ntotal * self.index.d * 4
+        text = sum(len(_doc_text(d)) + 256 for d in self.docs)  # + dict/meta overhead
+        return vectors * (2 if self._ann is not None else 1) + text
+
+class VectorStore:
+    """
+    One partition, split by source (database properties / documents): each
+    source has its own exact index and approximate index, so property patches
+    only rebuild the database one and a query can search a single source.
+    """
+
+    def __init__(self, name: str, index_file: str, doc_file: str, specs: Optional[Dict[str, Dict]] = None,
+                 on_load: Optional[Callable[["VectorStore"], None]] = None):
+        self.name = name
+        self.index_file = index_file
+        self.doc_file = doc_file
+        self.specs = specs or {}  # source → ann_index spec (source_specs); exact search when missing
+        self.on_load = on_load  # runs once per load, before other loaders see the partition
+        self.pins = 0  # searches/patches in flight (TenantRegistry): never unloaded while > 0
+
+        self.parts: Dict[str, _SourceIndex] = {}
+        self.dim: Optional[int] = None
+        self._load_attempted = False
+        self._load_lock = threading.Lock()
+        # Guards parts while the property listener hot-patches them.
+        # Lock order is always _load_lock → lock (callers check readiness before taking lock)
+        self.lock = threading.RLock()
+        self._memory_bytes = 0
+
+    # --- Loading ---------------------------------------------------------
+
+    def available(self) -> bool:
+        return os.path.exists(self.index_file) and os.path.exists(self.doc_file)
+
+    def read_index(self):
+        """The unified index on disk (every source)."""
+        import faiss
+        return faiss.read_index(self.index_file)
+
+    def read_docs(self) -> List:
+        with open(self.doc_file, "rb") as f:
+            return pickle.load(f)  # Expected: List[dict] with {"text": str, "meta": {...}}
+
+    def load(self, executor: Optional[ThreadPoolExecutor] = None) -> bool:
+        """
+        Load index and docs from disk (once) and split them by source. With an
+        executor, the index and the pickle are read in parallel. Returns True when loaded.
+        """
+        with self._load_lock:
+            if self._load_attempted:
+                return self.loaded()
+            self._load_attempted = True
+            if not self.available():
+                print(f"⚠️ Índice no encontrado ({self.index_file}, {self.doc_file})")
+                return False
+            try:
+                if executor is not None:
+                    index_future, docs_future = executor.submit(self.read_index), executor.submit(self.read_docs)
+                    index, docs = index_future.result(), docs_future.result()
+                else:
+                    index, docs = self.read_index(), self.read_docs()
+                split = split_by_source(index, docs)
+            except Exception:
+                self._load_attempted = False  # let a later call retry
+                raise
+
+            with self.lock:
+                if self.dim is None:
+                    self.dim = index.d
+                    for source, (sub, sub_docs) in split.items():
+                        part = self.parts[source] = _SourceIndex(self, source, sub, sub_docs)
+                        part.changed()
+                    self._memory_bytes = self._estimate_memory()
+            if self.on_load is not None:
+                self.on_load(self)
+        return True
+
+    def loaded(self) -> bool:
+        return self.dim is not None
+
+    def ensure_ready(self) -> bool:
+        """Check that index and docs are available (loading them on first use)."""
+        if not self._load_attempted:
+            self.load()
+        return self.loaded()
+
+    def unload(self):
+        """Free the partition; the next ensure_ready() reads it from disk again."""
+        with self._load_lock, self.lock:
+            self.parts = {}
+            self.dim = None
+            self._memory_bytes = 0
+            self._load_attempted = False
+
+    @property
+    def docs(self) -> Optional[List]:
+        """Every doc of the partition (database first); None when not loaded."""
+        with self.lock:
+            if self.dim is None:
+                return None
+            return [d for source in SOURCES if source in self.parts for d in self.parts[source].docs]
+
+    def search_index_name(self) -> str:
+        with self.lock:
+            names = {source: part.search_index_name() for source, part in self.parts.items()}
+        if len(set(names.values())) <= 1:
+            return next(iter(names.values()), "Flat")
+        return ", ".join(f"{source}: {name}" for source, name in names.items())
+
+    # --- Search ------------------------------------------------------------
+
+    def search(self, q: np.ndarray, top_k: int, sources: Optional[Iterable[str]] = None) -> List[Hit]:
+        """
+        (text, similarity, meta) for the top_k nearest docs, best first (no threshold).
+        sources: sub-indexes to search (default: all); their cosine scores are merged.
+        """
+        with self.lock:
+            parts = [self.parts[s] for s in (sources or SOURCES) if s in self.parts]
+            hits = [hit for part in parts for hit in part.search(q, top_k)]
+        if len(parts) > 1:
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:top_k]
+
+    # --- Live patching (database properties) -------------------------------
+
+    def upsert_properties(self, emb: np.ndarray, docs: List[Dict]):
+        """Replace the chunks of these property ids with (normalized) emb rows + docs."""
+        with self.lock:
+            if self.dim is None:
+                self.dim = emb.shape[1]
+            if emb.shape[1] != self.dim:
+                raise ValueError(f"FAISS dim mismatch. Expected {self.dim}, got {emb.shape[1]}.")
+            part = self.parts.get("database")
+            if part is None:
+                import faiss
+                part = self.parts["database"] = _SourceIndex(self, "database", faiss.IndexFlatIP(self.dim), [])
+            part.drop_positions(part.property_positions(d["meta"]["property_id"] for d in docs))
+            part.index.add(emb)
+            part.docs.extend(docs)
+            part.changed()
+            self._memory_bytes = self._estimate_memory()
+
+    def remove_properties(self, prop_ids: Iterable[int]) -> int:
+        with self.lock:
+            part = self.parts.get("database")
+            if part is None:
+                return 0
+            positions = part.property_positions(prop_ids)
+            part.drop_positions(positions)
+            if positions:
+                part.changed()
+                self._memory_bytes = self._estimate_memory()
+        return len(positions)
+
+    # --- Size ----------------------------------------------------------------
+
+    def _estimate_memory(self) -> int:
+        return sum(part.memory_bytes() for part in self.parts.values())
+
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def stats(self) -> Dict:
+        with self.lock:
+            sources = {source: {"chunks": len(part.docs), "search_index": part.search_index_name()}
+                       for source, part in self.parts.items()}
+        return {
+            "loaded": self.loaded(),
+            "chunks": sum(s["chunks"] for s in sources.values()),
+            "sources": sources,
+            "search_index": self.search_index_name(),
+            "memory_mb": round(self._memory_bytes / 1e6, 1),
+        }
+
+# ---------------------------------------------------------------------
+# Tenants
+# ---------------------------------------------------------------------
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits only: '+591 7000-0001', '59170000001@c.us' → '59170000001'."""
+    return re.sub(r"\D", "", (phone or "").split("@")[0])
+
+def load_tenants(path: str = TENANTS_FILE) -> Dict[str, Dict]:
+    """
+    {tenant_id: {"phones": [...], "documents": [...] (optional)}}; {} when not configured.
+    "phones" are the agency/agent WhatsApp numbers clients write to (to_phone).
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ No se pudo leer {path}: {e}")
+        return {}
+
+def _patch_size(emb: Optional[np.ndarray], docs: Optional[List[Dict]]) -> int:
+    size = 64  # dict entry + tuple
+    if emb is not None:
+        size += emb.nbytes
+    return size + sum(len(_doc_text(d)) + 256 for d in (docs or []))
+
+def tenant_paths(tenant_id: str, base_dir: str = TENANTS_DIR) -> Tuple[str, str]:
+    folder = os.path.join(base_dir, tenant_id)
+    return os.path.join(folder, "index.faiss"), os.path.join(folder, "docs.pkl")
+
+class TenantRegistry:
+    """Partition per tenant, loaded lazily; LRU unload above the memory budget."""
+
+    def __init__(self, tenants: Dict[str, Dict], specs: Optional[Dict[str, Dict]] = None,
+                 budget_mb: float = TENANT_MEMORY_BUDGET_MB, base_dir: str = TENANTS_DIR):
+        self.specs = specs
+        self.budget_bytes = int(budget_mb * 1e6)
+        self.base_dir = base_dir
+        self._by_phone = {normalize_phone(p): t for t, cfg in tenants.items() for p in cfg.get("phones", [])}
+        self._tenants = set(tenants)
+        self._stores: Dict[str, VectorStore] = {}
+        self._lru: "OrderedDict[str, None]" = OrderedDict()  # loaded tenants, least recent first
+        self._lock = threading.Lock()  # order: _lock → store locks → _patch_lock
+        # Live patches since startup, replayed when a partition is (re)loaded from disk. One entry
+        # per property whatever the number of tenants: property_id → (time, owner tenant or None,
+        # emb rows, docs); rows are only kept for the owner. An entry is dropped once every built
+        # partition is newer than it (rebuilt from the database), and counts against the budget
+        self._patches: Dict[int, Tuple[float, Optional[str], Optional[np.ndarray], Optional[List[Dict]]]] = {}
+        self._patch_bytes = 0
+        self._patch_lock = threading.Lock()
+        self._stats = {"loads": 0, "evictions": 0, "misses": 0}
+
+    def __bool__(self) -> bool:
+        return bool(self._tenants)
+
+    def tenant_for(self, phone: Optional[str]) -> Optional[str]:
+        return self._by_phone.get(normalize_phone(phone))
+
+    def _store(self, tenant: str) -> VectorStore:
+        store = self._stores.get(tenant)
+        if store is None:
+            index_file, doc_file = tenant_paths(tenant, self.base_dir)
+            store = self._stores[tenant] = VectorStore(tenant, index_file, doc_file, self.specs,
+                                                       on_load=self._replay_patches)
+        return store
+
+    @contextmanager
+    def pinned(self, tenant: str):
+        """
+        The tenant's partition, loaded and safe from eviction until the block exits.
+        Yields None when the partition is not built or fails to load (never the global one).
+        """
+        with self._lock:
+            store = self._store(tenant)
+            store.pins += 1
+        try:
+            if not store.loaded():
+                if store.available() and store.ensure_ready():
+                    with self._lock:
+                        self._stats["loads"] += 1
+                else:
+                    with self._lock:
+                        self._stats["misses"] += 1
+            if store.loaded():
+                with self._lock:
+                    self._lru[tenant] = None
+                    self._lru.move_to_end(tenant)
+                    self._evict()
+            yield store if store.loaded() else None
+        finally:
+            with self._lock:
+                store.pins -= 1
+                self._evict()
+
+    @contextmanager
+    def _pinned_loaded(self):
+        """Every loaded partition, pinned (live patches)."""
+        with self._lock:
+            stores = [st for st in self._stores.values() if st.loaded()]
+            for store in stores:
+                store.pins += 1
+        try:
+            yield stores
+        finally:
+            with self._lock:
+                for store in stores:
+                    store.pins -= 1
+
+    def _evict(self):
+        """Call with _lock held. Unload least recently used partitions above the budget; pinned ones stay."""
+        total = sum(self._stores[t].memory_bytes() for t in self._lru) + self._patch_bytes
+        for tenant in list(self._lru):
+            if total <= self.budget_bytes:
+                break
+            store = self._stores[tenant]
+            if store.pins:
+                continue
+            total -= store.memory_bytes()
+            store.unload()
+            del self._lru[tenant]
+            self._stats["evictions"] += 1
+            print(f"♻️ Partición {tenant} descargada (presupuesto {self.budget_bytes / 1e6:.0f} MB)")
+
+    # --- Live patching -------------------------------------------------------
+
+    def _built_at(self, tenant: str) -> float:
+        """mtime of the tenant's partition on disk; 0 when it is not built."""
+        index_file, _ = tenant_paths(tenant, self.base_dir)
+        try:
+            return os.path.getmtime(index_file)
+        except OSError:
+            return 0.0
+
+    def _record_patch(self, prop_id: int, owner: Optional[str], emb: Optional[np.ndarray] = None,
+                      docs: Optional[List[Dict]] = None):
+        """Call with _patch_lock held."""
+        old = self._patches.pop(prop_id, None)
+        if old is not None:
+            self._patch_bytes -= _patch_size(old[2], old[3])
+        self._patches[prop_id] = (time.time(), owner, emb, docs)
+        self._patch_bytes += _patch_size(emb, docs)
+
+    def _prune_patches(self):
+        """Drop patches older than every built partition: a rebuild from the database already has them."""
+        built = [t for t in (self._built_at(t) for t in self._tenants) if t > 0]
+        cutoff = min(built) if built else float("inf")  # nothing built yet: any future build is newer
+        with self._patch_lock:
+            for prop_id in [pid for pid, patch in self._patches.items() if patch[0] <= cutoff]:
+                _ts, _owner, emb, docs = self._patches.pop(prop_id)
+                self._patch_bytes -= _patch_size(emb, docs)
+
+    def _replay_patches(self, store: VectorStore):
+        built_at = self._built_at(store.name)
+        with self._patch_lock:
+            patches = [(pid, owner, emb, docs) for pid, (ts, owner, emb, docs) in self._patches.items()
+                       if ts > built_at]
+        others = [pid for pid, owner, _emb, _docs in patches if owner != store.name]
+        if others:
+            store.remove_properties(others)
+        for _pid, owner, emb, docs in patches:
+            if owner == store.name:
+                store.upsert_properties(emb, docs)
+
+    def upsert_property(self, emb: np.ndarray, docs: List[Dict]):
+        """Route one property's chunks to its agent's tenant; drop it from every other tenant."""
+        meta = docs[0]["meta"]
+        owner = self.tenant_for(meta.get("telefono"))
+        prop_id = meta["property_id"]
+        with self._patch_lock:
+            if owner is None:
+                self._record_patch(prop_id, None)
+            else:
+                self._record_patch(prop_id, owner, emb, docs)
+        # Loaded (or loading: its replay already saw this patch) partitions are patched in place
+        with self._pinned_loaded() as stores:
+            for store in stores:
+                if store.name == owner:
+                    store.upsert_properties(emb, docs)
+                else:
+                    store.remove_properties([prop_id])
+        self._prune_patches()
+
+    def remove_properties(self, prop_ids: Iterable[int]):
+        prop_ids = list(prop_ids)
+        with self._patch_lock:
+            for pid in prop_ids:
+                self._record_patch(pid, None)
+        with self._pinned_loaded() as stores:
+            for store in stores:
+                store.remove_properties(prop_ids)
+        self._prune_patches()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded = {t: self._stores[t].stats() for t in self._lru}
+        return {
+            **self._stats,
+            "tenants": len(self._tenants),
+            "loaded": loaded,
+            "memory_mb": round(sum(s["memory_mb"] for s in loaded.values()), 1),
+            "patches": len(self._patches),
+            "patches_mb": round(self._patch_bytes / 1e6, 1),
+            "budget_mb": round(self.budget_bytes / 1e6, 1),
+        }
@@ -0,0 +1,32 @@
+# app/utils/stats.py
+# ---------------------------------------------------------------------
+# Latency summaries shared by the benchmark suite and the load tester
+# ---------------------------------------------------------------------
+
+import math
+from typing import Dict, Iterable, List
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0..100) of an already sorted list."""
+    if not sorted_samples:
+        return float("nan")
+    k = (len(sorted_samples) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return sorted_samples[lo]
+    return sorted_samples[lo] + (sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+def summarize(samples_ms: Iterable[float]) -> Dict:
+    """n, mean, min, max, p50, p95, p99 (milliseconds, rounded to µs)."""
+    data = sorted(samples_ms)
+    if not data:
+        return {"n": 0}
+    return {
+        "n": len(data),
+        "mean_ms": round(sum(data) / len(data), 3),
+        "min_ms": round(data[0], 3),
+        "p50_ms": round(percentile(data, 50), 3),
+        "p95_ms": round(percentile(data, 95), 3),
+        "p99_ms": round(percentile(data, 99), 3),
+        "max_ms": round(data[-1], 3),
+    }
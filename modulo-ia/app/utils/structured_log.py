@@ -0,0 +1,151 @@
+# app/utils/structured_log.py
+# ---------------------------------------------------------------------
+# Structured logging off the request thread:
+# - Records go through a bounded queue (QueueHandler) and are written to
+#   stdout by a QueueListener thread; when the queue is full they are
+#   dropped and counted instead of blocking a request
+# - One JSON line per record (LOG_FORMAT=text for local reading)
+# - Per-request detail (detail()) only for a LOG_SAMPLE_RATE fraction of
+#   requests; every request still gets a single summary line
+# ---------------------------------------------------------------------
+
+import os
+import sys
+import json
+import uuid
+import queue
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.05"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_detail_logger = logging.getLogger("modulo_ia.detail")
+_request_logger = logging.getLogger("modulo_ia.request")
+
+_request_ctx: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("log_request_ctx", default=None)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = dict(getattr(record, "fields", None) or {})
+        if getattr(record, "request_id", None):
+            fields = {"request_id": record.request_id, **fields}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: a full queue drops the record."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Captured here, on the request thread: the listener thread has no request context
+        ctx = _request_ctx.get()
+        if ctx is not None and not hasattr(record, "request_id"):
+            record.request_id = ctx["request_id"]
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def queued_handler(target: logging.Handler, maxsize: int = LOG_QUEUE_SIZE) -> Tuple[QueueHandler, QueueListener]:
+    """Non-blocking handler feeding `target` from a writer thread (the caller starts/stops the listener)."""
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=maxsize))
+    return handler, QueueListener(handler.queue, target, respect_handler_level=False)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_setup_lock = threading.Lock()
+
+def setup_logging():
+    """Route the root logger through the queue (idempotent)."""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        _queue_handler, _listener = queued_handler(stream)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(LOG_LEVEL)
+        _listener.start()
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
+
+# --- Per-request context -------------------------------------------------
+
+@contextmanager
+def request_scope(sample_rate: Optional[float] = None):
+    """
+    Open a request: assigns a request_id (attached to every record logged
+    inside) and decides once whether this request's detail lines are kept.
+    """
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    ctx = {"request_id": uuid.uuid4().hex[:12], "sampled": random.random() < rate}
+    token = _request_ctx.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _request_ctx.reset(token)
+
+def sampled() -> bool:
+    ctx = _request_ctx.get()
+    return bool(ctx and ctx["sampled"])
+
+def detail(msg: str, **fields):
+    """Per-request detail line; a no-op unless the current request is sampled."""
+    if sampled():
+        _detail_logger.info(msg, extra={"fields": fields})
+
+def request_summary(msg: str, **fields):
+    """The one line every request gets."""
+    ctx = _request_ctx.get()
+    if ctx is not None:
+        fields.setdefault("sampled", ctx["sampled"])
+    _request_logger.info(msg, extra={"fields": fields})
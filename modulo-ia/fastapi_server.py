@@ -3,7 +3,10 @@
 
 import os
 import sys
+import time
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, List, Dict
 
@@ -12,17 +15,48 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+from app.services.metrics import trace_request, record_request, render_prometheus, METRICS_TIMINGS_IN_METADATA
+from app.utils.structured_log import setup_logging, shutdown_logging, request_scope, request_summary, detail
+from app.services.query_log import setup_query_log, shutdown_query_log, log_query
+from app.services.cache_warmer import live_request, start_cache_warmer, stop_cache_warmer
+from app.services.llm_client import log_model_residency
+
+# Configurar logging (JSON por cola, sin bloquear las solicitudes; ver app/utils/structured_log.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque: el servidor acepta conexiones de inmediato (liveness) mientras modelo,
+    índice y docs se cargan en paralelo en segundo plano; /api/ready responde 200
+    recién cuando el camino caliente está listo.
+    """
+    startup_task = None
+    setup_query_log()
+    start_cache_warmer()
+    if IA_SERVICES_AVAILABLE:
+        startup_task = asyncio.create_task(asyncio.to_thread(ia_startup))
+        _start_live_updates()
+    # Consulta a Ollama (/api/tags) en un hilo: no retrasa el arranque ni bloquea el event loop
+    routing_task = asyncio.create_task(asyncio.to_thread(log_model_residency))
+    yield
+    for task in (startup_task, routing_task):
+        if task and not task.done():
+            task.cancel()
+    _stop_background_work()
+    shutdown_query_log()
+    shutdown_logging()
+
 # Crear app FastAPI
 app = FastAPI(
     title="Remaxi - Remax Express IA",
     description="Asistente inmobiliario inteligente para consultas de venta y alquiler",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -36,7 +70,9 @@ app.add_middleware(
 
 # Importar servicios IA (con fallback)
 try:
-    from app.services.ia_service import ask_mistral_with_context, get_index_overview, build_softgrounded_reply
+    from app.services.ia_service import ask_mistral_with_context, get_index_overview, fast_fallback_reply
+    from app.services.ia_service import startup as ia_startup, readiness as ia_readiness
+    from app.services.intent import classify_intent
     logger.info("✅ Servicios IA cargados correctamente")
     IA_SERVICES_AVAILABLE = True
 except Exception as e:
@@ -44,15 +80,40 @@ except Exception as e:
     IA_SERVICES_AVAILABLE = False
     
     # Crear funciones mock
-    def ask_mistral_with_context(query, history=""):
+    def ask_mistral_with_context(query, history="", to_phone=None):
         return {"question": query, "answer": "Servicio IA no disponible temporalmente", "used_context": False}
     
     def get_index_overview():
         return {"total_chunks": 0, "pdfs": []}
     
-    def build_softgrounded_reply(query):
+    def fast_fallback_reply(query):
         return "Sistema RAG no disponible. Por favor contacta a un agente."
 
+    def ia_readiness():
+        return {"ready": False, "state": "services_not_available"}
+
+# Listener de cambios en Propiedad (opcional, PROPERTY_LISTENER_ENABLED=true)
+def _start_live_updates():
+    try:
+        from app.services.property_listener import start_property_listener
+        if start_property_listener():
+            logger.info("✅ Actualización en vivo de propiedades activada")
+    except Exception as e:
+        logger.warning(f"⚠️ Listener de propiedades no disponible: {e}")
+
+def _stop_background_work():
+    stop_cache_warmer()
+    try:
+        from app.services.property_listener import stop_property_listener
+        stop_property_listener()
+    except Exception:
+        pass
+    try:
+        from app.services.llm_client import stop_keep_warm
+        stop_keep_warm()
+    except Exception:
+        pass
+
 # Modelos Pydantic
 class QueryRequest(BaseModel):
     question: str
@@ -89,6 +150,8 @@ async def root():
         "endpoints": {
             "query": "/api/query",
             "health": "/api/health",
+            "ready": "/api/ready",
+            "metrics": "/metrics",
             "status": "/api/status",
             "docs": "/docs"
         }
@@ -114,6 +177,12 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail=f"Service unhealthy: {str(e)}")
 
+@app.get("/api/ready")
+async def ready_check():
+    """Readiness (distinto de /api/health): 200 solo con modelo, índice y búsqueda ya calentados"""
+    info = ia_readiness()
+    return JSONResponse(status_code=200 if info.get("ready") else 503, content=info)
+
 @app.get("/api/status")
 async def get_status():
     """Estado detallado del sistema RAG"""
@@ -126,6 +195,8 @@ async def get_status():
                 "rag_status": "ready" if overview["total_chunks"] > 0 else "no_content",
                 "services_available": IA_SERVICES_AVAILABLE,
                 "index_overview": overview,
+                "properties_cache": _properties_cache_metrics(),
+                "llm": _llm_stats(),
                 "capabilities": [
                     "Consultas sobre propiedades",
                     "Búsqueda en documentos PDF",
@@ -139,14 +210,84 @@ async def get_status():
         logger.error(f"Status check failed: {e}")
         return {"success": False, "error": str(e)}
 
+def _properties_cache_metrics() -> Optional[Dict]:
+    """Métricas del cache de propiedades (None si el pool no se usa en este proceso)"""
+    try:
+        from app.services.db_pool import get_cache_metrics
+        return get_cache_metrics()
+    except Exception:
+        return None
+
+def _llm_stats() -> Optional[Dict]:
+    """Llamadas a Ollama, cargas de modelo detectadas y keep_alive"""
+    try:
+        from app.services.llm_client import get_llm_stats
+        return get_llm_stats()
+    except Exception:
+        return None
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas Prometheus: latencia por etapa, por resultado, tokens LLM, cache y circuito"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _query_outcome(metadata: Dict) -> str:
+    if metadata.get("fallback"):
+        return "fallback"
+    if metadata.get("error"):
+        return "unavailable"
+    if metadata.get("degraded"):
+        return "degraded"
+    if metadata.get("from_cache"):
+        return "cached"
+    if metadata.get("templated"):
+        return "templated"
+    return "llm" if metadata.get("confidence") == "high" else "no_context"
+
 @app.post("/api/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
+def process_query(request: QueryRequest):
     """
     Endpoint principal para procesar consultas inmobiliarias
-    Usado por módulo-procesamiento cuando detecta consulta IA
+    Usado por módulo-procesamiento cuando detecta consulta IA.
+    Función sin async a propósito: FastAPI la ejecuta en su pool de hilos, así
+    las consultas (embedding, FAISS, LLM) corren en paralelo sin bloquear el event loop.
     """
+    t0 = time.perf_counter()
+    with live_request(), request_scope(), trace_request() as timings:
+        response = _answer_query(request)
+        elapsed = time.perf_counter() - t0
+        metadata = response.metadata or {}
+        outcome = _query_outcome(metadata)
+        record_request(outcome, elapsed)
+        request_summary(
+            "query",
+            from_phone=request.from_phone,
+            to_phone=request.to_phone,
+            intent=metadata.get("intent"),
+            outcome=outcome,
+            used_context=response.used_context,
+            requires_agent_attention=response.requires_agent_attention,
+            answer_chars=len(response.answer),
+            latency_ms=round(elapsed * 1000, 2),
+            stages_ms=timings,
+        )
+        log_query(
+            request.question,
+            intent=metadata.get("intent"),
+            cache_hit=bool(metadata.get("from_cache")),
+            outcome=outcome,
+            latency_ms=elapsed * 1000,
+            to_phone=request.to_phone,
+            history=bool((request.conversation_history or "").strip()),
+            source=request.source,
+        )
+    if METRICS_TIMINGS_IN_METADATA and response.metadata is not None:
+        response.metadata["timings_ms"] = {**timings, "total": round(elapsed * 1000, 2)}
+    return response
+
+def _answer_query(request: QueryRequest) -> QueryResponse:
     try:
-        logger.info(f"📥 Nueva consulta desde {request.from_phone}: {request.question[:50]}...")
+        detail("Nueva consulta", question=request.question[:50], history_chars=len(request.conversation_history or ""))
         
         if not IA_SERVICES_AVAILABLE:
             return QueryResponse(
@@ -169,30 +310,31 @@ async def process_query(request: QueryRequest):
             )
         
         # 2. Procesar consulta con RAG
-        result = ask_mistral_with_context(request.question, request.conversation_history)
+        result = ask_mistral_with_context(request.question, request.conversation_history, request.to_phone)
         
-        # 3. Analizar respuesta para detectar interés del cliente
-        requires_attention, suggested_actions = _analyze_client_interest(
-            request.question, 
-            result["answer"]
-        )
+        # 3. Analizar respuesta para detectar interés del cliente (intención ya clasificada por el RAG)
+        intent = result.get("intent") or classify_intent(request.question)
+        requires_attention, suggested_actions = _analyze_client_interest(intent, result["answer"])
         
         # 4. Preparar metadata para módulo-respuestas
         metadata = {
             "from_phone": request.from_phone,
             "to_phone": request.to_phone,
             "source": request.source,
-            "query_type": _classify_query(request.question),
+            "query_type": intent["query_type"],
+            "intent": intent["intent"],
             "confidence": "high" if result["used_context"] else "low"
         }
+        if result.get("degraded"):
+            metadata["degraded"] = True
+        if result.get("from_cache"):
+            metadata["from_cache"] = True
+        if result.get("templated"):
+            metadata["templated"] = True
+        if result.get("context_stats"):
+            metadata["context_tokens"] = result["context_stats"]
         
-        logger.info(f"✅ Consulta procesada - Contexto usado: {result['used_context']}")
-        
-        # 🔍 LOG DETALLADO - IA DEVUELVE
-        logger.info(f"🔍 IA PASO 1 - Respuesta generada:")
-        logger.info(f"   📝 answer: '{result['answer'][:100]}...' (len: {len(result['answer'])})")
-        logger.info(f"   ✅ success: True")
-        logger.info(f"   📊 used_context: {result['used_context']}")
+        detail("Respuesta generada", answer=result["answer"][:100], used_context=result["used_context"])
         
         response_data = QueryResponse(
             success=True,
@@ -203,17 +345,13 @@ async def process_query(request: QueryRequest):
             suggested_actions=suggested_actions
         )
         
-        logger.info(f"🔍 IA PASO 2 - Enviando respuesta a procesamiento:")
-        logger.info(f"   📝 response.answer: '{response_data.answer[:100]}...'")
-        logger.info(f"   📊 response.success: {response_data.success}")
-        
         return response_data
         
     except Exception as e:
         logger.error(f"❌ Error procesando consulta: {e}")
         
-        # Respuesta de fallback
-        fallback_answer = build_softgrounded_reply(request.question)
+        # Respuesta de fallback precalculada: sin encode, búsqueda ni LLM (el sistema puede estar saturado)
+        fallback_answer = fast_fallback_reply(request.question)
         
         return QueryResponse(
             success=True,
@@ -223,52 +361,13 @@ async def process_query(request: QueryRequest):
             requires_agent_attention=True
         )
 
-def _classify_query(question: str) -> str:
-    """Clasificar tipo de consulta"""
-    question_lower = question.lower()
-    
-    if any(word in question_lower for word in ['precio', 'costo', 'valor', 'cuanto']):
-        return "price_inquiry"
-    elif any(word in question_lower for word in ['ubicacion', 'zona', 'donde', 'direccion']):
-        return "location_inquiry"
-    elif any(word in question_lower for word in ['casa', 'departamento', 'terreno', 'propiedad']):
-        return "property_inquiry"
-    elif any(word in question_lower for word in ['venta', 'vender', 'comprar']):
-        return "sale_inquiry"
-    elif any(word in question_lower for word in ['alquiler', 'alquilar', 'rentar']):
-        return "rental_inquiry"
-    else:
-        return "general_inquiry"
-
-def _analyze_client_interest(question: str, answer: str) -> tuple[bool, Optional[List[str]]]:
+def _analyze_client_interest(intent: Dict, answer: str) -> tuple[bool, Optional[List[str]]]:
     """
     Analizar si el cliente muestra interés alto y requiere coordinación de cita
+    (intent: resultado de classify_intent)
     """
-    question_lower = question.lower()
-    answer_lower = answer.lower()
-    
-    # Frases de ALTO interés que requieren acción inmediata
-    high_interest_phrases = [
-        'precio', 'precios', 'costo', 'valor', 'cuanto cuesta', 'cuánto cuesta',
-        'mas informacion', 'más información', 'mas detalles', 'más detalles', 
-        'caracteristicas', 'características', 'ubicacion', 'ubicación',
-        'quiero ver', 'me interesa', 'me gusta', 'visitar', 'ver la propiedad',
-        'agendar', 'cita', 'visita', 'cuando puedo', 'disponible',
-        'contactar', 'telefono', 'teléfono', 'llamar', 'whatsapp',
-        'comprar', 'alquilar', 'rentar', 'vender'
-    ]
-    
-    # Frases que indican intención de agendar cita
-    appointment_phrases = [
-        'agendar', 'cita', 'visita', 'ver la propiedad', 'coordinar',
-        'cuando puedo', 'disponible para', 'visitar', 'conocer'
-    ]
-    
-    # Detectar interés alto en la pregunta
-    interest_detected = any(phrase in question_lower for phrase in high_interest_phrases)
-    
-    # Detectar si quiere agendar cita específicamente
-    wants_appointment = any(phrase in question_lower for phrase in appointment_phrases)
+    interest_detected = intent["interest"] == "high"
+    wants_appointment = intent["appointment"]
     
     # Si detecta frase de cita en la respuesta de la IA
     appointment_in_answer = "COORDINAR_CITA_INMOBILIARIA" in answer
@@ -302,7 +401,9 @@ if __name__ == "__main__":
     print(f"Host: {host}")
     print("Endpoints disponibles:")
     print("  • POST /api/query - Procesar consultas inmobiliarias")
-    print("  • GET /api/health - Estado del servicio") 
+    print("  • GET /api/health - Estado del servicio (liveness)")
+    print("  • GET /api/ready - Listo para recibir tráfico (readiness)")
+    print("  • GET /metrics - Métricas Prometheus")
     print("  • GET /api/status - Estado RAG detallado")
     print("  • GET /docs - Documentación API")
     print("=" * 50)
@@ -14,7 +14,8 @@ from datetime import datetime
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.services.ia_service import ask_mistral_with_context, get_index_overview, build_softgrounded_reply
+from app.services.ia_service import ask_mistral_with_context, get_index_overview, fast_fallback_reply
+from app.services.intent import classify_intent
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -138,18 +139,17 @@ async def process_query(request: QueryRequest):
         # 2. Procesar consulta con RAG
         result = ask_mistral_with_context(request.question, request.conversation_history)
         
-        # 3. Analizar respuesta para detectar interés del cliente
-        requires_attention, suggested_actions = _analyze_client_interest(
-            request.question, 
-            result["answer"]
-        )
+        # 3. Analizar respuesta para detectar interés del cliente (intención ya clasificada por el RAG)
+        intent = result.get("intent") or classify_intent(request.question)
+        requires_attention, suggested_actions = _analyze_client_interest(intent, result["answer"])
         
         # 4. Preparar metadata para módulo-respuestas
         metadata = {
             "from_phone": request.from_phone,
             "to_phone": request.to_phone,
             "source": request.source,
-            "query_type": _classify_query(request.question),
+            "query_type": intent["query_type"],
+            "intent": intent["intent"],
             "confidence": "high" if result["used_context"] else "low"
         }
         
@@ -168,7 +168,7 @@ async def process_query(request: QueryRequest):
         logger.error(f"❌ Error procesando consulta: {e}")
         
         # Respuesta de fallback
-        fallback_answer = build_softgrounded_reply(request.question)
+        fallback_answer = fast_fallback_reply(request.question)
         
         return QueryResponse(
             success=True,
@@ -178,40 +178,12 @@ async def process_query(request: QueryRequest):
             requires_agent_attention=False
         )
 
-def _classify_query(question: str) -> str:
-    """Clasificar tipo de consulta"""
-    question_lower = question.lower()
-    
-    if any(word in question_lower for word in ['precio', 'costo', 'valor', 'cuanto']):
-        return "price_inquiry"
-    elif any(word in question_lower for word in ['ubicacion', 'zona', 'donde', 'direccion']):
-        return "location_inquiry"
-    elif any(word in question_lower for word in ['casa', 'departamento', 'terreno', 'propiedad']):
-        return "property_inquiry"
-    elif any(word in question_lower for word in ['venta', 'vender', 'comprar']):
-        return "sale_inquiry"
-    elif any(word in question_lower for word in ['alquiler', 'alquilar', 'rentar']):
-        return "rental_inquiry"
-    else:
-        return "general_inquiry"
-
-def _analyze_client_interest(question: str, answer: str) -> tuple[bool, Optional[List[str]]]:
+def _analyze_client_interest(intent: Dict, answer: str) -> tuple[bool, Optional[List[str]]]:
     """
     Analizar si el cliente muestra interés y requiere atención del agente
+    (intent: resultado de classify_intent)
     """
-    question_lower = question.lower()
-    answer_lower = answer.lower()
-    
-    # Frases que indican alto interés
-    high_interest_phrases = [
-        'mas informacion', 'más información', 'mas detalles', 'más detalles',
-        'quiero ver', 'me interesa', 'agendar', 'cita', 'visita',
-        'cuando puedo', 'disponible para', 'contactar', 'telefono',
-        'coordinar cita', 'más info', 'caracteristicas', 'precio exacto'
-    ]
-    
-    # Detectar interés en la pregunta
-    interest_detected = any(phrase in question_lower for phrase in high_interest_phrases)
+    interest_detected = intent["interest"] == "high" or intent["appointment"]
     
     # Si hay interés, sugerir acciones
     suggested_actions = None
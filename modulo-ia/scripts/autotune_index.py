@@ -0,0 +1,239 @@
+# /scripts/autotune_index.py
+# Elige el índice de búsqueda (Flat / IVF / HNSW) y sus parámetros para una meta
+# de recall@k y latencia p95, usando IndexFlatIP exacto como verdad de referencia.
+# El servicio busca en un sub-índice por fuente (propiedades / documentos), así que
+# se mide y se recomienda una configuración para cada uno, con su tamaño real.
+# Antes, con la búsqueda exacta, se ajustan MIN_SIM_THRESHOLD (el más alto cuya tasa
+# de consultas sin contexto no supera --no-context) y TOP_K (el menor k que devuelve
+# --recall de los fragmentos que pasan ese umbral); -k / --min-sim los fijan a mano.
+#
+#   python -m scripts.autotune_index --queries data/query_log.jsonl
+#   python -m scripts.autotune_index --recall 0.95 --p95-ms 5 --no-context 0.15
+#   python -m scripts.autotune_index --queries data/query_log.jsonl -k 4 --min-sim 0.32
+#
+# Consultas: archivo de texto (una por línea) o JSONL con campo "query"; sin
+# archivo se usan fragmentos del propio corpus. Escribe data/vector_db/index_config.json,
+# que ia_service carga al arrancar (INDEX_CONFIG_FILE). Reiniciar el servicio para aplicarlo.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services import ann_index
+from app.services.vector_store import SOURCES, source_of
+from app.utils.stats import summarize
+
+def _read_queries(path: str, limit: int) -> List[str]:
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    line = (json.loads(line).get("query") or "").strip()
+                except ValueError:
+                    continue
+            if line:
+                queries.append(line)
+    unique = list(dict.fromkeys(queries))
+    random.Random(7).shuffle(unique)
+    return unique[:limit]
+
+def _corpus_queries(docs: List, limit: int) -> List[str]:
+    """Pseudo-consultas: el inicio de fragmentos al azar del corpus."""
+    texts = [d["text"] if isinstance(d, dict) else str(d) for d in docs]
+    sample = random.Random(7).sample(texts, min(limit, len(texts)))
+    return [" ".join(t.split()[:12]) for t in sample]
+
+def _recall(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    hits, total = 0, 0
+    for approx, exact in zip(approx_ids, exact_ids):
+        wanted = set(int(i) for i in exact if i >= 0)
+        hits += len(wanted & set(int(i) for i in approx))
+        total += len(wanted)
+    return hits / total if total else 1.0
+
+def _latencies(index, queries: np.ndarray, k: int, min_samples: int) -> List[float]:
+    """Single-query searches (the service never batches), in ms."""
+    samples = []
+    rounds = max(1, -(-min_samples // len(queries)))
+    for _ in range(rounds):
+        for i in range(len(queries)):
+            t0 = time.perf_counter()
+            index.search(queries[i:i + 1], k)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+def sweep(vectors: np.ndarray, queries: np.ndarray, k: int, min_samples: int) -> List[Dict]:
+    import faiss
+
+    exact = ann_index.build_index(vectors, {"type": "flat"})
+    _, exact_ids = exact.search(queries, k)
+
+    results = []
+    for group in ann_index.candidate_specs(len(vectors)):
+        t0 = time.time()
+        index = ann_index.build_index(vectors, group[0])
+        build_s = time.time() - t0
+        memory_mb = faiss.serialize_index(index).nbytes / 1e6
+        for spec in group:
+            ann_index.set_search_params(index, spec)
+            _, ids = index.search(queries, k)
+            latency = summarize(_latencies(index, queries, k, min_samples))
+            results.append({
+                "index": spec,
+                "name": ann_index.describe(spec),
+                "recall_at_k": round(_recall(ids, exact_ids), 4),
+                "p50_ms": latency["p50_ms"],
+                "p95_ms": latency["p95_ms"],
+                "build_s": round(build_s, 2),
+                "memory_mb": round(memory_mb, 1),
+            })
+            print(f"  {results[-1]['name']:<32} recall@{k}={results[-1]['recall_at_k']:.3f}  "
+                  f"p95={latency['p95_ms']:.3f} ms")
+    return results
+
+# Candidate MIN_SIM_THRESHOLD values (cosine similarity)
+_THRESHOLDS = [round(t, 2) for t in np.arange(0.10, 0.71, 0.02)]
+
+def tune_retrieval(sims: np.ndarray, target_no_context: float, target_recall: float,
+                   min_sim: Optional[float] = None, top_k: Optional[int] = None) -> Dict:
+    """
+    MIN_SIM_THRESHOLD and TOP_K from exact-search similarities (queries × max_k, descending).
+    Threshold: the highest candidate whose no-context rate (top-1 below it) meets the target.
+    top_k: the smallest k returning target_recall of the chunks above that threshold.
+    Values given by hand (min_sim / top_k) are kept and only measured.
+    """
+    curve = [{"min_sim": t, "no_context_rate": round(float(np.mean(sims[:, 0] < t)), 4)} for t in _THRESHOLDS]
+    if min_sim is None:
+        ok = [c for c in curve if c["no_context_rate"] <= target_no_context]
+        if not ok:
+            print(f"⚠️ Ningún umbral deja menos de {target_no_context:.0%} de consultas sin contexto; se usa el más bajo")
+        min_sim = max(ok, key=lambda c: c["min_sim"])["min_sim"] if ok else _THRESHOLDS[0]
+
+    passing = sims >= min_sim
+    total = int(passing.sum())
+    recall_by_k = [round(float(passing[:, :k].sum()) / total, 4) if total else 1.0
+                   for k in range(1, sims.shape[1] + 1)]
+    if top_k is None:
+        top_k = next((k for k, r in enumerate(recall_by_k, 1) if r >= target_recall), len(recall_by_k))
+    return {
+        "min_sim_threshold": min_sim,
+        "top_k": top_k,
+        "no_context_rate": round(float(np.mean(sims[:, 0] < min_sim)), 4),
+        "relevant_recall": recall_by_k[min(top_k, len(recall_by_k)) - 1],
+        "threshold_curve": curve,
+        "recall_by_k": recall_by_k,
+    }
+
+def recommend(results: List[Dict], target_recall: float, target_p95_ms: float) -> Dict:
+    """Cheapest (p95, then memory) config meeting both targets; exact search otherwise."""
+    ok = [r for r in results if r["recall_at_k"] >= target_recall and r["p95_ms"] <= target_p95_ms]
+    if ok:
+        return min(ok, key=lambda r: (r["p95_ms"], r["memory_mb"]))
+    print("⚠️ Ninguna configuración cumple ambas metas; se recomienda búsqueda exacta")
+    return next(r for r in results if r["index"]["type"] == "flat")
+
+def main():
+    from app.services import ia_service
+
+    parser = argparse.ArgumentParser(description="Autoajuste de parámetros del índice vectorial")
+    parser.add_argument("--queries", default=None, help="consultas (txt o JSONL con 'query')")
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=None, help="TOP_K fijo (por defecto se ajusta)")
+    parser.add_argument("--max-k", type=int, default=10, help="mayor TOP_K considerado")
+    parser.add_argument("--recall", type=float, default=0.95,
+                        help="recall@k mínimo del índice y de TOP_K (fragmentos sobre el umbral)")
+    parser.add_argument("--p95-ms", type=float, default=10.0, help="latencia p95 máxima por búsqueda")
+    parser.add_argument("--no-context", type=float, default=0.2, help="tasa máxima de consultas sin contexto")
+    parser.add_argument("--min-sim", type=float, default=None, help="MIN_SIM_THRESHOLD fijo (por defecto se ajusta)")
+    parser.add_argument("--samples", type=int, default=300, help="búsquedas medidas por configuración")
+    parser.add_argument("--out", default=ann_index.INDEX_CONFIG_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="solo reportar, sin escribir la config")
+    args = parser.parse_args()
+
+    import faiss
+    if not (os.path.exists(ia_service.INDEX_FILE) and os.path.exists(ia_service.DOC_FILE)):
+        print(f"❌ Índice no encontrado ({ia_service.INDEX_FILE}); ejecutar scripts.create_index primero")
+        return 1
+    flat = faiss.read_index(ia_service.INDEX_FILE)
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    docs = ia_service._STORE.read_docs()
+
+    if args.queries:
+        texts = _read_queries(args.queries, args.max_queries)
+        source = args.queries
+    else:
+        print("⚠️ Sin --queries: se usan fragmentos del corpus como consultas")
+        texts = _corpus_queries(docs, args.max_queries)
+        source = "corpus"
+    if not texts:
+        print("❌ No hay consultas para evaluar")
+        return 1
+
+    print(f"Corpus: {len(vectors)} vectores (dim {vectors.shape[1]}), consultas: {len(texts)} ({source})")
+    queries = ia_service._encode_texts(texts)
+
+    # Umbral y TOP_K con la búsqueda exacta sobre todo el corpus (el servicio mezcla las fuentes por similitud)
+    sims, _ = flat.search(queries, max(args.max_k, args.k or 0))
+    retrieval = tune_retrieval(sims, args.no_context, args.recall, args.min_sim, args.k)
+    k = retrieval["top_k"]
+    print(f"\n✅ MIN_SIM_THRESHOLD={retrieval['min_sim_threshold']:g} "
+          f"(sin contexto: {retrieval['no_context_rate']:.1%}), TOP_K={k} "
+          f"(recall de fragmentos sobre el umbral: {retrieval['relevant_recall']:.1%})")
+    if source == "corpus":
+        print("   ⚠️ Con fragmentos del corpus como consultas el umbral sale optimista; usar --queries del query log")
+
+    rows = {s: [i for i, d in enumerate(docs) if source_of(d) == s] for s in SOURCES}
+    sources = {}
+    for name in SOURCES:
+        if not rows[name]:
+            continue
+        sub = np.ascontiguousarray(vectors[rows[name]])
+        print(f"\n== {name}: {len(sub)} vectores ==")
+        results = sweep(sub, queries, k, args.samples)
+        best = recommend(results, args.recall, args.p95_ms)
+        print(f"✅ {name}: {best['name']} (recall@{k}={best['recall_at_k']:.3f}, p95={best['p95_ms']:.3f} ms)")
+        sources[name] = {
+            "index": best["index"],
+            "corpus_vectors": len(sub),
+            "measured": {k: best[k] for k in ("recall_at_k", "p50_ms", "p95_ms", "build_s", "memory_mb")},
+            "candidates": results,
+        }
+
+    config = {
+        "sources": sources,
+        "top_k": k,
+        "min_sim_threshold": retrieval["min_sim_threshold"],
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "targets": {"recall_at_k": args.recall, "p95_ms": args.p95_ms, "no_context_rate": args.no_context},
+        "corpus_vectors": int(len(vectors)),
+        "queries": {"source": source, "count": len(texts)},
+        "retrieval": {
+            "tuned": [name for name, fixed in (("top_k", args.k), ("min_sim_threshold", args.min_sim)) if fixed is None],
+            **retrieval,
+        },
+    }
+
+    if args.dry_run:
+        return 0
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    print(f"📄 Configuración: {args.out} (reiniciar el servicio para aplicarla)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
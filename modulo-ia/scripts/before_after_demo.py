@@ -1,157 +0,0 @@
-# -*- coding: utf-8 -*-
-"""
-Demostración Antes vs Después del Entrenamiento PLN
-Muestra mejoras específicas en casos de prueba reales
-"""
-
-import time
-from datetime import datetime
-
-def show_before_after_comparison():
-    """Muestra comparación antes/después del entrenamiento"""
-    
-    print("=" * 80)
-    print("COMPARACIÓN: ANTES vs DESPUÉS DEL ENTRENAMIENTO PLN")
-    print("Sistema: REMAXI - Asistente Inmobiliario")
-    print(f"Fecha de análisis: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 80)
-    
-    test_cases = [
-        {
-            "query": "Busco casa en Urubo con piscina para familia",
-            "before": {
-                "classification": "general_inquiry",
-                "confidence": 0.45,
-                "context_found": False,
-                "response": "No tengo información específica sobre propiedades.",
-                "response_time": 4.8,
-                "semantic_similarity": 0.12
-            },
-            "after": {
-                "classification": "property_inquiry",
-                "confidence": 0.94,
-                "context_found": True,
-                "response": "Encontré varias casas en Urubo con piscina. Casa en Condominio Lomas del Urubo: $1.200.000 Bs, 4 dormitorios, piscina privada...",
-                "response_time": 2.3,
-                "semantic_similarity": 0.87
-            }
-        },
-        {
-            "query": "Cuánto cuesta departamento 2 dormitorios equipetrol",
-            "before": {
-                "classification": "general_inquiry", 
-                "confidence": 0.38,
-                "context_found": False,
-                "response": "Consulta con un agente para información de precios.",
-                "response_time": 5.2,
-                "semantic_similarity": 0.08
-            },
-            "after": {
-                "classification": "price_inquiry",
-                "confidence": 0.96,
-                "context_found": True,
-                "response": "Departamentos de 2 dormitorios en Equipetrol: desde $450.000 Bs hasta $680.000 Bs. Departamento Torre Mallorce: $520.000 Bs...",
-                "response_time": 2.1,
-                "semantic_similarity": 0.91
-            }
-        },
-        {
-            "query": "Quiero agendar cita para ver propiedades centro",
-            "before": {
-                "classification": "general_inquiry",
-                "confidence": 0.52,
-                "context_found": False,
-                "response": "Para agendar citas contacta a nuestros agentes.",
-                "response_time": 4.1,
-                "semantic_similarity": 0.15
-            },
-            "after": {
-                "classification": "high_interest_detected",
-                "confidence": 0.93,
-                "context_found": True,
-                "response": "Te conectaré con un agente especializado en propiedades del centro. Tenemos departamentos en Plaza Colón y Torre Soleil disponibles para visita.",
-                "response_time": 2.4,
-                "semantic_similarity": 0.82
-            }
-        }
-    ]
-    
-    for i, case in enumerate(test_cases, 1):
-        print(f"\n{'─' * 80}")
-        print(f"CASO DE PRUEBA #{i}")
-        print(f"Consulta: '{case['query']}'")
-        print(f"{'─' * 80}")
-        
-        # ANTES del entrenamiento
-        print("\nANTES DEL ENTRENAMIENTO:")
-        print("─" * 40)
-        before = case['before']
-        print(f"  Clasificación: {before['classification']}")
-        print(f"  Confianza: {before['confidence']:.2f}")
-        print(f"  Contexto encontrado: {'NO' if not before['context_found'] else 'SÍ'}")
-        print(f"  Similitud semántica: {before['semantic_similarity']:.2f}")
-        print(f"  Tiempo respuesta: {before['response_time']:.1f}s")
-        print(f"  Respuesta: {before['response'][:80]}...")
-        
-        time.sleep(0.5)
-        
-        # DESPUÉS del entrenamiento
-        print("\nDESPUÉS DEL ENTRENAMIENTO:")
-        print("─" * 40)
-        after = case['after']
-        print(f"  Clasificación: {after['classification']}")
-        print(f"  Confianza: {after['confidence']:.2f}")
-        print(f"  Contexto encontrado: {'NO' if not after['context_found'] else 'SÍ'}")
-        print(f"  Similitud semántica: {after['semantic_similarity']:.2f}")
-        print(f"  Tiempo respuesta: {after['response_time']:.1f}s")
-        print(f"  Respuesta: {after['response'][:80]}...")
-        
-        # Cálculo de mejoras
-        confidence_improvement = ((after['confidence'] - before['confidence']) / before['confidence']) * 100
-        time_improvement = ((before['response_time'] - after['response_time']) / before['response_time']) * 100
-        similarity_improvement = ((after['semantic_similarity'] - before['semantic_similarity']) / before['semantic_similarity']) * 100
-        
-        print(f"\nMEJORAS OBTENIDAS:")
-        print(f"  ✅ Confianza: +{confidence_improvement:.1f}%")
-        print(f"  ✅ Velocidad: +{time_improvement:.1f}%")
-        print(f"  ✅ Precisión semántica: +{similarity_improvement:.1f}%")
-        print(f"  ✅ Contexto: {'Habilitado' if after['context_found'] and not before['context_found'] else 'Mejorado'}")
-        
-        time.sleep(1)
-    
-    # Resumen general
-    print(f"\n{'═' * 80}")
-    print("RESUMEN GENERAL DE MEJORAS")
-    print(f"{'═' * 80}")
-    
-    overall_improvements = {
-        "Clasificación automática": "38% → 94% confianza promedio",
-        "Búsqueda contextual": "0% → 100% casos con contexto",
-        "Tiempo de respuesta": "4.7s → 2.3s promedio (-51%)",
-        "Precisión semántica": "0.12 → 0.87 promedio (+625%)",
-        "Satisfacción usuario": "Baja → Alta (respuestas específicas)"
-    }
-    
-    for improvement, description in overall_improvements.items():
-        print(f"✅ {improvement}: {description}")
-    
-    print(f"\n📊 IMPACTO EMPRESARIAL:")
-    print(f"   • 85% reducción en derivaciones a agentes humanos")
-    print(f"   • 70% mejora en tiempo de respuesta al cliente")
-    print(f"   • 92% precisión en clasificación de intenciones")
-    print(f"   • 24/7 disponibilidad con respuestas contextuales")
-    
-    print(f"\n🎯 TECNOLOGÍAS APLICADAS:")
-    print(f"   • RAG (Retrieval-Augmented Generation)")
-    print(f"   • FAISS Vector Database (1,800+ chunks)")
-    print(f"   • SentenceTransformer (Multilingual)")
-    print(f"   • Ollama LLM (Phi/Mistral)")
-    print(f"   • Análisis semántico avanzado")
-    
-    print(f"\n{'═' * 80}")
-    print("ENTRENAMIENTO PLN DOCUMENTADO EXITOSAMENTE")
-    print("Logs generados para informe técnico de tesis")
-    print(f"{'═' * 80}")
-
-if __name__ == "__main__":
-    show_before_after_comparison()
\ No newline at end of file
@@ -0,0 +1,239 @@
+# /scripts/benchmark.py
+# Benchmarks reales del camino de consulta (reemplaza los scripts de simulación).
+#
+#   python -m scripts.benchmark                         # todo, LLM mock
+#   python -m scripts.benchmark --only embedding,faiss --sizes 1000,10000,100000
+#   python -m scripts.benchmark --compare data/benchmarks/bench_20260101_120000.json
+#
+# Mide: latencia de embeddings (consulta y lote), búsqueda FAISS a distintos
+# tamaños de corpus, construcción de prompt (compresión + empaquetado),
+# caminos de cache y /api/query de punta a punta contra el LLM mock.
+# Escribe JSON con p50/p95/p99 por caso en data/benchmarks/.
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# El LLM real no participa: latencia determinista configurable (ver llm_backends)
+os.environ.setdefault("LLM_BACKEND", "mock")
+os.environ.setdefault("OLLAMA_KEEP_WARM_SEC", "0")
+
+from app.utils.stats import summarize
+
+BENCH_DIR = os.getenv("BENCH_DIR", "data/benchmarks")
+
+QUERIES = [
+    "¿Cuánto cuesta la casa en Urubo?",
+    "Busco departamento en alquiler en Equipetrol",
+    "¿Tienen terrenos en venta en la zona norte?",
+    "Quiero una casa con piscina y 3 dormitorios",
+    "¿Cuál es el teléfono del agente?",
+    "¿Dónde queda el departamento de 2 dormitorios?",
+    "Oficinas en alquiler en el centro",
+    "¿Qué requisitos necesito para comprar una casa?",
+]
+
+def _time_calls(fn: Callable[[int], object], n: int, warmup: int = 2) -> List[float]:
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+# ------------------------------------------------------------------ cases
+
+def bench_embedding(n: int) -> Dict:
+    from app.services import ia_service
+    model = ia_service.get_embedding_model()
+    batch = [f"{q} (variante {i})" for i in range(4) for q in QUERIES][:32]
+    return {
+        "embedding.query": summarize(_time_calls(lambda i: ia_service._embed_query(QUERIES[i % len(QUERIES)]), n)),
+        "embedding.batch32": summarize(_time_calls(lambda i: model.encode(batch, convert_to_numpy=True), max(3, n // 10))),
+    }
+
+def bench_faiss(n: int, sizes: List[int]) -> Dict:
+    import faiss
+    import numpy as np
+    from app.services import ia_service
+
+    dim = ia_service.get_embedding_model().get_sentence_embedding_dimension()
+    rng = np.random.default_rng(20240901)
+    queries = rng.standard_normal((64, dim)).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    out = {}
+    for size in sizes:
+        corpus = rng.standard_normal((size, dim)).astype("float32")
+        corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+        index = faiss.IndexFlatIP(dim)  # same index type as the service
+        index.add(corpus)
+        out[f"faiss.search.flat_ip.{size}"] = summarize(
+            _time_calls(lambda i: index.search(queries[i % 64:i % 64 + 1], ia_service.TOP_K), n)
+        )
+    return out
+
+def _sample_chunks(ia_service) -> List:
+    chunks = ia_service.get_relevant_chunks(QUERIES[1])
+    if chunks:
+        return chunks
+    # Sin índice en disco: chunks sintéticos con el formato de la BD
+    text = ("PROPIEDAD REMAXI #{i}: Departamento {i}\n\nINFORMACIÓN BÁSICA:\n- Tipo: Departamento para Alquiler\n"
+            "- Ubicación: Equipetrol\n- Precio: $800\n\nDESCRIPCIÓN:\nAmplio departamento con 2 dormitorios, "
+            "cocina equipada y balcón con vista. Cerca de centros comerciales.")
+    return [(text.format(i=i), 0.6 - i * 0.02, {"source_type": "database", "property_id": i}) for i in range(4)]
+
+def bench_prompt(n: int) -> Dict:
+    from app.services import ia_service
+    from app.services import context_compressor
+
+    ia_service.load_index()
+    chunks = _sample_chunks(ia_service)
+    query = QUERIES[1]
+    query_vec = ia_service._embed_query(query)
+    history = "Usuario: hola\nAsistente: ¡Hola! ¿Qué propiedad buscas?"
+
+    def compress_cold(i):
+        context_compressor._cache.clear()
+        context_compressor.compress_chunks(query_vec, chunks, ia_service._encode_texts)
+
+    return {
+        "prompt.compress.cold": summarize(_time_calls(compress_cold, max(5, n // 4))),
+        "prompt.compress.cached": summarize(_time_calls(
+            lambda i: context_compressor.compress_chunks(query_vec, chunks, ia_service._encode_texts), n)),
+        "prompt.pack_and_build": summarize(_time_calls(
+            lambda i: ia_service._build_packed_prompt(query, chunks, history), n)),
+    }
+
+def bench_cache(n: int) -> Dict:
+    from app.services import ia_service
+    ia_service.load_index()
+    ia_service.ask_mistral_with_context(QUERIES[0])  # fill
+    return {
+        "cache.response_hit": summarize(_time_calls(lambda i: ia_service.ask_mistral_with_context(QUERIES[0]), n)),
+    }
+
+def bench_e2e(n: int) -> Dict:
+    from fastapi.testclient import TestClient
+    from app.services import ia_service
+    import fastapi_server
+
+    with TestClient(fastapi_server.app) as client:
+        deadline = time.time() + 300
+        while client.get("/api/ready").status_code != 200:
+            if time.time() > deadline or ia_service.readiness().get("state") == "failed":
+                return {"e2e.skipped": {"n": 0, "reason": str(ia_service.readiness())}}
+            time.sleep(0.2)
+
+        def query(i, clear_cache):
+            if clear_cache:
+                ia_service._RESPONSE_CACHE.clear()
+            r = client.post("/api/query", json={
+                "question": QUERIES[i % len(QUERIES)],
+                "from_phone": "59170000000",
+                "to_phone": "59171111111",
+                "source": "benchmark",  # kept out of the query log (cache warming)
+            })
+            r.raise_for_status()
+
+        uncached = summarize(_time_calls(lambda i: query(i, True), n))
+        for i in range(len(QUERIES)):
+            query(i, False)  # prime the response cache with every question
+        return {
+            "e2e.api_query.uncached": uncached,
+            "e2e.api_query.cached": summarize(_time_calls(lambda i: query(i, False), n)),
+        }
+
+# ------------------------------------------------------------------ runner
+
+def _print_results(results: Dict, previous: Dict = None):
+    print(f"\n{'caso':<36}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}" + ("   Δp50" if previous else ""))
+    for name, s in results.items():
+        if not s.get("n"):
+            print(f"{name:<36}  (omitido) {s.get('reason', '')[:60]}")
+            continue
+        line = f"{name:<36}{s['n']:>6}{s['p50_ms']:>11.2f}{s['p95_ms']:>11.2f}{s['p99_ms']:>11.2f}"
+        old = (previous or {}).get(name)
+        if old and old.get("p50_ms"):
+            line += f"   {100 * (s['p50_ms'] - old['p50_ms']) / old['p50_ms']:+.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del camino de consulta")
+    parser.add_argument("--only", default="embedding,faiss,prompt,cache,e2e")
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="tamaños de corpus para FAISS")
+    parser.add_argument("--out", default=None, help="archivo JSON de salida")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.only.split(",") if c.strip()]
+    n = args.iterations
+    results: Dict[str, Dict] = {}
+    t0 = time.time()
+    for case in cases:
+        print(f"▶ {case}...")
+        if case == "embedding":
+            results.update(bench_embedding(n))
+        elif case == "faiss":
+            results.update(bench_faiss(n, [int(s) for s in args.sizes.split(",")]))
+        elif case == "prompt":
+            results.update(bench_prompt(n))
+        elif case == "cache":
+            results.update(bench_cache(n))
+        elif case == "e2e":
+            results.update(bench_e2e(n))
+        else:
+            print(f"  caso desconocido: {case}")
+
+    from app.services import llm_backends
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "embedding_model": os.getenv("EMBEDDING_MODEL_NAME", "distiluse-base-multilingual-cased-v1"),
+            "llm_backend": llm_backends.LLM_BACKEND,
+            "mock_llm": {
+                "latency_ms": llm_backends.MOCK_LLM_LATENCY_MS,
+                "tokens_per_sec": llm_backends.MOCK_LLM_TOKENS_PER_SEC,
+            },
+            "iterations": n,
+            "duration_s": round(time.time() - t0, 1),
+        },
+        "results": results,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f).get("results", {})
+    _print_results(results, previous)
+
+    out = args.out or os.path.join(BENCH_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados: {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# /scripts/build_tenant_indexes.py
+# Parte el índice unificado en un índice por agencia/oficina (tenant), según
+# data/vector_db/tenants.json:
+#
+#   {"oficina_centro": {"phones": ["59170000001", "59170000002"],
+#                       "documents": ["manual_ventas.pdf"]}}
+#
+# Cada tenant recibe las propiedades cuyo agente tiene uno de sus números
+# (meta "telefono") y los documentos listados en "documents" (todos si se omite).
+# No se vuelve a calcular ningún embedding: los vectores se copian del índice global.
+#
+#   python -m scripts.build_tenant_indexes
+#   python -m scripts.build_tenant_indexes --tenants otra_config.json --out data/vector_db/tenants
+
+import os
+import sys
+import pickle
+import argparse
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.vector_store import TENANTS_FILE, TENANTS_DIR, load_tenants, normalize_phone, tenant_paths
+
+def _belongs(meta: dict, phones: set, documents) -> bool:
+    if meta.get("source_type") == "database":
+        return normalize_phone(meta.get("telefono")) in phones
+    return documents is None or meta.get("pdf") in documents
+
+def main():
+    import faiss
+    from app.services import ia_service
+
+    parser = argparse.ArgumentParser(description="Índices FAISS por agencia a partir del índice unificado")
+    parser.add_argument("--tenants", default=TENANTS_FILE)
+    parser.add_argument("--out", default=TENANTS_DIR)
+    args = parser.parse_args()
+
+    tenants = load_tenants(args.tenants)
+    if not tenants:
+        print(f"❌ Sin tenants configurados ({args.tenants})")
+        return 1
+    if not ia_service._STORE.available():
+        print(f"❌ Índice no encontrado ({ia_service.INDEX_FILE}); ejecutar scripts.create_index primero")
+        return 1
+
+    flat = ia_service._STORE.read_index()
+    docs = ia_service._STORE.read_docs()
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    metas = [(d.get("meta") or {}) if isinstance(d, dict) else {} for d in docs]
+    print(f"Índice unificado: {len(docs)} fragmentos, {len(tenants)} tenants")
+
+    assigned = set()
+    for tenant, cfg in tenants.items():
+        phones = {normalize_phone(p) for p in cfg.get("phones", [])}
+        documents = set(cfg["documents"]) if cfg.get("documents") is not None else None
+        rows = [i for i, meta in enumerate(metas) if _belongs(meta, phones, documents)]
+
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        if rows:
+            index.add(np.ascontiguousarray(vectors[rows]))
+        index_file, doc_file = tenant_paths(tenant, args.out)
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        faiss.write_index(index, index_file)
+        with open(doc_file, "wb") as f:
+            pickle.dump([docs[i] for i in rows], f)
+
+        properties = sum(1 for i in rows if metas[i].get("source_type") == "database")
+        assigned.update(i for i in rows if metas[i].get("source_type") == "database")
+        print(f"✅ {tenant}: {len(rows)} fragmentos ({properties} de propiedades) → {index_file}")
+
+    orphans = {metas[i].get("property_id") for i, m in enumerate(metas)
+               if m.get("source_type") == "database" and i not in assigned}
+    if orphans:
+        print(f"⚠️ {len(orphans)} propiedades sin tenant (su teléfono no está en {args.tenants}); "
+              f"solo se encuentran desde números sin partición (índice global)")
+    print("Reiniciar el servicio para cargar las particiones")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
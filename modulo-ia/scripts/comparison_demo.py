@@ -1,144 +0,0 @@
-# -*- coding: utf-8 -*-
-"""
-Comparación Antes vs Después del Entrenamiento PLN
-"""
-
-import time
-from datetime import datetime
-
-def show_comparison():
-    print("=" * 80)
-    print("COMPARACIÓN: ANTES vs DESPUÉS DEL ENTRENAMIENTO PLN")
-    print("Sistema: REMAXI - Asistente Inmobiliario")  
-    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 80)
-    
-    # Caso 1: Búsqueda de casa
-    print("\nCASO 1: 'Busco casa en Urubo con piscina para familia'")
-    print("-" * 60)
-    print("ANTES DEL ENTRENAMIENTO:")
-    print("  Clasificación: general_inquiry (confianza: 0.45)")
-    print("  Contexto encontrado: NO")
-    print("  Similitud semántica: 0.12")
-    print("  Tiempo respuesta: 4.8s")
-    print("  Respuesta: No tengo información específica sobre propiedades")
-    
-    time.sleep(1)
-    
-    print("\nDESPUÉS DEL ENTRENAMIENTO:")
-    print("  Clasificación: property_inquiry (confianza: 0.94)")
-    print("  Contexto encontrado: SÍ")
-    print("  Similitud semántica: 0.87")
-    print("  Tiempo respuesta: 2.3s")
-    print("  Respuesta: Encontré casas en Urubo con piscina.")
-    print("             Casa Condominio Lomas del Urubo: $1.200.000 Bs")
-    print("             4 dormitorios, piscina privada...")
-    
-    print("\n  MEJORAS:")
-    print("    + Confianza: +108.9%")
-    print("    + Velocidad: +52.1%") 
-    print("    + Precisión: +625.0%")
-    print("    + Contexto: Habilitado")
-    
-    time.sleep(1)
-    
-    # Caso 2: Consulta de precios
-    print("\n" + "=" * 80)
-    print("CASO 2: 'Cuánto cuesta departamento 2 dormitorios equipetrol'")
-    print("-" * 60)
-    print("ANTES DEL ENTRENAMIENTO:")
-    print("  Clasificación: general_inquiry (confianza: 0.38)")
-    print("  Contexto encontrado: NO")
-    print("  Similitud semántica: 0.08")
-    print("  Tiempo respuesta: 5.2s")
-    print("  Respuesta: Consulta con un agente para información de precios")
-    
-    time.sleep(1)
-    
-    print("\nDESPUÉS DEL ENTRENAMIENTO:")
-    print("  Clasificación: price_inquiry (confianza: 0.96)")
-    print("  Contexto encontrado: SÍ")
-    print("  Similitud semántica: 0.91")
-    print("  Tiempo respuesta: 2.1s")
-    print("  Respuesta: Departamentos 2 dormitorios en Equipetrol:")
-    print("             Desde $450.000 Bs hasta $680.000 Bs")
-    print("             Torre Mallorca: $520.000 Bs, Torre Soleil: $615.000 Bs")
-    
-    print("\n  MEJORAS:")
-    print("    + Confianza: +152.6%")
-    print("    + Velocidad: +59.6%")
-    print("    + Precisión: +1037.5%")
-    print("    + Contexto: Habilitado")
-    
-    time.sleep(1)
-    
-    # Caso 3: Interés alto
-    print("\n" + "=" * 80)
-    print("CASO 3: 'Quiero agendar cita para ver propiedades centro'")
-    print("-" * 60)
-    print("ANTES DEL ENTRENAMIENTO:")
-    print("  Clasificación: general_inquiry (confianza: 0.52)")
-    print("  Contexto encontrado: NO")
-    print("  Similitud semántica: 0.15")
-    print("  Tiempo respuesta: 4.1s")
-    print("  Respuesta: Para agendar citas contacta a nuestros agentes")
-    
-    time.sleep(1)
-    
-    print("\nDESPUÉS DEL ENTRENAMIENTO:")
-    print("  Clasificación: high_interest_detected (confianza: 0.93)")
-    print("  Contexto encontrado: SÍ")
-    print("  Similitud semántica: 0.82")
-    print("  Tiempo respuesta: 2.4s")
-    print("  Respuesta: Te conectaré con agente especializado en centro.")
-    print("             Propiedades disponibles: Plaza Colón, Torre Soleil")
-    print("             >> DERIVACIÓN AUTOMÁTICA A AGENTE HUMANO <<")
-    
-    print("\n  MEJORAS:")
-    print("    + Confianza: +78.8%")
-    print("    + Velocidad: +41.5%")
-    print("    + Precisión: +446.7%")
-    print("    + Inteligencia: Detección automática de interés alto")
-    
-    time.sleep(1)
-    
-    # Resumen final
-    print("\n" + "=" * 80)
-    print("RESUMEN GENERAL DE MEJORAS DEL ENTRENAMIENTO PLN")
-    print("=" * 80)
-    
-    print("\nMÉTRICAS GLOBALES:")
-    print("  Accuracy:              65.0% -> 90.2%  (+38.8%)")
-    print("  Context Usage:         45.0% -> 81.3%  (+80.7%)")
-    print("  Response Time:          4.2s ->  2.7s  (-35.7%)")
-    print("  Semantic Similarity:   0.280 -> 0.440  (+57.1%)")
-    print("  Intent Classification: 62.0% -> 92.1%  (+48.5%)")
-    
-    print("\nIMPACTO EMPRESARIAL:")
-    print("  • 85% reducción en derivaciones innecesarias")
-    print("  • 70% mejora en tiempo de respuesta")
-    print("  • 92% precisión en clasificación de intenciones")
-    print("  • 24/7 disponibilidad con respuestas contextuales")
-    print("  • Detección automática de clientes con interés alto")
-    
-    print("\nTECNOLOGÍAS APLICADAS:")
-    print("  • RAG (Retrieval-Augmented Generation)")
-    print("  • FAISS Vector Database (1,800+ chunks)")
-    print("  • SentenceTransformer Multilingual")
-    print("  • Ollama LLM (Phi/Mistral)")
-    print("  • Análisis semántico y clasificación automática")
-    
-    print("\nRESULTADOS DE ENTRENAMIENTO:")
-    print(f"  • Corpus final: 55+ documentos procesados")
-    print(f"  • Índice vectorial: 1,800+ chunks semánticos")
-    print(f"  • Sesiones de entrenamiento: 5 iteraciones")
-    print(f"  • Tiempo total de entrenamiento: 63 minutos")
-    print(f"  • Casos de prueba validados: 25 escenarios reales")
-    
-    print("\n" + "=" * 80)
-    print("ENTRENAMIENTO PLN COMPLETADO EXITOSAMENTE")
-    print("Documentación generada para informe técnico")
-    print("=" * 80)
-
-if __name__ == "__main__":
-    show_comparison()
\ No newline at end of file
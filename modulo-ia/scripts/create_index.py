@@ -3,12 +3,13 @@
 
 import os
 import sys
+import argparse
 from pathlib import Path
 
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.services.embedding_service import build_unified_vector_index
+from app.services.embedding_service import build_unified_vector_index, rebuild_source_index
 
 def main():
     """
@@ -16,7 +17,14 @@ def main():
     - Documentos PDF y Word en data/docs/
     - PDFs legacy en data/pdfs/
     - Propiedades de base de datos PostgreSQL
+
+    Con --source database|document se reconstruye solo esa fuente y se conserva la otra:
+        python -m scripts.create_index --source database
     """
+    parser = argparse.ArgumentParser(description="Crear el índice RAG unificado")
+    parser.add_argument("--source", choices=["database", "document"], default=None,
+                        help="reconstruir solo una fuente del índice existente")
+    args = parser.parse_args()
     
     print("REMAXI - CREADOR DE INDICE RAG UNIFICADO")
     print("=" * 60)
@@ -36,7 +44,7 @@ def main():
     
     print(f"Directorio docs (Word): {docs_directory}")
     print(f"Directorio PDFs: {pdfs_directory}")
-    print(f"Configuracion: {max_chars} chars, {overlap} overlap")
+    print(f"Configuracion: {max_chars} chars, {overlap} overlap (CHUNK_MODE={os.getenv('CHUNK_MODE', 'chars')})")
     print()
     
     # Create directories if they don't exist
@@ -44,6 +52,16 @@ def main():
     os.makedirs(pdfs_directory, exist_ok=True)
     
     try:
+        if args.source:
+            rebuild_source_index(
+                args.source,
+                docs_directory=docs_directory,
+                pdfs_directory=pdfs_directory,
+                max_chars=max_chars,
+                overlap=overlap
+            )
+            return
+        
         # Build unified index
         build_unified_vector_index(
             docs_directory=docs_directory,
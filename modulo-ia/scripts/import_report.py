@@ -0,0 +1,81 @@
+# /scripts/import_report.py
+# Costo de importación del servidor de consultas (python -X importtime) y chequeo de presupuesto.
+#
+#   python -m scripts.import_report                      # reporte por paquete
+#   python -m scripts.import_report --budget-ms 1500     # exit 1 si se pasa del presupuesto
+#
+# Además falla si el import carga dependencias que solo usa la indexación
+# (fitz, docx, psycopg2) o el stack del modelo (torch, sentence_transformers, faiss),
+# que deben cargarse de forma diferida.
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+LAZY_ONLY_MODULES = ["fitz", "docx", "psycopg2", "torch", "sentence_transformers", "faiss"]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+def measure(module: str):
+    """Import `module` in a fresh interpreter; returns [(self_us, cumulative_us, name)]."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"No se pudo importar {module}:\n{tail}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), m.group(3)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de tiempo de importación")
+    parser.add_argument("--module", default="fastapi_server")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help=f"presupuesto total (por defecto IMPORT_BUDGET_MS={IMPORT_BUDGET_MS:g} si se usa --check)")
+    parser.add_argument("--check", action="store_true", help="aplicar presupuesto y módulos diferidos")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = sum(r[0] for r in rows) / 1000
+
+    by_package = defaultdict(int)
+    for self_us, _cum, name in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"Importar {args.module}: {total_ms:.0f} ms, {len(rows)} módulos")
+    print(f"{'paquete':<32}{'ms':>10}{'%':>8}")
+    for package, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{package:<32}{us / 1000:>10.1f}{100 * us / max(1, total_ms * 1000):>7.1f}%")
+
+    if not (args.check or args.budget_ms is not None):
+        return 0
+
+    failures = []
+    budget = args.budget_ms if args.budget_ms is not None else IMPORT_BUDGET_MS
+    if total_ms > budget:
+        failures.append(f"tiempo de importación {total_ms:.0f} ms > presupuesto {budget:g} ms")
+    loaded = sorted(p for p in LAZY_ONLY_MODULES if p in by_package)
+    if loaded:
+        failures.append(f"módulos que deben cargarse de forma diferida: {', '.join(loaded)}")
+
+    print()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ Dentro del presupuesto ({total_ms:.0f} / {budget:g} ms)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+# /scripts/install_property_trigger.py
+# Instala los triggers NOTIFY en Propiedad y Usuario para la actualizacion en vivo del indice RAG
+
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.property_listener import install_notify_trigger, PROPERTY_NOTIFY_CHANNEL
+
+def main():
+    """
+    Crear los triggers que publican por NOTIFY los cambios de Propiedad y los del
+    agente (nombre, apellido, telefono en Usuario) como cambios de sus propiedades.
+    Luego iniciar el servidor IA con PROPERTY_LISTENER_ENABLED=true.
+    Prueba manual desde psql:  NOTIFY propiedad_changes, '{"op": "UPDATE", "id": 1}';
+    """
+    print(f"Instalando trigger NOTIFY (canal: {PROPERTY_NOTIFY_CHANNEL})")
+    if not install_notify_trigger():
+        sys.exit(1)
+    print("Listo. Inicia el servidor con PROPERTY_LISTENER_ENABLED=true")
+
+if __name__ == "__main__":
+    main()
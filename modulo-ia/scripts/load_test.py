@@ -0,0 +1,376 @@
+# /scripts/load_test.py
+# Generador de carga que reproduce tráfico de WhatsApp contra /api/query
+# (mismo payload que envía systemRouter.js de modulo-procesamiento).
+#
+#   python -m scripts.load_test --rate 20 --duration 60              # en proceso, LLM mock
+#   python -m scripts.load_test --concurrency 16 --duration 60
+#   python -m scripts.load_test --url http://localhost:8000 --rate 5 --duration 120
+#
+# Modelo de tráfico: muchos teléfonos, preguntas populares que se repiten
+# (distribución tipo Zipf), conversaciones de varios turnos con historial,
+# y ráfagas de campaña (muchos clientes preguntan lo mismo a la vez).
+# Reporta throughput, p50/p95/p99, tasa de aciertos de cache y de errores,
+# y escribe el JSON en data/loadtests/. En proceso también reporta el reparto
+# entre backends LLM (MOCK_LLM_BACKENDS=2: llamadas y pico simultáneo por backend).
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.stats import summarize
+
+LOADTEST_DIR = os.getenv("LOADTEST_DIR", "data/loadtests")
+
+# Preguntas frecuentes (las primeras son las más repetidas)
+POPULAR_QUESTIONS = [
+    "Hola, ¿qué propiedades tienen disponibles?",
+    "¿Cuánto cuesta la casa en Urubo?",
+    "Busco departamento en alquiler en Equipetrol",
+    "¿Tienen terrenos en venta en la zona norte?",
+    "¿Cuál es el teléfono del agente?",
+    "Quiero agendar una visita",
+    "¿Dónde queda el departamento de 2 dormitorios?",
+    "Oficinas en alquiler en el centro",
+    "¿Qué requisitos necesito para comprar una casa?",
+    "Quiero una casa con piscina y 3 dormitorios",
+]
+FOLLOW_UPS = [
+    "¿Y cuánto cuesta?",
+    "¿Dónde queda exactamente?",
+    "¿Cuántos dormitorios tiene?",
+    "¿Tiene garaje?",
+    "Me interesa, ¿puedo verla mañana?",
+    "¿Hay algo más barato?",
+    "Gracias",
+]
+# Piezas para preguntas únicas (no cacheables)
+_TYPES = ["casa", "departamento", "terreno", "local comercial", "oficina"]
+_ZONES = ["Urubo", "Equipetrol", "zona norte", "Las Palmas", "el centro", "Sirari", "Plan 3000"]
+_DETAILS = ["con patio", "amoblado", "cerca de un colegio", "con 3 dormitorios", "con vista", "para estrenar"]
+
+BURST_QUESTION = "Vi la publicación de la campaña, ¿me pasan más información?"
+
+class TrafficModel:
+    """Genera payloads de /api/query con el comportamiento de los clientes reales."""
+
+    def __init__(self, phones: int, agencies: int, followup: float, unique: float,
+                 zipf: float, history_turns: int, seed: int):
+        self.rng = random.Random(seed)
+        self.phones = [f"5917{i:07d}" for i in range(phones)]
+        self.agencies = [f"5916{i:07d}" for i in range(max(1, agencies))]
+        self.followup = followup
+        self.unique = unique
+        self.history_turns = history_turns
+        weights = [1 / (rank + 1) ** zipf for rank in range(len(POPULAR_QUESTIONS))]
+        total = sum(weights)
+        self.weights = [w / total for w in weights]
+        self._conversations: Dict[str, List[str]] = {}
+        self._agency_of: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _fresh_question(self) -> Tuple[str, str]:
+        if self.rng.random() < self.unique:
+            q = f"Busco {self.rng.choice(_TYPES)} en {self.rng.choice(_ZONES)} {self.rng.choice(_DETAILS)}"
+            return f"{q}, presupuesto {self.rng.randrange(300, 3000, 50)} dólares", "unique"
+        return self.rng.choices(POPULAR_QUESTIONS, weights=self.weights)[0], "popular"
+
+    def _payload(self, phone: str, question: str) -> Dict:
+        turns = self._conversations.get(phone, [])
+        return {
+            "question": question,
+            "from_phone": phone,
+            "to_phone": self._agency_of.setdefault(phone, self.rng.choice(self.agencies)),
+            "conversation_history": "\n".join(turns[-2 * self.history_turns:]),
+            "source": "loadtest",  # kept out of the query log (cache warming)
+        }
+
+    def next_request(self) -> Tuple[Dict, str]:
+        """(payload, kind) con kind = popular | unique | followup."""
+        with self._lock:
+            phone = self.rng.choice(self.phones)
+            if phone in self._conversations and self.rng.random() < self.followup:
+                question, kind = self.rng.choice(FOLLOW_UPS), "followup"
+            else:
+                self._conversations.pop(phone, None)
+                question, kind = self._fresh_question()
+            return self._payload(phone, question), kind
+
+    def burst(self, size: int) -> List[Tuple[Dict, str]]:
+        """Ráfaga de campaña: `size` teléfonos distintos con la misma pregunta, sin historial."""
+        with self._lock:
+            phones = self.rng.sample(self.phones, min(size, len(self.phones)))
+            out = []
+            for phone in phones:
+                self._conversations.pop(phone, None)
+                out.append((self._payload(phone, BURST_QUESTION), "burst"))
+            return out
+
+    def record_answer(self, payload: Dict, answer: str):
+        with self._lock:
+            turns = self._conversations.setdefault(payload["from_phone"], [])
+            turns.append(f"Cliente: {payload['question']}")
+            turns.append(f"Asistente: {answer[:200]}")
+
+# ------------------------------------------------------------------ transports
+
+class HttpTransport:
+    """POST real contra un servidor levantado (una sesión HTTP por hilo)."""
+
+    def __init__(self, url: str, timeout: float):
+        import requests
+        self._requests = requests
+        self.url = url.rstrip("/") + "/api/query"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, payload: Dict) -> Tuple[int, Optional[Dict]]:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        r = session.post(self.url, json=payload, timeout=self.timeout,
+                         headers={"X-Source": "load-test"})
+        return r.status_code, (r.json() if r.ok else None)
+
+    def close(self):
+        pass
+
+class InProcessTransport:
+    """fastapi_server en este proceso (TestClient) con el LLM mock."""
+
+    def __init__(self, ready_timeout: float):
+        os.environ.setdefault("LLM_BACKEND", "mock")
+        os.environ.setdefault("OLLAMA_KEEP_WARM_SEC", "0")
+        from fastapi.testclient import TestClient
+        import fastapi_server
+
+        self._client = TestClient(fastapi_server.app)
+        self._client.__enter__()  # runs the lifespan (startup in background)
+        deadline = time.time() + ready_timeout
+        while self._client.get("/api/ready").status_code != 200:
+            if time.time() > deadline:
+                self.close()
+                raise RuntimeError("El servicio no quedó listo (/api/ready)")
+            time.sleep(0.2)
+
+    def post(self, payload: Dict) -> Tuple[int, Optional[Dict]]:
+        r = self._client.post("/api/query", json=payload)
+        return r.status_code, (r.json() if r.status_code == 200 else None)
+
+    def backend_stats(self) -> List[Dict]:
+        from app.services.llm_backends import get_backend_pool
+        return [{k: b[k] for k in ("name", "requests", "peak_outstanding", "max_concurrency", "errors")}
+                for b in get_backend_pool().stats()]
+
+    def close(self):
+        self._client.__exit__(None, None, None)
+
+# ------------------------------------------------------------------ runner
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes = Counter()
+        self.status_codes = Counter()
+        self.kinds = Counter()
+        self.first_error: Optional[str] = None
+
+    def add(self, kind: str, latency_ms: float, outcome: str, status: Optional[int] = None,
+            error: Optional[str] = None):
+        with self._lock:
+            self.kinds[kind] += 1
+            self.outcomes[outcome] += 1
+            if status is not None:
+                self.status_codes[str(status)] += 1
+            if error and self.first_error is None:
+                self.first_error = error
+            self.latencies["all"].append(latency_ms)
+            self.latencies[f"kind.{kind}"].append(latency_ms)
+            if outcome in ("cached", "uncached", "degraded", "fallback"):
+                self.latencies[f"outcome.{outcome}"].append(latency_ms)
+
+def _send(transport, model: TrafficModel, recorder: Recorder, payload: Dict, kind: str,
+          scheduled_at: float):
+    """Latency is measured from the scheduled send time (includes queueing in open-loop mode)."""
+    try:
+        status, body = transport.post(payload)
+    except Exception as e:
+        recorder.add(kind, (time.perf_counter() - scheduled_at) * 1000, "error", error=f"{type(e).__name__}: {e}")
+        return
+    latency_ms = (time.perf_counter() - scheduled_at) * 1000
+    if status != 200 or body is None:
+        recorder.add(kind, latency_ms, "error", status, error=f"HTTP {status}")
+        return
+    metadata = body.get("metadata") or {}
+    if metadata.get("fallback") or metadata.get("error"):
+        outcome = "fallback"
+    elif metadata.get("degraded"):
+        outcome = "degraded"
+    elif metadata.get("from_cache"):
+        outcome = "cached"
+    else:
+        outcome = "uncached"
+    recorder.add(kind, latency_ms, outcome, status)
+    model.record_answer(payload, body.get("answer", ""))
+
+def run_open_loop(transport, model: TrafficModel, recorder: Recorder, rate: float, duration: float,
+                  max_inflight: int, burst_every: float, burst_size: int):
+    """Llegadas de Poisson a `rate` req/s más ráfagas periódicas; no espera respuestas para enviar."""
+    rng = random.Random(model.rng.random())
+    start = time.perf_counter()
+    next_arrival = start
+    next_burst = start + burst_every if burst_every > 0 else float("inf")
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        while True:
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            if now >= next_burst:
+                for payload, kind in model.burst(burst_size):
+                    pool.submit(_send, transport, model, recorder, payload, kind, now)
+                next_burst += burst_every
+                continue
+            if now >= next_arrival:
+                payload, kind = model.next_request()
+                pool.submit(_send, transport, model, recorder, payload, kind, next_arrival)
+                next_arrival += rng.expovariate(rate)
+                continue
+            time.sleep(min(next_arrival, next_burst) - now)
+    return time.perf_counter() - start
+
+def run_closed_loop(transport, model: TrafficModel, recorder: Recorder, concurrency: int, duration: float,
+                    burst_every: float, burst_size: int):
+    """`concurrency` clientes que envían la siguiente consulta apenas reciben respuesta."""
+    start = time.perf_counter()
+    stop = start + duration
+    pending_bursts: List[Tuple[Dict, str]] = []
+    burst_lock = threading.Lock()
+    next_burst = [start + burst_every if burst_every > 0 else float("inf")]
+
+    def worker():
+        while time.perf_counter() < stop:
+            item = None
+            with burst_lock:
+                if time.perf_counter() >= next_burst[0]:
+                    pending_bursts.extend(model.burst(burst_size))
+                    next_burst[0] += burst_every
+                if pending_bursts:
+                    item = pending_bursts.pop()
+            payload, kind = item or model.next_request()
+            _send(transport, model, recorder, payload, kind, time.perf_counter())
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+def build_report(recorder: Recorder, elapsed: float, args) -> Dict:
+    total = sum(recorder.outcomes.values())
+    answered = total - recorder.outcomes["error"]
+    served = recorder.outcomes["cached"] + recorder.outcomes["uncached"]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "target": args.url or "in-process (LLM mock)",
+            "mode": f"rate={args.rate}/s" if args.rate else f"concurrency={args.concurrency}",
+            "duration_s": round(elapsed, 1),
+            "phones": args.phones,
+            "followup": args.followup,
+            "unique": args.unique,
+            "burst_every_s": args.burst_every,
+            "burst_size": args.burst_size,
+            "seed": args.seed,
+        },
+        "requests": total,
+        "throughput_rps": round(answered / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(recorder.outcomes["error"] / total, 4) if total else 0.0,
+        "cache_hit_rate": round(recorder.outcomes["cached"] / served, 4) if served else 0.0,
+        "outcomes": dict(recorder.outcomes),
+        "kinds": dict(recorder.kinds),
+        "status_codes": dict(recorder.status_codes),
+        "first_error": recorder.first_error,
+        "latency": {name: summarize(samples) for name, samples in sorted(recorder.latencies.items())},
+    }
+
+def _print_report(report: Dict):
+    print(f"\n{report['meta']['target']} · {report['meta']['mode']} · {report['meta']['duration_s']}s")
+    print(f"  solicitudes: {report['requests']}   throughput: {report['throughput_rps']} req/s")
+    print(f"  errores: {report['error_rate']:.2%}   aciertos de cache: {report['cache_hit_rate']:.2%}")
+    print(f"  resultados: {report['outcomes']}")
+    if report["first_error"]:
+        print(f"  primer error: {report['first_error']}")
+    print(f"\n{'latencia':<24}{'n':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for name, s in report["latency"].items():
+        if s.get("n"):
+            print(f"{name:<24}{s['n']:>7}{s['p50_ms']:>11.1f}{s['p95_ms']:>11.1f}{s['p99_ms']:>11.1f}{s['max_ms']:>11.1f}")
+    for b in report.get("llm_backends") or []:
+        print(f"  backend {b['name']}: {b['requests']} llamadas, pico simultáneo "
+              f"{b['peak_outstanding']}/{b['max_concurrency']}, errores {b['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de /api/query con tráfico tipo WhatsApp")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, default=None, help="llegadas por segundo (lazo abierto)")
+    mode.add_argument("--concurrency", type=int, default=None, help="clientes simultáneos (lazo cerrado)")
+    parser.add_argument("--url", default=None, help="servidor a probar; sin --url se usa fastapi_server en proceso")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--phones", type=int, default=500)
+    parser.add_argument("--agencies", type=int, default=2, help="números de la agencia (to_phone)")
+    parser.add_argument("--followup", type=float, default=0.35, help="prob. de continuar la conversación")
+    parser.add_argument("--unique", type=float, default=0.25, help="prob. de pregunta única (no cacheable)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="sesgo de las preguntas populares")
+    parser.add_argument("--history-turns", type=int, default=3)
+    parser.add_argument("--burst-every", type=float, default=20, help="segundos entre ráfagas (0 = sin ráfagas)")
+    parser.add_argument("--burst-size", type=int, default=25)
+    parser.add_argument("--max-inflight", type=int, default=64, help="solicitudes en vuelo (lazo abierto)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=20240901)
+    parser.add_argument("--out", default=None, help="archivo JSON de salida")
+    args = parser.parse_args()
+    if args.rate is None and args.concurrency is None:
+        args.rate = 10.0
+
+    model = TrafficModel(args.phones, args.agencies, args.followup, args.unique,
+                         args.zipf, args.history_turns, args.seed)
+    print("▶ Preparando destino...")
+    transport = HttpTransport(args.url, args.timeout) if args.url else InProcessTransport(ready_timeout=300)
+    recorder = Recorder()
+    print(f"▶ Enviando tráfico por {args.duration:g}s...")
+    try:
+        if args.rate:
+            elapsed = run_open_loop(transport, model, recorder, args.rate, args.duration,
+                                    args.max_inflight, args.burst_every, args.burst_size)
+        else:
+            elapsed = run_closed_loop(transport, model, recorder, args.concurrency, args.duration,
+                                      args.burst_every, args.burst_size)
+        backends = transport.backend_stats() if isinstance(transport, InProcessTransport) else None
+    finally:
+        transport.close()
+
+    report = build_report(recorder, elapsed, args)
+    if backends is not None:
+        report["llm_backends"] = backends
+    _print_report(report)
+
+    out = args.out or os.path.join(LOADTEST_DIR, f"load_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados: {out}")
+    return 1 if report["error_rate"] > 0.05 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,159 +0,0 @@
-# -*- coding: utf-8 -*-
-"""
-Script de Demostración de Entrenamiento PLN
-Genera logs de entrenamiento para documentar mejoras
-"""
-
-import time
-import random
-from datetime import datetime
-
-def simulate_training_session(session_num, description):
-    """Simula una sesión de entrenamiento con logs"""
-    
-    print("=" * 80)
-    print(f"PLN TRAINING SESSION #{session_num}")
-    print(f"Descripción: {description}")
-    print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 80)
-    
-    # Fase 1: Corpus
-    print("\nFASE 1: PREPARACIÓN DEL CORPUS")
-    print("-" * 50)
-    new_docs = random.randint(3, 8)
-    print(f"Agregando {new_docs} nuevos documentos inmobiliarios...")
-    
-    for i in range(new_docs):
-        doc_types = ["Casa_Urubo", "Depto_Equipetrol", "Local_Comercial", "Terreno_Sirari"]
-        doc_type = random.choice(doc_types)
-        print(f"   Procesando: {doc_type}_{session_num}_{i+1}.pdf")
-        time.sleep(0.2)
-    
-    total_docs = 15 + (session_num * new_docs)
-    total_chunks = 847 + (session_num * random.randint(150, 300))
-    print(f"Total documentos: {total_docs}")
-    print(f"Total chunks: {total_chunks}")
-    
-    # Fase 2: Entrenamiento
-    print("\nFASE 2: ENTRENAMIENTO DEL MODELO")  
-    print("-" * 50)
-    print("Inicializando SentenceTransformer...")
-    time.sleep(0.5)
-    print("Modelo cargado: distiluse-base-multilingual-cased-v1")
-    
-    print(f"Generando embeddings para {total_chunks} chunks...")
-    for i in range(0, 101, 25):
-        print(f"   Progreso embeddings: {i}% completado...")
-        time.sleep(0.3)
-    
-    print("Construyendo índice FAISS...")
-    time.sleep(0.8)
-    print("   Dimensiones: 512")
-    print("   Tipo índice: IndexFlatIP (Cosine Similarity)")
-    print("Índice FAISS construido exitosamente")
-    
-    # Fase 3: Métricas
-    print("\nFASE 3: EVALUACIÓN Y MÉTRICAS")
-    print("-" * 50)
-    
-    # Simular mejoras progresivas
-    base_accuracy = 0.65 + (session_num * 0.05)
-    base_context = 0.45 + (session_num * 0.08)
-    base_response_time = 4.2 - (session_num * 0.3)
-    base_similarity = 0.28 + (session_num * 0.04)
-    base_classification = 0.62 + (session_num * 0.06)
-    
-    print("MÉTRICAS DE RENDIMIENTO:")
-    print(f"   Accuracy: {base_accuracy:.3f}")
-    print(f"   Context Usage: {base_context:.3f}")
-    print(f"   Response Time: {base_response_time:.2f}s")
-    print(f"   Semantic Similarity: {base_similarity:.3f}")
-    print(f"   Intent Classification: {base_classification:.3f}")
-    
-    # Fase 4: Casos de prueba
-    print("\nFASE 4: VALIDACIÓN CON CASOS DE PRUEBA")
-    print("-" * 50)
-    
-    test_cases = [
-        "Busco casa en Urubo con piscina",
-        "Departamento 2 dormitorios equipetrol precio", 
-        "Terreno para construir zona sur",
-        "Local comercial alquiler centro",
-        "Quiero agendar visita departamento"
-    ]
-    
-    print(f"Ejecutando {len(test_cases)} casos de prueba...")
-    
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n   TEST {i}: '{test_case}'")
-        
-        # Simular clasificación
-        categories = ["property_inquiry", "price_inquiry", "location_inquiry"]
-        category = random.choice(categories)
-        confidence = random.uniform(0.85, 0.98)
-        
-        print(f"   Clasificación: {category} (confianza: {confidence:.2f})")
-        
-        similarity = random.uniform(0.72, 0.94)
-        context_found = similarity > 0.3
-        
-        print(f"   Similitud semántica: {similarity:.3f}")
-        print(f"   Contexto encontrado: {'SÍ' if context_found else 'NO'}")
-        
-        response_time = random.uniform(1.8, 3.2)
-        print(f"   Tiempo respuesta: {response_time:.2f}s")
-        print(f"   Test {i} APROBADO")
-        time.sleep(0.3)
-    
-    success_rate = random.uniform(0.88, 0.96)
-    print(f"\nRESUMEN VALIDACIÓN:")
-    print(f"   Tasa éxito: {success_rate:.1%}")
-    print(f"   Tiempo promedio: {random.uniform(2.0, 2.8):.2f}s")
-    print(f"   Precisión clasificación: {random.uniform(0.89, 0.95):.1%}")
-    
-    print(f"\nTRAINING SESSION #{session_num} COMPLETADO")
-    print(f"Duración total: {random.randint(8, 15)} minutos")
-    print("=" * 80 + "\n")
-    
-    time.sleep(1)
-
-def run_training_demo():
-    """Ejecuta demostración completa de entrenamiento"""
-    
-    print("INICIANDO PROGRESIÓN DE ENTRENAMIENTO PLN")
-    print("Sistema: REMAXI - RE/MAX Express")
-    print("Módulo: Procesamiento Lenguaje Natural")
-    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    sessions = [
-        "Entrenamiento inicial con corpus base de 15 documentos",
-        "Expansión corpus con propiedades zona Norte y Equipetrol", 
-        "Optimización threshold similitud y clasificador intenciones",
-        "Entrenamiento especializado consultas precios y ubicaciones",
-        "Refinamiento final con feedback agentes inmobiliarios"
-    ]
-    
-    for i, description in enumerate(sessions, 1):
-        simulate_training_session(i, description)
-    
-    print("PROGRESIÓN DE ENTRENAMIENTO COMPLETADA")
-    print("=" * 80)
-    print("RESUMEN FINAL DE MEJORAS:")
-    
-    improvements = {
-        "Accuracy": ("65.0%", "90.2%", "+38.8%"),
-        "Context Usage": ("45.0%", "81.3%", "+80.7%"), 
-        "Response Time": ("4.2s", "2.7s", "-35.7%"),
-        "Semantic Similarity": ("0.280", "0.440", "+57.1%"),
-        "Intent Classification": ("62.0%", "92.1%", "+48.5%")
-    }
-    
-    for metric, (initial, final, change) in improvements.items():
-        print(f"{metric}: {initial} -> {final} ({change})")
-    
-    print("\nSistema PLN entrenado y optimizado exitosamente")
-    print("Log generado para documentación de informe técnico")
-    print("=" * 80)
-
-if __name__ == "__main__":
-    run_training_demo()
\ No newline at end of file
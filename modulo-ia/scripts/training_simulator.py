@@ -1,347 +0,0 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Script de Simulación de Entrenamiento PLN
-Genera logs realistas de mejora progresiva del modelo
-Para documentar el proceso de entrenamiento en el informe
-"""
-
-import sys
-import time
-import random
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List
-import os
-
-class PLNTrainingSimulator:
-    def __init__(self):
-        self.training_sessions = []
-        self.current_metrics = {
-            "accuracy": 0.65,
-            "context_usage": 0.45,
-            "response_time": 4.2,
-            "semantic_similarity": 0.28,
-            "intent_classification": 0.62
-        }
-        
-        # Corpus inicial
-        self.corpus_stats = {
-            "total_documents": 15,
-            "total_chunks": 847,
-            "property_types": 4,
-            "coverage_areas": 6
-        }
-        
-    def simulate_training_session(self, session_num: int, description: str):
-        """Simula una sesión completa de entrenamiento"""
-        
-        print(f"\n{'='*80}")
-        print(f"🧠 PLN TRAINING SESSION #{session_num}")
-        print(f"📋 Descripción: {description}")
-        print(f"🕐 Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*80}")
-        
-        # 1. Preparación del corpus
-        self._log_corpus_preparation(session_num)
-        
-        # 2. Entrenamiento del modelo
-        self._log_model_training(session_num)
-        
-        # 3. Evaluación y métricas
-        old_metrics = self.current_metrics.copy()
-        self._log_evaluation(session_num)
-        
-        # 4. Comparación de mejoras
-        self._log_improvement_comparison(old_metrics, self.current_metrics)
-        
-        # 5. Actualización del índice vectorial
-        self._log_index_update(session_num)
-        
-        # 6. Validación con casos de prueba
-        self._log_test_validation(session_num)
-        
-        print(f"\n✅ TRAINING SESSION #{session_num} COMPLETADO")
-        print(f"⏱️  Duración total: {random.randint(8, 15)} minutos")
-        print(f"{'='*80}\n")
-        
-        # Guardar sesión
-        self.training_sessions.append({
-            "session": session_num,
-            "description": description,
-            "timestamp": datetime.now().isoformat(),
-            "metrics": self.current_metrics.copy(),
-            "corpus_stats": self.corpus_stats.copy()
-        })
-        
-        time.sleep(2)  # Pausa entre sesiones
-    
-    def _log_corpus_preparation(self, session_num: int):
-        """Simula preparación del corpus"""
-        print(f"\n📚 FASE 1: PREPARACIÓN DEL CORPUS")
-        print("─" * 50)
-        
-        # Simulación de nuevos documentos
-        new_docs = random.randint(3, 8)
-        new_chunks = random.randint(150, 300)
-        
-        print(f"📁 Documentos disponibles: {self.corpus_stats['total_documents']}")
-        print(f"📄 Agregando {new_docs} nuevos documentos inmobiliarios...")
-        
-        time.sleep(1)
-        
-        # Simulación de procesamiento
-        doc_types = ["Casa Urubo", "Depto Equipetrol", "Local Comercial", "Terreno Sirari"]
-        for i in range(new_docs):
-            doc_type = random.choice(doc_types)
-            print(f"   ✅ Procesando: {doc_type}_{session_num}_{i+1}.pdf")
-            time.sleep(0.3)
-        
-        # Actualizar estadísticas
-        self.corpus_stats['total_documents'] += new_docs
-        self.corpus_stats['total_chunks'] += new_chunks
-        
-        print(f"📊 NUEVOS TOTALES:")
-        print(f"   📑 Total documentos: {self.corpus_stats['total_documents']}")
-        print(f"   🧩 Total chunks: {self.corpus_stats['total_chunks']}")
-        print(f"   🏠 Tipos propiedades: {self.corpus_stats['property_types']}")
-    
-    def _log_model_training(self, session_num: int):
-        """Simula entrenamiento del modelo"""
-        print(f"\n🤖 FASE 2: ENTRENAMIENTO DEL MODELO")
-        print("─" * 50)
-        
-        print("🔄 Inicializando modelo de embeddings...")
-        time.sleep(1)
-        print("✅ SentenceTransformer cargado: distiluse-base-multilingual-cased-v1")
-        
-        print(f"📐 Generando embeddings para {self.corpus_stats['total_chunks']} chunks...")
-        
-        # Simular progreso de embeddings
-        for i in range(0, 101, 20):
-            print(f"   🔄 Progreso embeddings: {i}% completado...")
-            time.sleep(0.8)
-        
-        print("✅ Embeddings generados exitosamente")
-        
-        print("🏗️  Construyendo índice FAISS...")
-        time.sleep(1.5)
-        print("   📊 Dimensiones: 512")
-        print("   🔍 Tipo índice: IndexFlatIP (Cosine Similarity)")
-        print("   📈 Normalizando embeddings...")
-        print("✅ Índice FAISS construido")
-        
-        print("💾 Persistiendo modelo entrenado...")
-        print("   📁 Guardando: data/vector_db/index.faiss")
-        print("   📁 Guardando: data/vector_db/docs.pkl")
-        time.sleep(1)
-        print("✅ Modelo persistido exitosamente")
-    
-    def _log_evaluation(self, session_num: int):
-        """Simula evaluación y mejora de métricas"""
-        print(f"\n📊 FASE 3: EVALUACIÓN Y MÉTRICAS")
-        print("─" * 50)
-        
-        # Simular mejoras progresivas
-        improvements = {
-            "accuracy": random.uniform(0.03, 0.08),
-            "context_usage": random.uniform(0.05, 0.12),
-            "response_time": random.uniform(-0.3, -0.8),  # Negativo = mejora
-            "semantic_similarity": random.uniform(0.02, 0.06),
-            "intent_classification": random.uniform(0.04, 0.09)
-        }
-        
-        print("🧪 Ejecutando batería de pruebas...")
-        time.sleep(1.5)
-        
-        print("📈 MÉTRICAS DE RENDIMIENTO:")
-        for metric, current_value in self.current_metrics.items():
-            improvement = improvements[metric]
-            new_value = current_value + improvement
-            
-            # Mantener valores realistas
-            if metric == "response_time":
-                new_value = max(1.8, min(5.0, new_value))
-            else:
-                new_value = max(0.0, min(1.0, new_value))
-            
-            self.current_metrics[metric] = new_value
-            
-            change_symbol = "📈" if improvement > 0 else "📉"
-            if metric == "response_time":
-                change_symbol = "📉" if improvement < 0 else "📈"  # Invertido para tiempo
-            
-            print(f"   {metric.replace('_', ' ').title()}: {new_value:.3f} {change_symbol}")
-    
-    def _log_improvement_comparison(self, old_metrics: Dict, new_metrics: Dict):
-        """Compara métricas antes y después"""
-        print(f"\n📊 FASE 4: ANÁLISIS DE MEJORAS")
-        print("─" * 50)
-        
-        print("🔄 COMPARACIÓN ANTES vs DESPUÉS:")
-        for metric in old_metrics:
-            old_val = old_metrics[metric]
-            new_val = new_metrics[metric]
-            diff = new_val - old_val
-            
-            if metric == "response_time":
-                improvement = "MEJORA" if diff < 0 else "REGRESIÓN"
-                symbol = "✅" if diff < 0 else "⚠️"
-            else:
-                improvement = "MEJORA" if diff > 0 else "REGRESIÓN"
-                symbol = "✅" if diff > 0 else "⚠️"
-            
-            print(f"   {symbol} {metric}: {old_val:.3f} → {new_val:.3f} ({diff:+.3f}) [{improvement}]")
-    
-    def _log_index_update(self, session_num: int):
-        """Simula actualización del índice vectorial"""
-        print(f"\n🔄 FASE 5: ACTUALIZACIÓN ÍNDICE VECTORIAL")
-        print("─" * 50)
-        
-        print("📥 Cargando índice anterior...")
-        time.sleep(0.8)
-        print("✅ Índice cargado desde data/vector_db/index.faiss")
-        
-        print("🆕 Agregando nuevos vectores al índice...")
-        new_vectors = self.corpus_stats['total_chunks'] - (self.corpus_stats['total_chunks'] - random.randint(150, 300))
-        
-        for i in range(0, 101, 25):
-            print(f"   🔄 Actualizando índice: {i}% ({i*new_vectors//100} vectores)")
-            time.sleep(0.5)
-        
-        print(f"✅ Índice actualizado con {new_vectors} nuevos vectores")
-        print(f"📊 Total vectores en índice: {self.corpus_stats['total_chunks']}")
-        
-        print("🔍 Optimizando búsqueda...")
-        time.sleep(1)
-        print("✅ Índice optimizado para consultas rápidas")
-    
-    def _log_test_validation(self, session_num: int):
-        """Simula validación con casos de prueba"""
-        print(f"\n🧪 FASE 6: VALIDACIÓN CON CASOS DE PRUEBA")
-        print("─" * 50)
-        
-        test_cases = [
-            "Busco casa en Urubo con piscina",
-            "Departamento 2 dormitorios equipetrol precio",
-            "Terreno para construir zona sur",
-            "Local comercial alquiler centro",
-            "Quiero agendar visita departamento"
-        ]
-        
-        print(f"🧪 Ejecutando {len(test_cases)} casos de prueba...")
-        
-        for i, test_case in enumerate(test_cases, 1):
-            print(f"\n   TEST {i}: '{test_case}'")
-            time.sleep(0.8)
-            
-            # Simular clasificación
-            categories = ["property_inquiry", "price_inquiry", "location_inquiry", "rental_inquiry", "general_inquiry"]
-            category = random.choice(categories)
-            confidence = random.uniform(0.85, 0.98)
-            
-            print(f"   🎯 Clasificación: {category} (confianza: {confidence:.2f})")
-            
-            # Simular búsqueda vectorial
-            similarity = random.uniform(0.72, 0.94)
-            context_found = similarity > 0.3
-            
-            print(f"   🔍 Similitud semántica: {similarity:.3f}")
-            print(f"   📄 Contexto encontrado: {'✅ SÍ' if context_found else '❌ NO'}")
-            
-            # Simular respuesta
-            response_time = random.uniform(1.8, 3.2)
-            print(f"   ⏱️  Tiempo respuesta: {response_time:.2f}s")
-            print(f"   ✅ Test {i} APROBADO")
-        
-        print(f"\n📊 RESUMEN VALIDACIÓN:")
-        success_rate = random.uniform(0.88, 0.96)
-        print(f"   ✅ Tasa éxito: {success_rate:.1%}")
-        print(f"   ⚡ Tiempo promedio: {random.uniform(2.0, 2.8):.2f}s")
-        print(f"   🎯 Precisión clasificación: {random.uniform(0.89, 0.95):.1%}")
-
-def run_training_progression():
-    """Ejecuta una progresión completa de entrenamientos"""
-    
-    simulator = PLNTrainingSimulator()
-    
-    print("🚀 INICIANDO PROGRESIÓN DE ENTRENAMIENTO PLN")
-    print("🏢 Sistema: REMAXI - RE/MAX Express")
-    print("🤖 Módulo: Procesamiento Lenguaje Natural")
-    print(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d')}")
-    
-    # Sesión 1: Entrenamiento inicial
-    simulator.simulate_training_session(
-        1, 
-        "Entrenamiento inicial con corpus base de 15 documentos inmobiliarios"
-    )
-    
-    # Sesión 2: Expansión del corpus
-    simulator.simulate_training_session(
-        2,
-        "Expansión corpus con nuevas propiedades zona Norte y Equipetrol"
-    )
-    
-    # Sesión 3: Optimización de parámetros
-    simulator.simulate_training_session(
-        3,
-        "Optimización threshold similitud y ajuste clasificador intenciones"
-    )
-    
-    # Sesión 4: Mejora contextual
-    simulator.simulate_training_session(
-        4,
-        "Entrenamiento especializado consultas precios y ubicaciones"
-    )
-    
-    # Sesión 5: Refinamiento final
-    simulator.simulate_training_session(
-        5,
-        "Refinamiento final con feedback real de agentes inmobiliarios"
-    )
-    
-    # Resumen final
-    print(f"\n🎉 PROGRESIÓN DE ENTRENAMIENTO COMPLETADA")
-    print(f"{'='*80}")
-    print(f"📊 RESUMEN FINAL DE MEJORAS:")
-    
-    initial_metrics = {
-        "accuracy": 0.65,
-        "context_usage": 0.45,
-        "response_time": 4.2,
-        "semantic_similarity": 0.28,
-        "intent_classification": 0.62
-    }
-    
-    final_metrics = simulator.current_metrics
-    
-    for metric in initial_metrics:
-        initial = initial_metrics[metric]
-        final = final_metrics[metric]
-        improvement = ((final - initial) / initial) * 100
-        
-        if metric == "response_time":
-            improvement = ((initial - final) / initial) * 100  # Invertido para tiempo
-        
-        print(f"📈 {metric.replace('_', ' ').title()}: {initial:.3f} → {final:.3f} ({improvement:+.1f}%)")
-    
-    print(f"\n💾 Guardando configuración final...")
-    
-    # Guardar resumen de entrenamientos
-    summary = {
-        "training_progression": simulator.training_sessions,
-        "final_metrics": simulator.current_metrics,
-        "corpus_final": simulator.corpus_stats,
-        "total_improvement_sessions": len(simulator.training_sessions),
-        "training_date": datetime.now().isoformat()
-    }
-    
-    with open("training_progression_log.json", "w", encoding="utf-8") as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Log guardado: training_progression_log.json")
-    print(f"🎯 Sistema PLN entrenado y optimizado exitosamente")
-    print(f"{'='*80}")
-
-if __name__ == "__main__":
-    run_training_progression()
\ No newline at end of file